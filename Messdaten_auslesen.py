@@ -1,19 +1,38 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from opcua import Client, ua
 import pandas as pd
-import os
+import queue
+import shutil
+import sps_verbindung
+import pruefstaende
+from live_erfassung import LiveErfassung
+from messwerte_leser import MesswerteLeser, VARIABLES_CSV, load_variables
+from messpuffer import Messpuffer
+import messlauf_datei
+import mittelung
+from tabelle import VirtualTable
+from hintergrund import AuftragAbgebrochen, run_in_background
 
-# Datei für die Variablen (Registernamen)
-VARIABLES_CSV = 'variables.csv'
+# Aktualisierungsintervall der Tabelle im Live-Modus (ms)
+LIVE_GUI_INTERVAL = 200
 
 class OPCUAGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("OPC-UA Data Viewer")
-        self.client = None
+        self.benches = pruefstaende.load_benches()
+        self.bench = next(iter(self.benches.values()))
+        self.session = self.bench.session()
         self.data = None
+        self.fetched = None  # Puffer der ausgelesenen Zeilen (wird nur im Tk-Thread verändert)
+        self.status_codes = {}
+        self.live = None
+        self.live_rows = queue.Queue()
+        self.live_log_path = None
+        self.live_points = None  # Arbeitspunktmittelung und abgeschlossene Punkte im Live-Modus
+        self.batch_size = sps_verbindung.READ_BATCH_SIZE
         self.variables = self.load_variables_from_csv()  # Lade die Registernamen aus der CSV-Datei
+        self.reader = MesswerteLeser(self.session, self.variables, self.bench.messwerte_db, batch_size=self.batch_size)
         
         # Setup GUI components
         self.setup_gui()
@@ -27,47 +46,51 @@ class OPCUAGUI:
         button_frame = tk.Frame(self.root)
         button_frame.grid(row=0, column=0, sticky='ew', padx=10, pady=10)
 
+        # Bench selection (endpoints from pruefstaende.csv)
+        self.bench_name = tk.StringVar(value=self.bench.name)
+        self.bench_combobox = ttk.Combobox(button_frame, textvariable=self.bench_name, values=list(self.benches),
+                                           state='readonly', width=20)
+        self.bench_combobox.pack(side=tk.LEFT, padx=5)
+        self.bench_combobox.bind("<<ComboboxSelected>>", lambda event: self.select_bench(self.bench_name.get()))
+
         # Fetch Data Button
         self.fetch_button = tk.Button(button_frame, text="Fetch Data", command=self.fetch_data)
         self.fetch_button.pack(side=tk.LEFT, padx=5)
 
+        # Live Mode Buttons
+        self.live_start_button = tk.Button(button_frame, text="Start Live", command=self.start_live)
+        self.live_start_button.pack(side=tk.LEFT, padx=5)
+
+        self.live_stop_button = tk.Button(button_frame, text="Stop Live", command=self.stop_live, state=tk.DISABLED)
+        self.live_stop_button.pack(side=tk.LEFT, padx=5)
+
         # Save to CSV Button
         self.save_button = tk.Button(button_frame, text="Save to CSV", command=self.save_to_csv, state=tk.DISABLED)
         self.save_button.pack(side=tk.LEFT, padx=5)
 
+        # Save Binary Button
+        self.save_binary_button = tk.Button(button_frame, text="Save Binary", command=self.save_to_binary, state=tk.DISABLED)
+        self.save_binary_button.pack(side=tk.LEFT, padx=5)
+
+        # Save Operating Points Button (eine gemittelte Zeile je Arbeitspunkt)
+        self.save_points_button = tk.Button(button_frame, text="Save Points", command=self.save_points, state=tk.DISABLED)
+        self.save_points_button.pack(side=tk.LEFT, padx=5)
+
         # Save Variables Button
         self.save_variables_button = tk.Button(button_frame, text="Save Variables", command=self.save_variables_to_csv)
         self.save_variables_button.pack(side=tk.LEFT, padx=5)
 
-        # Table
-        self.tree = ttk.Treeview(self.root, columns=[], show='headings')
-        self.tree.grid(row=1, column=0, sticky='nsew')
+        # Table with scrollbars (only the visible rows are materialized)
+        self.table = VirtualTable(self.root)
+        self.table.grid(row=1, column=0, sticky='nsew')
 
-        # Scrollbars
-        self.vsb = ttk.Scrollbar(self.root, orient="vertical", command=self.tree.yview)
-        self.vsb.grid(row=1, column=1, sticky='ns')
-        self.tree.configure(yscrollcommand=self.vsb.set)
-        
-        self.hsb = ttk.Scrollbar(self.root, orient="horizontal", command=self.tree.xview)
-        self.hsb.grid(row=2, column=0, sticky='ew')
-        self.tree.configure(xscrollcommand=self.hsb.set)
+        # Status (Zeilen und Speicherbedarf des Messlaufs)
+        self.status_label = tk.Label(self.root, text="", anchor='w')
+        self.status_label.grid(row=2, column=0, sticky='ew', padx=10)
 
     def load_variables_from_csv(self):
         """Lädt die Variablen aus einer CSV-Datei oder verwendet die Standardwerte."""
-        default_variables = [
-            "index", "Messprogramm", "n_soll", "n", "M_soll", "M", "Strom_Effektivwert_soll", "I",
-            "Stromwinkel_soll", "phi", "id_soll", "id", "iq_soll", "iq", "U", "Pmech", "Pauf",
-            "eta", "Temperatur", "I_R_mess", "U_R_mess", "R"
-        ]
-        
-        if os.path.exists(VARIABLES_CSV):
-            try:
-                df = pd.read_csv(VARIABLES_CSV)
-                return df['variables'].tolist()
-            except pd.errors.EmptyDataError:
-                pass
-        # Standard-Variablen, falls die Datei nicht existiert oder leer ist
-        return default_variables
+        return load_variables(VARIABLES_CSV)
     
     def save_variables_to_csv(self):
         """Speichert die Variablen in eine CSV-Datei."""
@@ -79,78 +102,198 @@ class OPCUAGUI:
             df.to_csv(file_path, index=False)
             messagebox.showinfo("Success", "Variables successfully saved to CSV.")
     
+    def select_bench(self, name):
+        """Wechselt den Prüfstand; bereits gelesene Daten gehören zum alten Prüfstand und werden verworfen."""
+        if self.benches[name] is self.bench:
+            return
+        self.bench = self.benches[name]
+        self.session = self.bench.session()
+        self.reader = MesswerteLeser(self.session, self.variables, self.bench.messwerte_db, batch_size=self.batch_size)
+        self.data = None
+        self.fetched = None
+        self.live_log_path = None
+        self.table.clear()
+        self.status_label.config(text=self.bench.url)
+        self.save_button.config(state=tk.DISABLED)
+        self.save_binary_button.config(state=tk.DISABLED)
+        self.save_points_button.config(state=tk.DISABLED)
+
     def fetch_data(self):
-        try:
-            # OPC-UA Client Setup
-            url = "opc.tcp://192.168.0.1:4840"
-            self.client = Client(url)
-            self.client.connect()
-            print("Connected to OPC-UA server")
-            
-            # Fetch Data for loaded variables
-            self.data = self.fetch_data_for_variables(self.variables)
-            
-            # Display Data
-            self.display_data()
-            self.save_button.config(state=tk.NORMAL)
-
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to fetch data: {str(e)}")
-        finally:
-            if self.client:
-                self.client.disconnect()
-                print("Disconnected from OPC-UA server")
-    
-    def fetch_data_for_variables(self, variables):
-        data = {variable: [] for variable in variables}
-        
-        for variable in variables:
-            node_id = f"ns=3;s=\"Messwerte_DB\".\"{variable}\""
-            node = self.client.get_node(node_id)
-            array_data = self.get_array_from_node(node)
-            data[variable] = array_data
-        
-        max_length = max(len(arr) for arr in data.values())
-        
-        for key in data:
-            data[key].extend([0] * (max_length - len(data[key])))
-        
-        return data
+        """Liest die Messwerte in einem Hintergrund-Thread, die Oberfläche bleibt dabei bedienbar."""
+        self.fetch_button.config(state=tk.DISABLED)
+        self.live_start_button.config(state=tk.DISABLED)
+        self.bench_combobox.config(state='disabled')
+        run_in_background(self.root, "Fetching data...", self.fetch_data_job,
+                          on_done=self.on_data_fetched,
+                          on_error=lambda e: self.show_error("Failed to fetch data", e),
+                          on_finish=self.enable_buttons)
+
+    def fetch_data_job(self, job):
+        # Gemeinsame OPC-UA Session verwenden (bleibt nach dem Auslesen bestehen)
+        self.session.connect()
+        job.check_cancelled()
+
+        # Fetch Data for loaded variables
+        return self.fetch_data_for_variables(
+            self.variables, progress=lambda done, total: job.progress(done, total, f"Read {done}/{total} variables"))
+
+    def on_data_fetched(self, result):
+        # Neue Zeilen erst hier im Tk-Thread anhängen, die Tabelle liest den Puffer
+        columns, restarted = result
+        if restarted or self.fetched is None:
+            self.fetched = Messpuffer(self.reader.variables, self.reader.dtypes)
+        if columns:
+            self.fetched.append(columns)
+        self.data = self.fetched
+        self.live_log_path = None
+        self.live_points = None
+
+        # Display Data
+        self.display_data()
+        self.save_button.config(state=tk.NORMAL)
+        self.save_binary_button.config(state=tk.NORMAL)
+        self.save_points_button.config(state=tk.NORMAL)
+
+        # Variablen mit fehlerhaftem StatusCode melden
+        bad_variables = [f"{variable}: {status.name}" for variable, status in self.status_codes.items()
+                         if not status.is_good()]
+        if bad_variables:
+            messagebox.showwarning("Warning", "Some variables could not be read:\n" + "\n".join(bad_variables))
 
-    def get_array_from_node(self, node):
-        value, _ = self.get_node_data(node)
-        if isinstance(value, (list, tuple)):
-            return value
+    def show_error(self, message, error):
+        if isinstance(error, AuftragAbgebrochen):
+            messagebox.showinfo("Cancelled", "Operation cancelled.")
         else:
-            return []
-    
-    def get_node_data(self, node):
-        value = node.get_value()
-        datatype = node.get_attribute(ua.AttributeIds.DataType).Value
-        return value, datatype
+            messagebox.showerror("Error", f"{message}: {str(error)}")
+
+    def enable_buttons(self):
+        live_running = self.live is not None
+        self.fetch_button.config(state=tk.DISABLED if live_running else tk.NORMAL)
+        self.live_start_button.config(state=tk.DISABLED if live_running else tk.NORMAL)
+        self.live_stop_button.config(state=tk.NORMAL if live_running else tk.DISABLED)
+        self.bench_combobox.config(state='disabled' if live_running else 'readonly')
+
+    def fetch_data_for_variables(self, variables, progress=None):
+        """Liest nur die seit dem letzten Abruf neu protokollierten Zeilen (im Worker-Thread).
+
+        Gibt (neue Spalten, neu begonnen) zurück; neu begonnen ist der Abruf nach einem Wechsel der Variablen oder
+        wenn die SPS den Messwerte_DB überschrieben hat. Angehängt wird in on_data_fetched.
+        """
+        restarted = variables != self.reader.variables
+        if restarted:
+            self.reader = MesswerteLeser(self.session, variables, self.bench.messwerte_db, batch_size=self.batch_size)
+        buffer, rows_before = self.reader.data, self.reader.rows_fetched
+        self.reader.status_codes = {}
+        new_columns = self.reader.fetch_new(progress=progress)
+        restarted = restarted or bool(rows_before and self.reader.data is not buffer)
+        new_rows = len(next(iter(new_columns.values()))) if new_columns else 0
+        print(f"Fetched {new_rows} new rows ({self.reader.rows_fetched} total)")
+        self.status_codes = self.reader.status_codes
+        return new_columns, restarted
+
+    def start_live(self):
+        """Startet die Live-Erfassung: neue Messzeilen werden sofort protokolliert und angezeigt."""
+        self.data = None
+        self.table.clear()
+        self.table.follow = True
+        self.fetch_button.config(state=tk.DISABLED)
+        self.live_start_button.config(state=tk.DISABLED)
+        self.bench_combobox.config(state='disabled')
+        run_in_background(self.root, "Starting live mode...", self.start_live_job,
+                          on_done=self.on_live_started,
+                          on_error=lambda e: self.show_error("Failed to start live mode", e),
+                          on_finish=self.enable_buttons)
+
+    def start_live_job(self, job):
+        # Ein neues Protokoll wird als Dateiname in dieselbe Warteschlange gestellt, damit die Reihenfolge erhalten bleibt
+        live = LiveErfassung(self.session, self.variables, on_rows=self.live_rows.put, on_new_run=self.live_rows.put,
+                             db_name=self.bench.messwerte_db)
+        live.start()
+        if job.cancelled:
+            live.stop()
+            job.check_cancelled()
+        return live
+
+    def on_live_started(self, live):
+        self.live = live
+        self.start_live_run(self.live.log_path)
+        self.save_button.config(state=tk.NORMAL)
+        self.save_binary_button.config(state=tk.NORMAL)
+        self.save_points_button.config(state=tk.NORMAL if self.live_points else tk.DISABLED)
+        self.root.after(LIVE_GUI_INTERVAL, self.poll_live_rows)
+
+    def start_live_run(self, log_path):
+        """Beginnt Protokoll, Puffer und Arbeitspunkte einer Messung im Live-Modus neu."""
+        self.live_log_path = log_path
+        self.data = None
+        self.table.clear()
+        try:
+            # Arbeitspunkte werden während der Messung fortlaufend gemittelt
+            self.live_points = (mittelung.Arbeitspunktmittelung(self.variables), [])
+        except KeyError:
+            self.live_points = None
+
+    def stop_live(self):
+        if self.live is not None:
+            self.live.stop()
+            self.live = None
+        self.poll_live_rows()
+        self.enable_buttons()
+        self.table.follow = False
+
+    def poll_live_rows(self):
+        """Übernimmt die vom Hintergrund-Thread gelieferten Zeilen in die Tabelle."""
+        new_rows = False
+        while True:
+            try:
+                columns = self.live_rows.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(columns, str):
+                # Die SPS hat eine neue Messung begonnen, die bisherige bleibt in ihrem Protokoll
+                self.start_live_run(columns)
+                continue
+            if self.data is None:
+                self.data = Messpuffer(self.variables, {variable: columns[variable].dtype for variable in self.variables})
+            self.data.append(columns)
+            if self.live_points is not None:
+                points = self.live_points[0].add(columns)
+                if len(points):
+                    self.live_points[1].append(points)
+            new_rows = True
+        if new_rows:
+            self.table.set_data(self.data)
+            self.update_status()
+        if self.live is not None:
+            self.root.after(LIVE_GUI_INTERVAL, self.poll_live_rows)
 
     def display_data(self):
-        # Clear the table
-        self.tree.delete(*self.tree.get_children())
-        
-        # Setup columns
-        columns = list(self.data.keys())
-        self.tree["columns"] = columns
-        for col in columns:
-            self.tree.heading(col, text=col)
-        
-        # Populate rows
-        for i in range(len(self.data[columns[0]])):
-            row_data = [self.data[col][i] for col in columns]
-            if any(val != 0 for val in row_data):  # Filter out rows where all values are zero
-                self.tree.insert("", "end", values=row_data)
+        # Rows where all values are zero are filtered out by the buffer
+        self.table.set_data(self.data)
+        self.update_status()
+
+    def update_status(self):
+        if self.data is not None:
+            text = self.data.memory_report()
+            if self.live_points is not None:
+                text += f", {sum(len(points) for points in self.live_points[1])} operating points completed"
+            self.status_label.config(text=text)
 
     def save_to_csv(self):
-        if self.data:
+        if self.live_log_path:
+            # Im Live-Modus liegen die Daten bereits auf der Festplatte, es wird nur das Protokoll kopiert
+            file_path = filedialog.asksaveasfilename(defaultextension=".csv",
+                                                     filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+            if file_path:
+                try:
+                    shutil.copyfile(self.live_log_path, file_path)
+                    messagebox.showinfo("Success", "Data successfully saved to CSV.")
+                except Exception as e:
+                    messagebox.showerror("Error", f"Failed to save data: {str(e)}")
+        elif self.data is not None and len(self.data):
             try:
-                df = pd.DataFrame(self.data)
-                # Remove rows where all values are zero
-                df = df.loc[~(df == 0).all(axis=1)]
+                # Rows where all values are zero are removed by the buffer
+                df = self.data.to_dataframe()
                 file_path = filedialog.asksaveasfilename(defaultextension=".csv",
                                                        filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
                 if file_path:
@@ -161,9 +304,58 @@ class OPCUAGUI:
         else:
             messagebox.showwarning("No Data", "No data to save.")
 
+    def save_points(self):
+        """Speichert eine Zeile je Arbeitspunkt (Mittelwert, Streuung, Min, Max ab dem Einschwingen)."""
+        try:
+            if self.live_points is not None:
+                # Der noch laufende Arbeitspunkt wird erst mit der nächsten Sollwertänderung bzw. am Ende abgeschlossen
+                mittelung_live, frames = self.live_points
+                if self.live is None:
+                    frames.append(mittelung_live.finish())
+                frames = [points for points in frames if len(points)]
+                points = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+            elif self.data is not None and len(self.data):
+                points_mittelung = mittelung.Arbeitspunktmittelung(self.variables)
+                points = pd.concat([points_mittelung.add(self.data.view()), points_mittelung.finish()], ignore_index=True)
+            else:
+                points = pd.DataFrame()
+        except KeyError as e:
+            messagebox.showerror("Error", f"Cannot determine operating points: {e}")
+            return
+        if points.empty:
+            messagebox.showwarning("No Data", "No operating points to save.")
+            return
+        file_path = filedialog.asksaveasfilename(defaultextension=".csv",
+                                                 filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if file_path:
+            try:
+                points.to_csv(file_path, index=False)
+                messagebox.showinfo("Success", f"{len(points)} operating points saved.")
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to save data: {str(e)}")
+
+    def save_to_binary(self):
+        """Speichert den Messlauf typisiert im Binärformat (eine .npy-Datei je Variable plus Metadaten).
+
+        Verweilzeit und Messungen je Arbeitspunkt werden aus dem Dateinamen übernommen, z.B. Messung1_8000ms_20Messung.
+        """
+        if self.data is None or not len(self.data):
+            messagebox.showwarning("No Data", "No data to save.")
+            return
+        file_path = filedialog.asksaveasfilename(defaultextension=messlauf_datei.BINARY_SUFFIX,
+                                                 filetypes=[("Measurement runs", f"*{messlauf_datei.BINARY_SUFFIX}"),
+                                                            ("All files", "*.*")])
+        if file_path:
+            try:
+                messlauf_datei.save_run(file_path, self.data.view())
+                messagebox.showinfo("Success", "Data successfully saved.")
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to save data: {str(e)}")
+
 def main():
     root = tk.Tk()
     app = OPCUAGUI(root)
+    root.protocol("WM_DELETE_WINDOW", lambda: (app.stop_live(), root.destroy()))
     root.mainloop()
 
 if __name__ == "__main__":
@@ -1,77 +1,40 @@
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from tkinter import filedialog, messagebox
 import pandas as pd
 import os
+from tabelle import VirtualTable
+import arbeitspunkte_generator as generator
+import messlauf_datei
+import reihenfolge
+import verfeinerung
 
 # Datei für Standardwerte
-DEFAULT_VALUES_CSV = 'default_values.csv'
+DEFAULT_VALUES_CSV = generator.KENNFELD_DEFAULTS_CSV
 
 # Standardwerte
-default_values = {
-    'speed_start': 100,
-    'speed_end': 2500,
-    'speed_step': 100,
-    'torque_start': 5,
-    'torque_end': 70,
-    'torque_step': 5,
-    'torque_limits': "1200=65,1300=60,1400=55,1500=50,1600=45,1700=40,1800=40,1900=35,2000=35,2100=30,2200=30,2300=25,2400=25,2500=25"
-}
+default_values = dict(generator.KENNFELD_DEFAULTS)
 
 df_global = None
 
 def load_default_values():
     """Lädt die Standardwerte aus der CSV-Datei oder verwendet Standardwerte."""
     if os.path.exists(DEFAULT_VALUES_CSV):
-        try:
-            df = pd.read_csv(DEFAULT_VALUES_CSV)
-            for key in default_values.keys():
-                if key in df.columns:
-                    default_values[key] = df[key].iloc[0]
-        except pd.errors.EmptyDataError:
-            pass
+        default_values.update(generator.load_default_values(DEFAULT_VALUES_CSV, default_values))
     else:
         save_default_values()
 
 def save_default_values():
     """Speichert die Standardwerte in der CSV-Datei."""
-    df = pd.DataFrame(default_values, index=[0])
-    df.to_csv(DEFAULT_VALUES_CSV, index=False)
+    generator.save_default_values(DEFAULT_VALUES_CSV, default_values)
 
 def generate_and_show_table():
     global df_global
     try:
         # Eingabewerte aus der GUI holen
-        speed_start = int(speed_start_var.get())
-        speed_end = int(speed_end_var.get())
-        speed_step = int(speed_step_var.get())
-
-        torque_start = int(torque_start_var.get())
-        torque_end = int(torque_end_var.get())
-        torque_step = int(torque_step_var.get())
-
-        # Drehzahlbereich und Drehmomentbereich erstellen
-        speeds = range(speed_start, speed_end + speed_step, speed_step)
-        torques = range(torque_start, torque_end + torque_step, torque_step)
-
-        # Begrenzung der Maximalwerte des Drehmoments bei hohen Drehzahlen
-        torque_limitations = {}
-        for entry in torque_limits_var.get().split(','):
-            speed, limit = map(int, entry.split('='))
-            torque_limitations[speed] = limit
-
-        # Erstelle eine leere Liste für die Tabelle
-        table_data = []
-
-        # Generiere die Tabelle
-        for torque in torques:
-            row = [torque]
-            for n in speeds:
-                limited_torque = min(torque, torque_limitations.get(n, torque))
-                row.append((n, limited_torque))
-            table_data.append(row)
-
-        columns = ["n/M"] + list(speeds)
-        df_global = pd.DataFrame(table_data, columns=columns)
+        df_global = generator.kennfeld_tabelle(
+            speed_start_var.get(), speed_end_var.get(), speed_step_var.get(),
+            torque_start_var.get(), torque_end_var.get(), torque_step_var.get(),
+            torque_limits_var.get())
 
         show_table()
     except ValueError:
@@ -83,22 +46,9 @@ def show_table():
         table_window = tk.Toplevel(root)
         table_window.title("Erzeugte Tabelle")
 
-        tree = ttk.Treeview(table_window, columns=list(df_global.columns), show='headings')
-
-        for col in df_global.columns:
-            tree.heading(col, text=col)
-            tree.column(col, width=100, anchor='center')
-
-        for index, row in df_global.iterrows():
-            tree.insert('', 'end', values=list(row))
-
-        vsb = ttk.Scrollbar(table_window, orient="vertical", command=tree.yview)
-        hsb = ttk.Scrollbar(table_window, orient="horizontal", command=tree.xview)
-        tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
-
-        tree.pack(side='left', fill='both', expand=True)
-        vsb.pack(side='right', fill='y')
-        hsb.pack(side='bottom', fill='x')
+        table = VirtualTable(table_window)
+        table.pack(fill='both', expand=True)
+        table.set_data(df_global)
 
 def save_csv():
     if df_global is not None:
@@ -106,40 +56,75 @@ def save_csv():
         if file_path:
             df_global.to_csv(file_path, index=False)
 
+def ask_strategy(list_df, model):
+    """Fragt nach der Reihenfolge der Arbeitspunkte; je Strategie wird die geschätzte Prüfstandszeit angezeigt."""
+    comparison = reihenfolge.compare_strategies(list_df, model)
+
+    dialog = tk.Toplevel(root)
+    dialog.title("Sortierreihenfolge")
+    dialog.transient(root)
+    dialog.grab_set()
+    tk.Label(dialog, text="Reihenfolge der Arbeitspunkte (geschätzte Prüfstandszeit):", font=('Arial', 10, 'bold')).pack(anchor='w', padx=10, pady=5)
+
+    # Schnellste Strategie ist vorausgewählt
+    strategy = tk.StringVar(dialog, value=comparison['strategy'][0])
+    for _, row in comparison.iterrows():
+        text = f"{row['strategy']}: {reihenfolge.format_duration(row['total'])} h"
+        if row['cooling'] > 0:
+            text += f" (davon Abkühlen {reihenfolge.format_duration(row['cooling'])} h)"
+        tk.Radiobutton(dialog, text=text, variable=strategy, value=row['strategy']).pack(anchor='w', padx=10)
+
+    result = {}
+    buttons = tk.Frame(dialog)
+    buttons.pack(pady=10)
+    tk.Button(buttons, text="OK", command=lambda: (result.update(strategy=strategy.get()), dialog.destroy())).pack(side=tk.LEFT, padx=5)
+    tk.Button(buttons, text="Abbrechen", command=dialog.destroy).pack(side=tk.LEFT, padx=5)
+    dialog.wait_window()
+    return result.get('strategy')
+
 def save_list_as_csv():
     if df_global is not None:
-        # Benutzer nach der Sortierreihenfolge fragen
-        sort_choice = messagebox.askquestion("Sortierreihenfolge", "Möchten Sie nach Drehmoment (Ja) oder Drehzahl (Nein) sortieren?")
-
-        list_data = set()
-        removed_duplicates_count = 0
+        list_df, removed_duplicates_count = generator.kennfeld_liste(df_global)
 
-        for _, row in df_global.iterrows():
-            torque = row["n/M"]
-            for n, torque_value in zip(df_global.columns[1:], row[1:]):
-                new_point = (torque_value[1], n)
-                if new_point in list_data:
-                    removed_duplicates_count += 1
-                else:
-                    list_data.add(new_point)
-
-        list_df = pd.DataFrame(list(list_data), columns=["Drehmoment", "Drehzahl"])
-
-        if sort_choice == "yes":
-            list_df = list_df.sort_values(by=["Drehmoment", "Drehzahl"])
-        else:
-            list_df = list_df.sort_values(by=["Drehzahl", "Drehmoment"])
-
-        list_df.reset_index(drop=True, inplace=True)
-        list_df.index = list_df.index + 1  # Index auf 1 basieren
-        list_df.index.name = 'Index'
+        # Benutzer nach der Sortierreihenfolge fragen (Kostenmodell aus kostenmodell.csv)
+        model = reihenfolge.load_cost_model()
+        strategy = ask_strategy(list_df, model)
+        if strategy is None:
+            return
+        list_df = reihenfolge.order_points(list_df, strategy, model)
 
         file_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")], title="Liste speichern")
         if file_path:
-            list_df.to_csv(file_path, index=True)
+            list_df.to_csv(file_path, index=False)
             messagebox.showinfo("Info", f"CSV-Datei gespeichert. {removed_duplicates_count} doppelte Arbeitspunkte entfernt.")
             show_saved_list(file_path)
 
+def save_refinement_list():
+    """Verfeinerungsliste aus bereits gemessenen Messläufen: neue Punkte nur, wo sich eta oder Verluste stark ändern."""
+    paths = messlauf_datei.selected_runs(filedialog.askopenfilenames(filetypes=messlauf_datei.DIALOG_FILETYPES,
+                                                                     title="Messläufe für die Verfeinerung wählen"))
+    if not paths:
+        return
+    try:
+        list_df, measured_count = verfeinerung.refinement_list(paths, torque_limits=torque_limits_var.get())
+    except (KeyError, ValueError) as e:
+        messagebox.showerror("Fehler", f"Messlauf kann nicht ausgewertet werden: {e}")
+        return
+    if list_df.empty:
+        messagebox.showinfo("Info", f"{measured_count} gemessene Arbeitspunkte, die Zielgenauigkeit ist bereits erreicht.")
+        return
+
+    model = reihenfolge.load_cost_model()
+    strategy = ask_strategy(list_df, model)
+    if strategy is None:
+        return
+    list_df = reihenfolge.order_points(list_df, strategy, model)
+
+    file_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")], title="Verfeinerungsliste speichern")
+    if file_path:
+        list_df.to_csv(file_path, index=False)
+        messagebox.showinfo("Info", f"{len(list_df)} neue Arbeitspunkte zu {measured_count} gemessenen gespeichert.")
+        show_saved_list(file_path)
 
 def show_saved_list(file_path):
     list_window = tk.Toplevel(root)
@@ -147,22 +132,9 @@ def show_saved_list(file_path):
 
     df_list = pd.read_csv(file_path)
 
-    tree = ttk.Treeview(list_window, columns=list(df_list.columns), show='headings')
-
-    for col in df_list.columns:
-        tree.heading(col, text=col)
-        tree.column(col, width=100, anchor='center')
-
-    for _, row in df_list.iterrows():
-        tree.insert('', 'end', values=list(row))
-
-    vsb = ttk.Scrollbar(list_window, orient="vertical", command=tree.yview)
-    hsb = ttk.Scrollbar(list_window, orient="horizontal", command=tree.xview)
-    tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
-
-    tree.pack(side='left', fill='both', expand=True)
-    vsb.pack(side='right', fill='y')
-    hsb.pack(side='bottom', fill='x')
+    table = VirtualTable(list_window)
+    table.pack(fill='both', expand=True)
+    table.set_data(df_list)
 
 def on_closing():
     save_default_values()
@@ -221,6 +193,9 @@ def main():
     save_list_button = tk.Button(frame, text="Liste als CSV speichern", command=save_list_as_csv)
     save_list_button.grid(row=13, column=0, columnspan=2, pady=5)
 
+    refinement_button = tk.Button(frame, text="Verfeinerung aus Messung", command=save_refinement_list)
+    refinement_button.grid(row=14, column=0, columnspan=2, pady=5)
+
     root.protocol("WM_DELETE_WINDOW", on_closing)
     root.mainloop()
 
@@ -0,0 +1,167 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Dateien für Standardwerte
+KENNFELD_DEFAULTS_CSV = 'default_values.csv'
+STROMWINKEL_DEFAULTS_CSV = 'default_values_stromwinkel.csv'
+
+# Standardwerte Kennfeld
+KENNFELD_DEFAULTS = {
+    'speed_start': 100,
+    'speed_end': 2500,
+    'speed_step': 100,
+    'torque_start': 5,
+    'torque_end': 70,
+    'torque_step': 5,
+    'torque_limits': "1200=65,1300=60,1400=55,1500=50,1600=45,1700=40,1800=40,1900=35,2000=35,2100=30,2200=30,2300=25,2400=25,2500=25"
+}
+
+# Standardwerte Stromwinkel
+STROMWINKEL_DEFAULTS = {
+    'speed': 500,  # konstante Drehzahl
+    'current_start': 1,
+    'current_end': 20,
+    'current_step': 1,
+    'angle_values': "0,40,42,44,46,48,50,52,54,56,58,60,62,64,66,68,70,72,74,76,78,80,82,84,86,88,90"
+}
+
+def load_default_values(csv_file, defaults):
+    """Gibt die Standardwerte zurück, ergänzt um die Werte aus der CSV-Datei (falls vorhanden)."""
+    values = dict(defaults)
+    if os.path.exists(csv_file):
+        try:
+            df = pd.read_csv(csv_file)
+            for key in values.keys():
+                if key in df.columns:
+                    values[key] = df[key].iloc[0]
+        except pd.errors.EmptyDataError:
+            pass
+    return values
+
+def save_default_values(csv_file, values):
+    """Speichert die Standardwerte in der CSV-Datei."""
+    df = pd.DataFrame(values, index=[0])
+    df.to_csv(csv_file, index=False)
+
+def parse_torque_limits(torque_limits):
+    """Wandelt "1200=65,1300=60" in ein Dict Drehzahl -> maximales Drehmoment um."""
+    if isinstance(torque_limits, dict):
+        return torque_limits
+    torque_limitations = {}
+    for entry in str(torque_limits).split(','):
+        if entry.strip():
+            speed, limit = map(int, entry.split('='))
+            torque_limitations[speed] = limit
+    return torque_limitations
+
+def parse_angles(angle_values):
+    if isinstance(angle_values, str):
+        return list(map(int, angle_values.split(',')))
+    return [int(angle) for angle in angle_values]
+
+def torque_limit_curve(speeds, torque_limits):
+    """Maximales Drehmoment je Drehzahl aus den Stützstellen der Feldschwächung.
+
+    Zwischen den Stützstellen wird linear interpoliert, oberhalb der letzten gilt deren Grenze.
+    Unterhalb der ersten Stützstelle gibt es keine Begrenzung (unendlich).
+    """
+    speeds = np.asarray(speeds, dtype=float)
+    limits = parse_torque_limits(torque_limits)
+    if not limits:
+        return np.full(speeds.shape, np.inf)
+    limit_speeds = np.array(sorted(limits), dtype=float)
+    limit_values = np.array([limits[speed] for speed in sorted(limits)], dtype=float)
+    curve = np.interp(speeds, limit_speeds, limit_values)
+    curve[speeds < limit_speeds[0]] = np.inf
+    return curve
+
+def kennfeld_gitter(speed_start, speed_end, speed_step, torque_start, torque_end, torque_step, torque_limits=""):
+    """Erzeugt das Gitter Drehzahl x Drehmoment und begrenzt es auf die Feldschwächkurve.
+
+    Gibt (Drehzahlen, Drehmomente, begrenzte Drehmomente als Array [Drehmoment, Drehzahl]) zurück.
+    """
+    speed_start, speed_end, speed_step = int(speed_start), int(speed_end), int(speed_step)
+    torque_start, torque_end, torque_step = int(torque_start), int(torque_end), int(torque_step)
+    if speed_step <= 0 or torque_step <= 0:
+        raise ValueError("Schrittweite muss größer als 0 sein")
+
+    # Drehzahlbereich und Drehmomentbereich erstellen (Ende inklusive)
+    speeds = np.arange(speed_start, speed_end + speed_step, speed_step)
+    torques = np.arange(torque_start, torque_end + torque_step, torque_step)
+
+    # Begrenzung der Maximalwerte des Drehmoments bei hohen Drehzahlen
+    limited = np.minimum(torques[:, np.newaxis], torque_limit_curve(speeds, torque_limits)[np.newaxis, :])
+    limited = np.round(limited, 3)
+    return speeds, torques, limited
+
+def _as_list(speeds, limited, sort_by):
+    """Flache, duplikatfreie Liste (index, drehzahl, drehmoment) aus dem begrenzten Gitter."""
+    speed_grid = np.broadcast_to(speeds[np.newaxis, :], limited.shape).ravel()
+    torque_grid = limited.ravel()
+    # Sortieren (lexsort: letzter Schlüssel ist der primäre) und gleiche Nachbarn entfernen, wie np.unique
+    if sort_by == "drehmoment":
+        order = np.lexsort((speed_grid, torque_grid))
+    else:
+        order = np.lexsort((torque_grid, speed_grid))
+    speed_sorted, torque_sorted = speed_grid[order], torque_grid[order]
+    keep = np.ones(len(order), dtype=bool)
+    keep[1:] = (np.diff(speed_sorted) != 0) | (np.diff(torque_sorted) != 0)
+    speed_sorted, torque_sorted = speed_sorted[keep], torque_sorted[keep]
+    removed_duplicates_count = len(order) - len(speed_sorted)
+
+    if np.all(torque_sorted == np.round(torque_sorted)):
+        torque_sorted = torque_sorted.astype(int)
+    list_df = pd.DataFrame({
+        "index": np.arange(1, len(speed_sorted) + 1),  # Index auf 1 basieren
+        "drehzahl": speed_sorted.astype(int),
+        "drehmoment": torque_sorted,
+    })
+    return list_df, removed_duplicates_count
+
+def kennfeld_tabelle(speed_start, speed_end, speed_step, torque_start, torque_end, torque_step, torque_limits=""):
+    """Erzeugt die Kennfeld-Tabelle: eine Zeile je Drehmoment, eine Spalte je Drehzahl mit dem begrenzten Drehmoment."""
+    speeds, torques, limited = kennfeld_gitter(speed_start, speed_end, speed_step,
+                                               torque_start, torque_end, torque_step, torque_limits)
+    tabelle = pd.DataFrame(limited, columns=speeds.tolist())
+    if np.all(limited == np.round(limited)):
+        tabelle = tabelle.astype(int)
+    tabelle.insert(0, "n/M", torques)
+    return tabelle
+
+def kennfeld_liste(tabelle, sort_by="drehmoment"):
+    """Erzeugt aus der Kennfeld-Tabelle die Liste der Arbeitspunkte (index, drehzahl, drehmoment) für den Upload.
+
+    Doppelte Arbeitspunkte (durch die Drehmomentbegrenzung) werden entfernt. Gibt (Liste, Anzahl entfernter
+    Duplikate) zurück. sort_by ist "drehmoment" oder "drehzahl".
+    """
+    speeds = np.asarray(tabelle.columns[1:], dtype=float)
+    limited = tabelle.iloc[:, 1:].to_numpy(dtype=float)
+    return _as_list(speeds, limited, sort_by)
+
+def kennfeld_punkte(speed_start, speed_end, speed_step, torque_start, torque_end, torque_step, torque_limits="",
+                    sort_by="drehmoment"):
+    """Erzeugt die Liste der Arbeitspunkte direkt aus den Parametern (ohne Tabelle).
+
+    Gibt (Liste, Anzahl entfernter Duplikate) zurück.
+    """
+    speeds, _, limited = kennfeld_gitter(speed_start, speed_end, speed_step,
+                                         torque_start, torque_end, torque_step, torque_limits)
+    return _as_list(speeds, limited, sort_by)
+
+def stromwinkel_liste(speed, current_start, current_end, current_step, angle_values):
+    """Erzeugt die Arbeitspunkte der Stromwinkel-Messung (index, drehzahl, strom_effektiv, stromwinkel)."""
+    speed = int(speed)
+    current_start, current_end, current_step = int(current_start), int(current_end), int(current_step)
+    angle_values = parse_angles(angle_values)
+
+    currents = range(current_start, current_end + current_step, current_step)
+
+    table_data = []
+    index = 1
+    for current in currents:
+        for angle in angle_values:
+            table_data.append([index, speed, current, angle])
+            index += 1
+
+    return pd.DataFrame(table_data, columns=["index", "drehzahl", "strom_effektiv", "stromwinkel"])
@@ -0,0 +1,165 @@
+import numpy as np
+
+# Blöcke je Stufe der Auflösungspyramide: jede Stufe fasst so viele Blöcke der vorherigen zusammen
+LEVEL_FACTOR = 4
+
+# Eine Stufe wird nur verwendet, wenn auf jedes Pixel mindestens so viele Blöcke fallen (Fehler < 1 Pixel)
+BLOCKS_PER_PIXEL = 4
+
+# Die gröbste Stufe hat noch mindestens so viele Blöcke (kürzere Messläufe bekommen keine Pyramide)
+MIN_LEVEL_BLOCKS = 1024
+
+def minmax_indices(values, buckets):
+    """Indizes von Minimum und Maximum je Bucket (gleich viele Werte je Bucket), aufsteigend sortiert.
+
+    Erster und letzter Wert bleiben immer erhalten. Ist values nicht länger als 2 · buckets, werden alle
+    Indizes zurückgegeben. NaN zählt weder als Minimum noch als Maximum.
+    """
+    values = np.asarray(values)
+    n = len(values)
+    if n <= 2 * buckets:
+        return np.arange(n)
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    width = int(np.max(np.diff(edges)))
+    # Buckets gleicher Breite als Matrix, die kürzeren mit dem letzten Wert ihres Buckets aufgefüllt
+    positions = np.minimum(edges[:-1, np.newaxis] + np.arange(width), edges[1:, np.newaxis] - 1)
+    block = values[positions].astype(float)
+    finite = np.isfinite(block)
+    lows = np.argmin(np.where(finite, block, np.inf), axis=1)
+    highs = np.argmax(np.where(finite, block, -np.inf), axis=1)
+    rows = np.arange(buckets)
+    indices = np.concatenate(([0], positions[rows, lows], positions[rows, highs], [n - 1]))
+    return np.unique(indices)
+
+def lttb_indices(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: threshold Punkte, die den Linienverlauf optisch am besten erhalten.
+
+    Je Bucket wird der Punkt gewählt, der mit dem zuvor gewählten Punkt und dem Mittelwert des nächsten
+    Buckets das größte Dreieck aufspannt. Gibt die Indizes aufsteigend zurück.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    # Mittelwerte aller Buckets vorab (der letzte "nächste Bucket" ist der Endpunkt)
+    sums_x, sums_y = np.add.reduceat(x[1:n - 1], edges[:-1] - 1), np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    mean_x = np.append(sums_x / counts, x[-1])
+    mean_y = np.append(sums_y / counts, y[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        areas = np.abs((x[previous] - mean_x[bucket + 1]) * (y[start:stop] - y[previous]) -
+                       (x[previous] - x[start:stop]) * (mean_y[bucket + 1] - y[previous]))
+        previous = start + int(np.nanargmax(areas)) if np.isfinite(areas).any() else start
+        selected[bucket + 1] = previous
+    return selected
+
+class Aufloesungspyramide:
+    """Vorberechnete Minima und Maxima einer Messgröße in Blöcken von LEVEL_FACTOR^k Werten.
+
+    Für einen Ausschnitt wird die gröbste Stufe gewählt, die noch BLOCKS_PER_PIXEL Blöcke je Pixel hat;
+    deren Minimum- und Maximum-Indizes werden dann auf die Pixel reduziert. Eine Abfrage kostet damit
+    unabhängig von der Länge des Messlaufs nur einige tausend Werte.
+    """
+
+    def __init__(self, values):
+        self.values = np.asarray(values)
+        self.levels = []   # je Stufe (Blockgröße, Indizes der Minima, Indizes der Maxima)
+        data = self.values.astype(float)
+        lows = highs = np.arange(len(data))
+        size = 1
+        while len(lows) >= LEVEL_FACTOR * MIN_LEVEL_BLOCKS:
+            lows = self._reduce(lows, data, np.argmin, np.inf)
+            highs = self._reduce(highs, data, np.argmax, -np.inf)
+            size *= LEVEL_FACTOR
+            self.levels.append((size, lows, highs))
+
+    @staticmethod
+    def _reduce(indices, data, select, fill):
+        # Je LEVEL_FACTOR Blöcke den Index des kleinsten bzw. größten Werts übernehmen
+        count = -(-len(indices) // LEVEL_FACTOR) * LEVEL_FACTOR
+        padded = np.concatenate((indices, np.full(count - len(indices), indices[-1])))
+        groups = padded.reshape(-1, LEVEL_FACTOR)
+        block = data[groups]
+        block = np.where(np.isfinite(block), block, fill)
+        return groups[np.arange(len(groups)), select(block, axis=1)]
+
+    def candidates(self, start, stop, pixels):
+        """Indizes zwischen start und stop (ohne stop), die Minimum und Maximum jedes Pixels enthalten."""
+        samples = stop - start
+        for size, lows, highs in reversed(self.levels):
+            if samples // size >= BLOCKS_PER_PIXEL * pixels:
+                first, last = start // size, -(-stop // size)
+                indices = np.concatenate((lows[first:last], highs[first:last], [start, stop - 1]))
+                return np.unique(indices[(indices >= start) & (indices < stop)])
+        return np.arange(start, stop)
+
+class Verlauf:
+    """Messgrößen über einer x-Spalte mit Auflösungspyramiden für schnelles Zoomen.
+
+    columns ist ein Dict Spaltenname -> Array (z.B. messlauf_datei.load_run). Pyramiden werden je Spalte beim
+    ersten Zeichnen aufgebaut und danach für jeden Ausschnitt wiederverwendet.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+        self._pyramids = {}
+        self._monotonic = {}
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def x_values(self, x_column):
+        return np.arange(len(self)) if x_column is None else np.asarray(self.columns[x_column])
+
+    def pyramid(self, column):
+        if column not in self._pyramids:
+            self._pyramids[column] = Aufloesungspyramide(self.columns[column])
+        return self._pyramids[column]
+
+    def is_monotonic(self, x_column):
+        if x_column is None:
+            return True
+        if x_column not in self._monotonic:
+            x = self.x_values(x_column)
+            self._monotonic[x_column] = bool(len(x) < 2 or np.all(np.diff(x) >= 0))
+        return self._monotonic[x_column]
+
+    def query(self, x_column, y_column, pixels, x_range=None, method='minmax'):
+        """Punkte (x, y) der Kurve y über x für einen Ausschnitt mit pixels Bildpunkten Breite.
+
+        x_column=None steht für die Zeilennummer. method 'minmax' erhält Minimum und Maximum je Pixel
+        (Spitzen gehen nie verloren), 'lttb' liefert pixels Punkte nach Largest-Triangle-Three-Buckets.
+        Ist x nicht monoton (z.B. M über n), werden Minima und Maxima von x und y erhalten; die Punkte werden
+        dann nicht verbunden dargestellt.
+        """
+        x = self.x_values(x_column)
+        y = np.asarray(self.columns[y_column])
+        pixels = max(int(pixels), 1)
+        if self.is_monotonic(x_column):
+            start, stop = 0, len(x)
+            if x_range is not None:
+                # Einen Punkt über den Rand hinaus, damit die Linie bis an den Rand des Ausschnitts reicht
+                start = max(int(np.searchsorted(x, x_range[0], side='left')) - 1, 0)
+                stop = min(int(np.searchsorted(x, x_range[1], side='right')) + 1, len(x))
+            indices = self.pyramid(y_column).candidates(start, stop, pixels)
+        else:
+            if x_range is None:
+                indices = np.union1d(self.pyramid(y_column).candidates(0, len(x), pixels),
+                                     self.pyramid(x_column).candidates(0, len(x), pixels))
+            else:
+                # Ohne Sortierung lässt sich der Ausschnitt nicht per Pyramide eingrenzen: eine Maske über alle Zeilen
+                indices = np.flatnonzero((x >= x_range[0]) & (x <= x_range[1]))
+                indices = indices[np.union1d(minmax_indices(y[indices], BLOCKS_PER_PIXEL * pixels),
+                                             minmax_indices(x[indices], BLOCKS_PER_PIXEL * pixels))]
+        if method == 'lttb':
+            indices = indices[lttb_indices(x[indices], y[indices], pixels)]
+        else:
+            indices = indices[minmax_indices(y[indices], pixels)]
+        return x[indices], y[indices]
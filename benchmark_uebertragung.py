@@ -0,0 +1,145 @@
+"""Benchmark der Übertragung zur SPS: Upload der Arbeitspunktliste und Auslesen der Messwerte.
+
+Ohne --url wird ein lokaler SPS-Simulator mit der angegebenen Latenz und Bandbreite gestartet. Mit --url wird
+gegen eine laufende SPS gemessen; der Upload überschreibt dort den Messpunkte_DB (nur ohne laufende Messung).
+
+Beispiel:
+    python benchmark_uebertragung.py --latency 0.002 --bandwidth 1e6 -o benchmark.csv
+    python benchmark_uebertragung.py --url opc.tcp://192.168.0.1:4840 --skip-upload
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import sps_simulator
+import sps_upload
+import sps_verbindung
+from messwerte_leser import MesswerteLeser, DEFAULT_VARIABLES
+
+LIST_LENGTHS = [10, 100, 500, 1000]
+ROW_COUNTS = [10, 100, 1000]
+VARIABLE_COUNTS = [4, 11, 22]
+BATCH_SIZES = [10, sps_verbindung.READ_BATCH_SIZE]
+REPEAT = 5
+
+def benchmark_liste(length, rng):
+    """Kennfeld-Liste mit length Arbeitspunkten."""
+    return pd.DataFrame({'index': np.arange(1, length + 1), 'drehzahl': rng.uniform(0, 6000, length).round(),
+                         'drehmoment': rng.uniform(-50, 50, length).round(1)})
+
+def measure(function, repeat, service=None):
+    """Führt function repeat-mal aus; gibt (Median, Minimum der Dauer in s, Anfragen je Aufruf) zurück."""
+    durations = []
+    requests = service.requests if service is not None else 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    per_call = (service.requests - requests) / repeat if service is not None else np.nan
+    return statistics.median(durations), min(durations), per_call
+
+def result_row(test, median, minimum, requests, values, rows=None, variables=None, batch_size=None):
+    return {'test': test, 'zeilen': rows, 'variablen': variables, 'batch': batch_size, 'werte': values,
+            'median_s': median, 'min_s': minimum, 'werte_pro_s': values / median if median > 0 else np.nan,
+            'anfragen': requests}
+
+def benchmark_upload(session, lengths, repeat, service=None):
+    """Upload (vollständig, mit Prüfung, Delta mit einem geänderten Punkt) je Listenlänge."""
+    rng = np.random.default_rng(0)
+    results = []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = sps_upload.UploadCache(cache_dir)
+        for length in lengths:
+            liste = benchmark_liste(length, rng)
+            # Ein vollständiger Upload schreibt immer die ganzen Arrays
+            values = 3 * sps_upload.ARRAY_SIZE
+            results.append(result_row('upload', *measure(lambda: sps_upload.upload_list(session, liste), repeat, service),
+                                      values, rows=length))
+            results.append(result_row('upload_verify',
+                                      *measure(lambda: sps_upload.upload_list(session, liste, verify=True), repeat, service),
+                                      values, rows=length))
+
+            # Die Uploads ohne Cache haben den Messpunkte_DB überschrieben
+            cache.invalidate(session.url, sps_upload.MESSPUNKTE_DB)
+            sps_upload.upload_list(session, liste, cache=cache)
+            def upload_changed_point():
+                liste.loc[rng.integers(length), 'drehmoment'] += 1
+                sps_upload.upload_list(session, liste, cache=cache)
+            results.append(result_row('upload_delta', *measure(upload_changed_point, repeat, service), 1, rows=length))
+    return results
+
+def benchmark_readout(session, row_counts, variable_counts, batch_sizes, repeat, service=None):
+    """Zeilenanzahl und Auslesen von rows Zeilen je Variablenanzahl und Batchgröße (wie MesswerteLeser)."""
+    results = []
+    leser = MesswerteLeser(session, DEFAULT_VARIABLES)
+    def read_row_count():
+        leser.reset()
+        leser.read_row_count()
+    results.append(result_row('zeilenanzahl', *measure(read_row_count, repeat, service), 0))
+    for rows in row_counts:
+        for count in variable_counts:
+            for batch_size in batch_sizes:
+                leser = MesswerteLeser(session, DEFAULT_VARIABLES[:count], batch_size=batch_size)
+                results.append(result_row('auslesen', *measure(lambda: leser.fetch_range(0, rows), repeat, service),
+                                          rows * count, rows, count, batch_size))
+    return results
+
+def simulated_messwerte(rows):
+    """Messwerte_DB-Inhalt mit rows Zeilen für den Simulator."""
+    rng = np.random.default_rng(0)
+    columns = {variable: rng.normal(100, 10, rows) for variable in DEFAULT_VARIABLES}
+    columns['index'] = np.arange(1, rows + 1)
+    return columns
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark für Upload und Auslesen über OPC-UA")
+    parser.add_argument('--url', help="laufende SPS statt des lokalen Simulators")
+    parser.add_argument('--port', type=int, default=4850, help="Port des lokalen Simulators")
+    parser.add_argument('--latency', type=float, default=0.0, help="Simulator: Wartezeit je Anfrage (s)")
+    parser.add_argument('--bandwidth', type=float, help="Simulator: Nutzdaten je Sekunde (Byte/s)")
+    parser.add_argument('--no-index-range', action='store_true', help="Simulator: IndexRange ignorieren")
+    parser.add_argument('--list-lengths', type=int, nargs='+', default=LIST_LENGTHS)
+    parser.add_argument('--rows', type=int, nargs='+', default=ROW_COUNTS, help="ausgelesene Zeilen")
+    parser.add_argument('--variables', type=int, nargs='+', default=VARIABLE_COUNTS, help="Anzahl Variablen")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=BATCH_SIZES)
+    parser.add_argument('--repeat', type=int, default=REPEAT, help="Wiederholungen je Messung (Median)")
+    parser.add_argument('--skip-upload', action='store_true')
+    parser.add_argument('--skip-readout', action='store_true')
+    parser.add_argument('-o', '--output', help="Ergebnisse als CSV")
+    args = parser.parse_args(argv)
+
+    simulator = None
+    url = args.url
+    if url is None:
+        simulator = sps_simulator.SPSSimulator(f"opc.tcp://127.0.0.1:{args.port}", args.latency, args.bandwidth,
+                                               not args.no_index_range,
+                                               messwerte_size=max([sps_simulator.MESSWERTE_ARRAY_SIZE] + args.rows))
+        simulator.start()
+        simulator.set_messwerte(simulated_messwerte(max(args.rows)))
+        url = simulator.url
+    service = simulator.service if simulator is not None else None
+    try:
+        session = sps_verbindung.get_session(url)
+        session.connect()
+        results = []
+        if not args.skip_upload:
+            results += benchmark_upload(session, args.list_lengths, args.repeat, service)
+        if not args.skip_readout:
+            results += benchmark_readout(session, args.rows, args.variables, args.batch_sizes, args.repeat, service)
+    finally:
+        sps_verbindung.close_all_sessions()
+        if simulator is not None:
+            simulator.stop()
+
+    results = pd.DataFrame(results)
+    with pd.option_context('display.width', 200, 'display.max_rows', None):
+        print(results.to_string(index=False, float_format=lambda value: f"{value:.4g}"))
+    if args.output:
+        results.to_csv(args.output, index=False)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
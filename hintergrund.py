@@ -0,0 +1,123 @@
+import queue
+import threading
+import tkinter as tk
+from tkinter import ttk
+
+# Abfrageintervall für Fortschritt und Ergebnis im Tk-Hauptthread (ms)
+POLL_INTERVAL = 100
+
+class AuftragAbgebrochen(Exception):
+    """Wird im Worker-Thread ausgelöst, wenn der Benutzer den Auftrag abbricht."""
+
+class Hintergrundauftrag:
+    """Führt function(auftrag) in einem Worker-Thread aus und meldet Fortschritt und Ergebnis im Tk-Hauptthread.
+
+    Die Funktion meldet Fortschritt über auftrag.progress(done, total, text); dabei wird auch ein Abbruch
+    durch den Benutzer erkannt (AuftragAbgebrochen). on_done(result), on_error(exception), on_progress(done,
+    total, text) und on_finish() werden immer im Tk-Hauptthread aufgerufen.
+    """
+
+    def __init__(self, root, function, on_done=None, on_error=None, on_progress=None, on_finish=None):
+        self.root = root
+        self.function = function
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.on_finish = on_finish
+        self.cancel_event = threading.Event()
+        self._messages = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self.root.after(POLL_INTERVAL, self._poll)
+        return self
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise AuftragAbgebrochen("Vorgang abgebrochen")
+
+    def progress(self, done, total, text=""):
+        """Meldet den Fortschritt aus dem Worker-Thread (bricht ab, falls der Benutzer abgebrochen hat)."""
+        self._messages.put(('progress', (done, total, text)))
+        self.check_cancelled()
+
+    def _run(self):
+        try:
+            self._messages.put(('done', self.function(self)))
+        except Exception as e:
+            self._messages.put(('error', e))
+
+    def _poll(self):
+        while True:
+            try:
+                kind, value = self._messages.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'progress':
+                if self.on_progress is not None:
+                    self.on_progress(*value)
+                continue
+            if kind == 'done' and self.on_done is not None:
+                self.on_done(value)
+            elif kind == 'error' and self.on_error is not None:
+                self.on_error(value)
+            if self.on_finish is not None:
+                self.on_finish()
+            return
+        self.root.after(POLL_INTERVAL, self._poll)
+
+class FortschrittDialog(tk.Toplevel):
+    """Fenster mit Fortschrittsbalken und Abbrechen-Button für einen Hintergrundauftrag."""
+
+    def __init__(self, root, title):
+        super().__init__(root)
+        self.title(title)
+        self.transient(root)
+        self.resizable(False, False)
+        self.job = None
+
+        self.label = tk.Label(self, text=title, anchor='w', width=50)
+        self.label.pack(fill='x', padx=10, pady=(10, 5))
+
+        self.progressbar = ttk.Progressbar(self, mode='indeterminate', length=350)
+        self.progressbar.pack(fill='x', padx=10, pady=5)
+        self.progressbar.start()
+
+        self.cancel_button = tk.Button(self, text="Abbrechen", command=self.cancel)
+        self.cancel_button.pack(pady=(5, 10))
+        self.protocol("WM_DELETE_WINDOW", self.cancel)
+
+    def update_progress(self, done, total, text=""):
+        if total:
+            self.progressbar.stop()
+            self.progressbar.config(mode='determinate', maximum=total, value=done)
+        if text:
+            self.label.config(text=text)
+
+    def cancel(self):
+        if self.job is not None:
+            self.job.cancel()
+        self.cancel_button.config(state=tk.DISABLED)
+        self.label.config(text="Wird abgebrochen...")
+
+def run_in_background(root, title, function, on_done=None, on_error=None, on_finish=None):
+    """Startet function(auftrag) im Hintergrund und zeigt solange einen Fortschrittsdialog mit Abbrechen-Button."""
+    dialog = FortschrittDialog(root, title)
+
+    def finish():
+        dialog.destroy()
+        if on_finish is not None:
+            on_finish()
+
+    dialog.job = Hintergrundauftrag(root, function, on_done=on_done, on_error=on_error,
+                                    on_progress=dialog.update_progress, on_finish=finish)
+    return dialog.job.start()
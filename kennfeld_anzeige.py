@@ -0,0 +1,103 @@
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+import matplotlib
+matplotlib.use('TkAgg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+import messlauf_datei
+import wirkungsgrad_kennfeld
+
+kennfeld = None
+paths = []
+
+def open_runs():
+    global paths
+    selected = filedialog.askopenfilenames(filetypes=messlauf_datei.DIALOG_FILETYPES, title="Messläufe wählen")
+    if selected:
+        paths = messlauf_datei.selected_runs(selected)
+        files_label.config(text=f"{len(paths)} Messläufe")
+        build_map()
+
+def build_map():
+    """Erzeugt das Kennfeld (oder lädt es aus dem Zwischenspeicher) und zeigt die gewählte Größe."""
+    global kennfeld
+    if not paths:
+        return
+    try:
+        kennfeld = wirkungsgrad_kennfeld.build(paths, float(speed_step_var.get()), float(torque_step_var.get()))
+    except ValueError as e:
+        messagebox.showerror("Fehler", f"Kennfeld kann nicht erstellt werden: {e}")
+        return
+    except KeyError as e:
+        messagebox.showerror("Fehler", f"Messlauf enthält nicht alle benötigten Spalten: {e}")
+        return
+    quantity_box['values'] = kennfeld.quantities
+    if quantity_var.get() not in kennfeld.quantities:
+        quantity_var.set(kennfeld.quantities[0])
+    show_quantity()
+
+def show_quantity(event=None):
+    # Nur neu zeichnen, die Raster aller Größen liegen bereits vor
+    if kennfeld is None:
+        return
+    figure.clear()
+    ax = figure.add_subplot(111)
+    contour = wirkungsgrad_kennfeld.plot(kennfeld, quantity_var.get(), ax, show_points=points_var.get())
+    figure.colorbar(contour, ax=ax)
+    canvas.draw()
+
+def save_grid():
+    if kennfeld is not None:
+        file_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")], title="Raster speichern")
+        if file_path:
+            kennfeld.to_dataframe(quantity_var.get()).to_csv(file_path, index=False)
+
+def save_image():
+    if kennfeld is not None:
+        file_path = filedialog.asksaveasfilename(defaultextension=".png", filetypes=[("PNG", "*.png"), ("PDF", "*.pdf")], title="Bild speichern")
+        if file_path:
+            figure.savefig(file_path, dpi=150)
+
+def main():
+    global root, figure, canvas, files_label, quantity_box, quantity_var, speed_step_var, torque_step_var, points_var
+
+    root = tk.Tk()
+    root.title("Wirkungsgradkennfeld")
+
+    controls = tk.Frame(root)
+    controls.pack(fill=tk.X, padx=10, pady=5)
+
+    tk.Button(controls, text="Messläufe öffnen", command=open_runs).pack(side=tk.LEFT, padx=5)
+    files_label = tk.Label(controls, text="keine Messläufe")
+    files_label.pack(side=tk.LEFT, padx=5)
+
+    tk.Label(controls, text="Größe:").pack(side=tk.LEFT, padx=(15, 2))
+    quantity_var = tk.StringVar(root, value='eta')
+    quantity_box = ttk.Combobox(controls, textvariable=quantity_var, state='readonly', width=12)
+    quantity_box.pack(side=tk.LEFT)
+    quantity_box.bind("<<ComboboxSelected>>", show_quantity)
+
+    tk.Label(controls, text="Raster n:").pack(side=tk.LEFT, padx=(15, 2))
+    speed_step_var = tk.StringVar(root, value=str(wirkungsgrad_kennfeld.SPEED_STEP))
+    tk.Entry(controls, textvariable=speed_step_var, width=6).pack(side=tk.LEFT)
+    tk.Label(controls, text="M:").pack(side=tk.LEFT, padx=(5, 2))
+    torque_step_var = tk.StringVar(root, value=str(wirkungsgrad_kennfeld.TORQUE_STEP))
+    tk.Entry(controls, textvariable=torque_step_var, width=6).pack(side=tk.LEFT)
+    tk.Button(controls, text="Übernehmen", command=build_map).pack(side=tk.LEFT, padx=5)
+
+    points_var = tk.BooleanVar(root, value=True)
+    tk.Checkbutton(controls, text="Messpunkte", variable=points_var, command=show_quantity).pack(side=tk.LEFT, padx=5)
+
+    tk.Button(controls, text="Raster als CSV speichern", command=save_grid).pack(side=tk.RIGHT, padx=5)
+    tk.Button(controls, text="Bild speichern", command=save_image).pack(side=tk.RIGHT, padx=5)
+
+    figure = Figure(figsize=(8, 6))
+    canvas = FigureCanvasTkAgg(figure, master=root)
+    NavigationToolbar2Tk(canvas, root).update()
+    canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+    root.mainloop()
+
+# Wenn das Skript direkt ausgeführt wird, starte das Hauptprogramm
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import csv
+import os
+import queue
+import threading
+from datetime import datetime
+from messwerte_leser import MESSWERTE_DB, INDEX_VARIABLE, MesswerteLeser, count_rows
+
+# Variable, deren Änderung einen neu protokollierten Messpunkt anzeigt.
+# Ein Array (z.B. "index") wird über den letzten Eintrag ungleich 0 ausgewertet,
+# ein Skalar (z.B. ein Zeilenzähler der SPS) direkt als Anzahl Zeilen.
+LIVE_TRIGGER_VARIABLE = "index"
+
+# Publishing-Intervall der Subscription (ms)
+LIVE_PERIOD = 500
+
+# Falls keine Benachrichtigung kommt (z.B. nach einem Reconnect), wird spätestens nach dieser Zeit abgefragt (s)
+LIVE_POLL_FALLBACK = 5
+
+# Verzeichnis für die Live-Protokolle
+LIVE_LOG_DIR = "Messdaten_live"
+
+def default_log_path():
+    """Erzeugt einen Dateinamen für das Live-Protokoll mit Zeitstempel."""
+    os.makedirs(LIVE_LOG_DIR, exist_ok=True)
+    return os.path.join(LIVE_LOG_DIR, f"live_{datetime.now():%Y-%m-%d_%H-%M-%S}.csv")
+
+class LiveErfassung:
+    """Abonniert den Zeilenfortschritt der SPS und schreibt neue Messzeilen sofort in ein CSV-Protokoll.
+
+    Neue Zeilen werden zusätzlich an on_rows(columns) übergeben (Dict Variable -> NumPy-Array der neuen Zeilen).
+    Beginnt die SPS eine neue Messung (Messwerte_DB überschrieben), wird in ein neues Protokoll geschrieben
+    (Name mit _2, _3, ...) und vorher on_new_run(log_path) aufgerufen. Die Aufrufe erfolgen aus einem
+    Hintergrund-Thread.
+    """
+
+    def __init__(self, session, variables, log_path=None, on_rows=None, on_new_run=None,
+                 trigger_variable=LIVE_TRIGGER_VARIABLE, period=LIVE_PERIOD, db_name=MESSWERTE_DB):
+        self.session = session
+        self.variables = list(variables)
+        self.log_path = log_path or default_log_path()
+        self.first_log_path = self.log_path
+        self.run_number = 1
+        self.on_rows = on_rows
+        self.on_new_run = on_new_run
+        self.trigger_variable = trigger_variable
+        self.period = period
+        self.db_name = db_name
+        self.reader = MesswerteLeser(session, self.variables, db_name,
+                                     row_count_variable=None if trigger_variable == INDEX_VARIABLE else trigger_variable)
+        self.error = None
+        self._notifications = queue.Queue()
+        self._stop_event = threading.Event()
+        self._subscription = None
+        self._subscription_connection = None
+        self._worker = None
+
+    @property
+    def rows_logged(self):
+        return self.reader.rows_fetched
+
+    def start(self):
+        self.session.connect()
+        self._subscribe()
+        self._stop_event.clear()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._notifications.put(None)
+        if self._worker is not None:
+            self._worker.join()
+        self._unsubscribe()
+
+    def _subscribe(self):
+        trigger_node = self.session.get_node(self.db_name, self.trigger_variable)
+        self._subscription = self.session.call(self.session.client.create_subscription, self.period, self)
+        self._subscription.subscribe_data_change(trigger_node)
+        self._subscription_connection = self.session.connection_count
+
+    def _unsubscribe(self):
+        if self._subscription is not None:
+            try:
+                self._subscription.delete()
+            except Exception:
+                # Session ist bereits geschlossen
+                pass
+            self._subscription = None
+
+    def datachange_notification(self, node, value, data):
+        # Wird im Empfangs-Thread des Clients aufgerufen, daher hier keine blockierenden Aufrufe
+        self._notifications.put(count_rows(value))
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                row_count = self._notifications.get(timeout=LIVE_POLL_FALLBACK)
+            except queue.Empty:
+                row_count = None
+            if self._stop_event.is_set():
+                break
+            try:
+                # Subscription nach einem Reconnect neu anlegen
+                if self._subscription_connection != self.session.connection_count:
+                    self._unsubscribe()
+                    self._subscribe()
+                # Nur die neuen Zeilen per IndexRange lesen (ohne row_count wird die Anzahl abgefragt)
+                buffer, rows_before = self.reader.data, self.reader.rows_fetched
+                columns = self.reader.fetch_new(row_count)
+                # Der Leser verwirft seine Daten, wenn die SPS den Messwerte_DB von vorn beschreibt
+                if rows_before and self.reader.data is not buffer:
+                    self._start_new_log()
+                if columns:
+                    self._log_rows(columns)
+                self.error = None
+            except Exception as e:
+                self.error = e
+                print(f"Live acquisition failed: {e}")
+
+    def _start_new_log(self):
+        """Neue Messung der SPS: eigenes Protokoll, damit zwei Messungen nicht in einer Datei landen."""
+        self.run_number += 1
+        root, extension = os.path.splitext(self.first_log_path)
+        self.log_path = f"{root}_{self.run_number}{extension}"
+        print(f"New measurement started by the PLC, logging to {self.log_path}")
+        if self.on_new_run is not None:
+            self.on_new_run(self.log_path)
+
+    def _log_rows(self, columns):
+        rows = zip(*(columns[variable].tolist() for variable in self.variables))
+        write_header = not os.path.exists(self.log_path) or os.path.getsize(self.log_path) == 0
+        with open(self.log_path, 'a', newline='') as log_file:
+            writer = csv.writer(log_file)
+            if write_header:
+                writer.writerow(self.variables)
+            writer.writerows(rows)
+            log_file.flush()
+            os.fsync(log_file.fileno())
+
+        if self.on_rows is not None:
+            self.on_rows(columns)
@@ -56,6 +56,21 @@ def on_programm3_click():
 def on_stromwinkel_click():
     stromwinkel.main()  # Startet das GUI des Stromwinkel-Programms
 
+def on_plot_click():
+    # Der CSV Plot braucht matplotlib, erst beim Öffnen importieren
+    import messdaten_plot
+    messdaten_plot.main()
+
+def on_kennfeld_click():
+    # Die Kennfeld-Anzeige braucht matplotlib, erst beim Öffnen importieren
+    import kennfeld_anzeige
+    kennfeld_anzeige.main()
+
+def on_verluste_click():
+    # Die Verlustberechnung braucht matplotlib, erst beim Öffnen importieren
+    import verlustberechnung
+    verlustberechnung.main()
+
 def main():
     root = tk.Tk()
     root.title("TestbenchManager")
@@ -92,10 +107,13 @@ def main():
     messung_frame.pack(fill=tk.X, pady=10)
     
     tk.Label(messung_frame, text="Ermöglicht das grafische Analysieren von dokumentierten Messdaten", wraplength=450, justify='left').pack(pady=(5, 15))
-    tk.Button(messung_frame, text="Starte CSV Plot", command=on_programm1_click).pack(pady=(0, 5))
+    tk.Button(messung_frame, text="Starte CSV Plot", command=on_plot_click).pack(pady=(0, 5))
     
+    tk.Label(messung_frame, text="Stellt Wirkungsgrad, Verluste und weitere Größen aus einem oder mehreren Messläufen als Kennfeld über Drehzahl und Drehmoment dar.", wraplength=450, justify='left').pack(pady=(5, 15))
+    tk.Button(messung_frame, text="Starte Wirkungsgradkennfeld", command=on_kennfeld_click).pack(pady=(0, 5))
+
     tk.Label(messung_frame, text="Berechnung verschiedener Verlustarten in bestimmten Arbeitspunkten anhand von Messergebnissen und Maschinenkenndaten", wraplength=450, justify='left').pack(pady=(5, 15))
-    tk.Button(messung_frame, text="Starte Verlustberechnung", command=on_programm1_click).pack(pady=(0, 5))
+    tk.Button(messung_frame, text="Starte Verlustberechnung", command=on_verluste_click).pack(pady=(0, 5))
 
     tk.Button(main_frame, text="Beenden", command=root.quit, font=('Arial', 12, 'bold')).pack(pady=(15, 0))
 
@@ -0,0 +1,149 @@
+import os
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+import matplotlib
+matplotlib.use('TkAgg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+import ausduennung
+import messlauf_datei
+from messwerte_leser import load_variables
+
+# Eintrag für die x-Achse "Zeilennummer"
+ROW_NUMBER = "(Zeile)"
+
+verlauf = None
+lines = {}
+refresh_pending = False
+
+def open_run():
+    """Öffnet eine CSV-Datei oder einen Messlauf im Binärformat (meta.json im .messlauf-Verzeichnis wählen)."""
+    global verlauf
+    file_path = filedialog.askopenfilename(filetypes=messlauf_datei.DIALOG_FILETYPES, title="Messdaten öffnen")
+    if not file_path:
+        return
+    file_path, = messlauf_datei.selected_runs([file_path])
+    try:
+        verlauf = ausduennung.Verlauf(messlauf_datei.load_run(file_path))
+    except (OSError, ValueError) as e:
+        messagebox.showerror("Fehler", f"Datei kann nicht gelesen werden: {e}")
+        return
+    file_label.config(text=f"{os.path.basename(file_path)} ({len(verlauf)} Zeilen)")
+
+    # Variablen des Messwerte_DB in dessen Reihenfolge zuerst, weitere Spalten der Datei danach
+    available = list(verlauf.columns)
+    variables = [variable for variable in load_variables() if variable in available]
+    variables += [column for column in available if column not in variables]
+    x_box['values'] = [ROW_NUMBER] + variables
+    x_var.set('index' if 'index' in variables else ROW_NUMBER)
+    y_list.delete(0, tk.END)
+    for variable in variables:
+        y_list.insert(tk.END, variable)
+    for default in ('n', 'M'):
+        if default in variables:
+            y_list.selection_set(variables.index(default))
+    plot()
+
+def x_column():
+    return None if x_var.get() == ROW_NUMBER else x_var.get()
+
+def pixel_width():
+    return max(int(ax.get_window_extent().width), 100)
+
+def plot(event=None):
+    """Zeichnet die gewählten Größen neu (volle Ansicht)."""
+    if verlauf is None:
+        return
+    figure.clear()
+    create_axes()
+    lines.clear()
+    monotonic = verlauf.is_monotonic(x_column())
+    for y_column in [y_list.get(i) for i in y_list.curselection()]:
+        x, y = verlauf.query(x_column(), y_column, pixel_width(), method=method_var.get())
+        style = {'linewidth': 0.8} if monotonic else {'linestyle': 'none', 'marker': '.', 'markersize': 2}
+        lines[y_column], = ax.plot(x, y, label=y_column, **style)
+    ax.set_xlabel(x_var.get())
+    if lines:
+        ax.legend(loc='upper right')
+    ax.callbacks.connect('xlim_changed', schedule_refresh)
+    update_point_count()
+    canvas.draw()
+
+def schedule_refresh(axes=None):
+    # Beim Zoomen/Verschieben kommen viele Änderungen kurz hintereinander: nur einmal neu abfragen
+    global refresh_pending
+    if not refresh_pending:
+        refresh_pending = True
+        root.after_idle(refresh)
+
+def refresh():
+    """Fragt für den sichtbaren Ausschnitt die passende Auflösung ab, ohne die Achsen neu aufzubauen."""
+    global refresh_pending
+    refresh_pending = False
+    if verlauf is None:
+        return
+    x_range = ax.get_xlim()
+    for y_column, line in lines.items():
+        line.set_data(*verlauf.query(x_column(), y_column, pixel_width(), x_range, method_var.get()))
+    update_point_count()
+    canvas.draw_idle()
+
+def update_point_count():
+    shown = sum(len(line.get_xdata()) for line in lines.values())
+    points_label.config(text=f"{shown} von {len(verlauf) * len(lines)} Punkten dargestellt")
+
+def create_axes():
+    global ax
+    ax = figure.add_subplot(111)
+    ax.grid(True, linewidth=0.3)
+
+def main():
+    global root, figure, canvas, file_label, points_label, x_box, x_var, y_list, method_var
+
+    root = tk.Tk()
+    root.title("CSV Plot")
+
+    left = tk.Frame(root)
+    left.pack(side=tk.LEFT, fill=tk.Y, padx=10, pady=10)
+
+    tk.Button(left, text="Messdaten öffnen", command=open_run).pack(fill=tk.X, pady=5)
+    file_label = tk.Label(left, text="keine Datei", wraplength=180, justify='left')
+    file_label.pack(pady=(0, 10))
+
+    tk.Label(left, text="x-Achse", font=('Arial', 12, 'bold')).pack(anchor='w')
+    x_var = tk.StringVar(root, value=ROW_NUMBER)
+    x_box = ttk.Combobox(left, textvariable=x_var, state='readonly', width=20)
+    x_box.pack(fill=tk.X, pady=(0, 10))
+    x_box.bind("<<ComboboxSelected>>", plot)
+
+    tk.Label(left, text="y-Achse", font=('Arial', 12, 'bold')).pack(anchor='w')
+    y_frame = tk.Frame(left)
+    y_frame.pack(fill=tk.BOTH, expand=True)
+    y_list = tk.Listbox(y_frame, selectmode=tk.MULTIPLE, exportselection=False, width=22)
+    y_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    y_scroll = ttk.Scrollbar(y_frame, orient="vertical", command=y_list.yview)
+    y_scroll.pack(side=tk.LEFT, fill=tk.Y)
+    y_list.configure(yscrollcommand=y_scroll.set)
+    y_list.bind("<<ListboxSelect>>", plot)
+
+    tk.Label(left, text="Ausdünnung", font=('Arial', 12, 'bold')).pack(anchor='w', pady=(10, 0))
+    method_var = tk.StringVar(root, value='minmax')
+    tk.Radiobutton(left, text="Min/Max je Pixel", variable=method_var, value='minmax', command=plot).pack(anchor='w')
+    tk.Radiobutton(left, text="LTTB", variable=method_var, value='lttb', command=plot).pack(anchor='w')
+
+    points_label = tk.Label(left, text="", wraplength=180, justify='left')
+    points_label.pack(pady=10)
+
+    plot_frame = tk.Frame(root)
+    plot_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    figure = Figure(figsize=(10, 6))
+    create_axes()
+    canvas = FigureCanvasTkAgg(figure, master=plot_frame)
+    NavigationToolbar2Tk(canvas, plot_frame).update()
+    canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+    root.mainloop()
+
+# Wenn das Skript direkt ausgeführt wird, starte das Hauptprogramm
+if __name__ == "__main__":
+    main()
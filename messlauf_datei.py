@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# Binärformat eines Messlaufs: ein Verzeichnis mit einer .npy-Datei je Spalte und den Metadaten als JSON
+BINARY_SUFFIX = ".messlauf"
+META_FILE = "meta.json"
+FORMAT_VERSION = 1
+
+# Dateitypen der Öffnen-Dialoge: Messläufe im Binärformat werden über ihre meta.json gewählt
+DIALOG_FILETYPES = [("CSV files", "*.csv"), ("Messlauf", META_FILE)]
+
+# Zwischenspeicher der Auswertungen (Ergebnisse je Hash der Messdateien)
+AUSWERTUNG_CACHE_DIR = ".auswertung_cache"
+
+# Verweilzeit und Anzahl Messungen je Arbeitspunkt im Dateinamen, z.B. "Messung1_8000ms_20Messung"
+# oder "Messung3_8000,4000_20,3Messung"
+DWELL_TIME_PATTERN = re.compile(r'(\d+(?:,\d+)*)(?:ms)?_(\d+(?:,\d+)*)Messung')
+
+def metadata_from_filename(file_name):
+    """Liest Verweilzeiten (ms) und Messungen je Arbeitspunkt aus dem Dateinamen eines Messlaufs."""
+    match = DWELL_TIME_PATTERN.findall(os.path.basename(file_name))
+    dwell_times = [int(value) for dwell, _ in match for value in dwell.split(',')]
+    samples = [int(value) for _, count in match for value in count.split(',')]
+    metadata = {}
+    if dwell_times:
+        metadata['dwell_time_ms'] = dwell_times
+        metadata['samples_per_point'] = samples
+    return metadata
+
+def is_binary_run(path):
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, META_FILE))
+
+def selected_runs(file_paths):
+    """Messläufe zu den im Dialog gewählten Dateien (meta.json steht für das .messlauf-Verzeichnis)."""
+    return [os.path.dirname(file_path) if os.path.basename(file_path) == META_FILE else file_path
+            for file_path in file_paths]
+
+def save_run(path, columns, metadata=None):
+    """Speichert einen Messlauf im Binärformat.
+
+    columns ist ein Dict Spaltenname -> Array (z.B. Messpuffer.view()) oder ein DataFrame.
+    Die Datentypen (float32/int16) bleiben erhalten.
+    """
+    if isinstance(columns, pd.DataFrame):
+        columns = {column: columns[column].to_numpy() for column in columns.columns}
+    os.makedirs(path, exist_ok=True)
+
+    for column, values in columns.items():
+        np.save(os.path.join(path, f"{column}.npy"), np.ascontiguousarray(values))
+
+    meta = {
+        'format_version': FORMAT_VERSION,
+        'variables': list(columns.keys()),
+        'dtypes': {column: np.asarray(values).dtype.str for column, values in columns.items()},
+        'rows': len(next(iter(columns.values()))) if columns else 0,
+        'date': datetime.now().isoformat(timespec='seconds'),
+    }
+    if 'Messprogramm' in columns and len(columns['Messprogramm']):
+        meta['measuring_program'] = sorted(np.unique(columns['Messprogramm']).tolist())
+    meta.update(metadata_from_filename(path))
+    meta.update(metadata or {})
+
+    with open(os.path.join(path, META_FILE), 'w') as meta_file:
+        json.dump(meta, meta_file, indent=2)
+
+def load_metadata(path):
+    """Liest nur den Header eines Messlaufs (Binärformat) bzw. die Spaltennamen einer CSV-Datei."""
+    if is_binary_run(path):
+        with open(os.path.join(path, META_FILE)) as meta_file:
+            return json.load(meta_file)
+    meta = {'variables': list(pd.read_csv(path, nrows=0).columns)}
+    meta.update(metadata_from_filename(path))
+    return meta
+
+def load_run(path, columns=None, mmap=True):
+    """Lädt einen Messlauf als Dict Spaltenname -> NumPy-Array.
+
+    Mit columns werden nur die angegebenen Spalten gelesen. Im Binärformat werden sie per Memory-Mapping
+    eingebunden, sodass nur tatsächlich verwendete Daten von der Festplatte gelesen werden.
+    CSV-Dateien werden ebenfalls unterstützt (nur die angeforderten Spalten werden geparst).
+    """
+    if is_binary_run(path):
+        if columns is None:
+            columns = load_metadata(path)['variables']
+        mmap_mode = 'r' if mmap else None
+        return {column: np.load(os.path.join(path, f"{column}.npy"), mmap_mode=mmap_mode) for column in columns}
+
+    df = pd.read_csv(path, usecols=columns)
+    return {column: df[column].to_numpy() for column in (columns or df.columns)}
+
+def load_dataframe(path, columns=None):
+    return pd.DataFrame(load_run(path, columns, mmap=False))
+
+def file_hash(path):
+    """SHA-256 über den Inhalt einer Messdatei bzw. aller Dateien eines Messlaufs im Binärformat."""
+    digest = hashlib.sha256()
+    files = [os.path.join(path, name) for name in sorted(os.listdir(path))] if os.path.isdir(path) else [path]
+    for file_name in files:
+        digest.update(os.path.basename(file_name).encode())
+        with open(file_name, 'rb') as data_file:
+            for chunk in iter(lambda: data_file.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
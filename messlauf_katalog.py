@@ -0,0 +1,258 @@
+import json
+import os
+import re
+import sqlite3
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import messlauf_datei
+import verfeinerung
+
+# Datei des Katalogs (SQLite)
+KATALOG_DB = "messlauf_katalog.sqlite"
+
+# Bei Änderungen an Tabellen oder Auswertung erhöhen: der Katalog wird dann beim nächsten Scan neu aufgebaut
+SCHEMA_VERSION = 1
+
+# Datumsordner der Messungen, z.B. "26.08.24"
+DATE_FOLDER_PATTERN = re.compile(r'^(\d{1,2})\.(\d{1,2})\.(\d{2}|\d{4})$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    path TEXT PRIMARY KEY,
+    name TEXT,
+    format TEXT,
+    mtime REAL,
+    size INTEGER,
+    hash TEXT,
+    date TEXT,
+    rows INTEGER,
+    variables TEXT,
+    dwell_time_ms TEXT,
+    samples_per_point TEXT,
+    measuring_program TEXT,
+    operating_points INTEGER,
+    speed_min REAL,
+    speed_max REAL,
+    torque_min REAL,
+    torque_max REAL,
+    indexed_at TEXT
+);
+CREATE TABLE IF NOT EXISTS column_stats (
+    path TEXT REFERENCES runs(path) ON DELETE CASCADE,
+    variable TEXT,
+    min REAL,
+    max REAL,
+    mean REAL,
+    count INTEGER,
+    PRIMARY KEY (path, variable)
+);
+CREATE TABLE IF NOT EXISTS operating_points (
+    path TEXT REFERENCES runs(path) ON DELETE CASCADE,
+    drehzahl REAL,
+    drehmoment REAL,
+    rows INTEGER
+);
+CREATE INDEX IF NOT EXISTS column_stats_variable ON column_stats (variable, min, max);
+CREATE INDEX IF NOT EXISTS operating_points_drehzahl ON operating_points (drehzahl, drehmoment);
+"""
+
+def connect(db_path=KATALOG_DB):
+    """Öffnet den Katalog und legt die Tabellen an; bei neuer SCHEMA_VERSION wird er geleert."""
+    connection = sqlite3.connect(db_path)
+    connection.execute("PRAGMA foreign_keys = ON")
+    if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        connection.executescript("DROP TABLE IF EXISTS operating_points; DROP TABLE IF EXISTS column_stats; "
+                                 "DROP TABLE IF EXISTS runs;")
+        connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    connection.executescript(SCHEMA)
+    return connection
+
+def find_run_files(directories):
+    """Alle Messläufe (CSV-Dateien und .messlauf-Verzeichnisse) unterhalb der Verzeichnisse."""
+    paths = []
+    for directory in directories:
+        for folder, subfolders, files in os.walk(directory):
+            runs = [name for name in subfolders if messlauf_datei.is_binary_run(os.path.join(folder, name))]
+            paths += [os.path.join(folder, name) for name in runs]
+            # In Binär-Messläufe nicht absteigen
+            subfolders[:] = [name for name in subfolders if name not in runs]
+            paths += [os.path.join(folder, name) for name in files if name.lower().endswith('.csv')]
+    return sorted(os.path.abspath(path) for path in paths)
+
+def file_state(path):
+    """(mtime, Größe) einer Datei bzw. die neueste mtime und Gesamtgröße eines Binär-Messlaufs."""
+    if os.path.isdir(path):
+        stats = [os.stat(os.path.join(path, name)) for name in os.listdir(path)]
+        return max(stat.st_mtime for stat in stats), sum(stat.st_size for stat in stats)
+    stat = os.stat(path)
+    return stat.st_mtime, stat.st_size
+
+def date_from_path(path, metadata):
+    """Messdatum aus den Metadaten des Binärformats oder aus dem Datumsordner (ISO-Format)."""
+    if 'date' in metadata:
+        return metadata['date'][:10]
+    match = DATE_FOLDER_PATTERN.match(os.path.basename(os.path.dirname(path)))
+    if match:
+        day, month, year = (int(value) for value in match.groups())
+        try:
+            return datetime(year if year > 99 else 2000 + year, month, day).date().isoformat()
+        except ValueError:
+            return None
+    return None
+
+def column_statistics(columns):
+    """Minimum, Maximum, Mittelwert und Anzahl gültiger Werte je numerischer Spalte.
+
+    Ungültige Werte (inf, 9.91e37 von der SPS) zählen nicht.
+    """
+    statistics = {}
+    for variable, values in columns.items():
+        values = np.asarray(values)
+        if not np.issubdtype(values.dtype, np.number):
+            continue
+        values = values[np.isfinite(values) & (np.abs(values) < 1e30)].astype(float)
+        if len(values):
+            statistics[variable] = (float(values.min()), float(values.max()), float(values.mean()), len(values))
+        else:
+            statistics[variable] = (None, None, None, 0)
+    return statistics
+
+def setpoints(columns):
+    """Arbeitspunkte (drehzahl, drehmoment, Zeilen) eines Messlaufs nach Sollwerten bzw. gerundeten Istwerten."""
+    if 'n_soll' in columns and 'M_soll' in columns:
+        df = pd.DataFrame({'drehzahl': columns['n_soll'], 'drehmoment': columns['M_soll']}).astype(float)
+    elif 'n' in columns and 'M' in columns:
+        df = pd.DataFrame({'drehzahl': columns['n'], 'drehmoment': columns['M']}).astype(float)
+    else:
+        return pd.DataFrame(columns=['drehzahl', 'drehmoment', 'rows'])
+    df = df[df['drehzahl'].abs() >= verfeinerung.MIN_SPEED]
+    keys = [np.round(df['drehzahl'] / verfeinerung.SPEED_TOLERANCE), np.round(df['drehmoment'] / verfeinerung.TORQUE_TOLERANCE)]
+    points = df.groupby(keys).agg(drehzahl=('drehzahl', 'mean'), drehmoment=('drehmoment', 'mean'),
+                                  rows=('drehzahl', 'size'))
+    return points.reset_index(drop=True)
+
+def setpoint_count(columns):
+    """Anzahl verschiedener Sollwert-Kombinationen (bei Stromwinkel-Messungen auch Strom und Winkel)."""
+    keys = [column for column in ('n_soll', 'M_soll', 'Strom_Effektivwert_soll', 'Stromwinkel_soll') if column in columns]
+    if not keys:
+        return None
+    return len(pd.DataFrame({column: np.round(np.asarray(columns[column], dtype=float), 3) for column in keys}).drop_duplicates())
+
+def index_run(connection, path, mtime, size, digest):
+    """Liest einen Messlauf einmal vollständig und schreibt Metadaten, Spaltenstatistik und Arbeitspunkte."""
+    metadata = messlauf_datei.load_metadata(path)
+    columns = messlauf_datei.load_run(path)
+    statistics = column_statistics(columns)
+    points = setpoints(columns)
+    rows = len(next(iter(columns.values()))) if columns else 0
+    program = sorted(np.unique(columns['Messprogramm']).tolist()) if 'Messprogramm' in columns else None
+
+    connection.execute("DELETE FROM runs WHERE path = ?", (path,))
+    connection.execute(
+        "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (path, os.path.basename(path), 'binary' if messlauf_datei.is_binary_run(path) else 'csv', mtime, size, digest,
+         date_from_path(path, metadata), rows, json.dumps(list(columns)),
+         json.dumps(metadata.get('dwell_time_ms')), json.dumps(metadata.get('samples_per_point')),
+         json.dumps(metadata.get('measuring_program', program)), setpoint_count(columns) or len(points),
+         float(points['drehzahl'].min()) if len(points) else None, float(points['drehzahl'].max()) if len(points) else None,
+         float(points['drehmoment'].min()) if len(points) else None, float(points['drehmoment'].max()) if len(points) else None,
+         datetime.now().isoformat(timespec='seconds')))
+    connection.executemany("INSERT INTO column_stats VALUES (?, ?, ?, ?, ?, ?)",
+                           [(path, variable) + values for variable, values in statistics.items()])
+    connection.executemany("INSERT INTO operating_points VALUES (?, ?, ?, ?)",
+                           [(path, float(speed), float(torque), int(count)) for speed, torque, count
+                            in points[['drehzahl', 'drehmoment', 'rows']].itertuples(index=False)])
+
+def scan(directories, db_path=KATALOG_DB, progress=None):
+    """Aktualisiert den Katalog inkrementell.
+
+    Unveränderte Messläufe (gleiche mtime und Größe) werden übersprungen, bei geänderter mtime entscheidet der
+    Hash, ob neu ausgewertet wird. Einträge zu gelöschten Dateien unterhalb der Verzeichnisse werden entfernt.
+    progress(pfad, status) meldet jeden Messlauf. Gibt die Anzahl je Status zurück.
+    """
+    counts = {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+    connection = connect(db_path)
+    try:
+        known = {path: (mtime, size, digest) for path, mtime, size, digest
+                 in connection.execute("SELECT path, mtime, size, hash FROM runs")}
+        found = find_run_files(directories)
+        for path in found:
+            mtime, size = file_state(path)
+            status = 'unchanged'
+            if path not in known or known[path][:2] != (mtime, size):
+                digest = messlauf_datei.file_hash(path)
+                if path in known and known[path][2] == digest:
+                    # Nur berührt (z.B. kopiert): mtime nachführen, nicht neu auswerten
+                    connection.execute("UPDATE runs SET mtime = ?, size = ? WHERE path = ?", (mtime, size, path))
+                else:
+                    status = 'updated' if path in known else 'added'
+                    try:
+                        index_run(connection, path, mtime, size, digest)
+                    except (OSError, ValueError, KeyError, pd.errors.ParserError) as e:
+                        status = 'failed'
+                        if progress is not None:
+                            progress(path, f"failed: {e}")
+            counts[status] += 1
+            if progress is not None and status in ('added', 'updated'):
+                progress(path, status)
+
+        roots = [os.path.abspath(directory) + os.sep for directory in directories]
+        removed = [path for path in known if path not in set(found) and any(path.startswith(root) for root in roots)]
+        connection.executemany("DELETE FROM runs WHERE path = ?", [(path,) for path in removed])
+        counts['removed'] = len(removed)
+        connection.commit()
+    finally:
+        connection.close()
+    return counts
+
+def find_runs(db_path=KATALOG_DB, speed=None, torque=None, ranges=None, variables=None,
+              speed_tolerance=verfeinerung.SPEED_TOLERANCE, torque_tolerance=verfeinerung.TORQUE_TOLERANCE):
+    """Sucht Messläufe im Katalog, ohne die Messdateien zu öffnen.
+
+    speed/torque: mindestens ein Arbeitspunkt bei dieser Drehzahl bzw. diesem Drehmoment (± Toleranz).
+    ranges: Dict Variable -> (min, max), je Grenze None = offen; der Messlauf muss Werte im Bereich haben
+    (z.B. {'Temperatur': (60, None)} = Temperatur über 60 °C erreicht). variables: Spalten, die vorhanden sein müssen.
+    Gibt die Messläufe als DataFrame (eine Zeile je Lauf) zurück.
+    """
+    conditions, parameters = [], []
+    if speed is not None or torque is not None:
+        point = []
+        if speed is not None:
+            point.append("ABS(p.drehzahl - ?) <= ?")
+            parameters += [speed, speed_tolerance]
+        if torque is not None:
+            point.append("ABS(p.drehmoment - ?) <= ?")
+            parameters += [torque, torque_tolerance]
+        conditions.append(f"EXISTS (SELECT 1 FROM operating_points p WHERE p.path = runs.path AND {' AND '.join(point)})")
+    for variable, (low, high) in (ranges or {}).items():
+        bounds = ["s.variable = ?"]
+        parameters.append(variable)
+        if low is not None:
+            bounds.append("s.max >= ?")
+            parameters.append(low)
+        if high is not None:
+            bounds.append("s.min <= ?")
+            parameters.append(high)
+        conditions.append(f"EXISTS (SELECT 1 FROM column_stats s WHERE s.path = runs.path AND {' AND '.join(bounds)})")
+    for variable in variables or []:
+        conditions.append("EXISTS (SELECT 1 FROM column_stats s WHERE s.path = runs.path AND s.variable = ?)")
+        parameters.append(variable)
+
+    query = "SELECT * FROM runs"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    connection = connect(db_path)
+    try:
+        return pd.read_sql_query(query + " ORDER BY date, path", connection, params=parameters)
+    finally:
+        connection.close()
+
+def column_stats(path, db_path=KATALOG_DB):
+    """Gespeicherte Spaltenstatistik eines Messlaufs (Variable, min, max, mean, count)."""
+    connection = connect(db_path)
+    try:
+        return pd.read_sql_query("SELECT variable, min, max, mean, count FROM column_stats WHERE path = ?",
+                                 connection, params=[os.path.abspath(path)])
+    finally:
+        connection.close()
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+from opcua import ua
+
+# NumPy-Datentypen der SPS-Variablen
+VARIANT_DTYPES = {
+    ua.VariantType.Boolean: np.bool_,
+    ua.VariantType.SByte: np.int8,
+    ua.VariantType.Byte: np.uint8,
+    ua.VariantType.Int16: np.int16,
+    ua.VariantType.UInt16: np.uint16,
+    ua.VariantType.Int32: np.int32,
+    ua.VariantType.UInt32: np.uint32,
+    ua.VariantType.Int64: np.int64,
+    ua.VariantType.UInt64: np.uint64,
+    ua.VariantType.Float: np.float32,
+    ua.VariantType.Double: np.float64,
+}
+
+# Datentyp für Variablen, deren Typ nicht bekannt ist (REAL in der SPS)
+DEFAULT_DTYPE = np.float32
+
+# Anfangskapazität in Zeilen (entspricht der Arraygröße im Messwerte_DB)
+INITIAL_CAPACITY = 1000
+
+def dtype_for_variant(variant_type):
+    return np.dtype(VARIANT_DTYPES.get(variant_type, DEFAULT_DTYPE))
+
+class Messpuffer:
+    """Spaltenorientierter Speicher eines Messlaufs.
+
+    Jede Spalte ist ein vorab reserviertes NumPy-Array im Datentyp der SPS (z.B. float32/int16).
+    Zugriffe über column()/view() liefern Views ohne Kopie.
+    """
+
+    def __init__(self, columns, dtypes=None, capacity=INITIAL_CAPACITY):
+        dtypes = dtypes or {}
+        self.columns = list(columns)
+        self.dtypes = {column: np.dtype(dtypes.get(column) or DEFAULT_DTYPE) for column in self.columns}
+        self._arrays = {column: np.zeros(capacity, dtype=self.dtypes[column]) for column in self.columns}
+        self.n_rows = 0
+        self._valid_mask = None
+
+    @classmethod
+    def from_dataframe(cls, df):
+        buffer = cls(df.columns, {column: df[column].dtype for column in df.columns}, capacity=len(df))
+        buffer.append({column: df[column].to_numpy() for column in df.columns})
+        return buffer
+
+    def __len__(self):
+        return self.n_rows
+
+    def __getitem__(self, column):
+        return self.column(column)
+
+    @property
+    def capacity(self):
+        return len(self._arrays[self.columns[0]]) if self.columns else 0
+
+    def reserve(self, capacity):
+        """Vergrößert die Kapazität (mindestens auf das Doppelte), bestehende Zeilen werden einmal kopiert."""
+        if capacity <= self.capacity:
+            return
+        capacity = max(capacity, 2 * self.capacity)
+        for column, array in self._arrays.items():
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:self.n_rows] = array[:self.n_rows]
+            self._arrays[column] = grown
+
+    def append(self, columns):
+        """Hängt neue Zeilen an; columns ist ein Dict Spaltenname -> Werte (gleich lang)."""
+        length = len(next(iter(columns.values()))) if columns else 0
+        if length == 0:
+            return
+        self.reserve(self.n_rows + length)
+        for column in self.columns:
+            values = columns.get(column)
+            if values is not None:
+                self._arrays[column][self.n_rows:self.n_rows + length] = values
+        self.n_rows += length
+        self._valid_mask = None
+
+    def clear(self):
+        self.n_rows = 0
+        self._valid_mask = None
+
+    def column(self, column):
+        """View auf die gefüllten Zeilen einer Spalte (ohne Kopie)."""
+        return self._arrays[column][:self.n_rows]
+
+    def valid_mask(self):
+        """Maske der Zeilen, in denen nicht alle Werte 0 sind (wird einmal berechnet und gecacht)."""
+        if self._valid_mask is None:
+            mask = np.zeros(self.n_rows, dtype=bool)
+            for column in self.columns:
+                mask |= self.column(column) != 0
+            self._valid_mask = mask
+        return self._valid_mask
+
+    def view(self, valid_only=True):
+        """Gibt die Spalten als Dict zurück.
+
+        Sind alle Zeilen gültig (Normalfall), sind es Views ohne Kopie; sonst werden die Nullzeilen herausgefiltert.
+        """
+        if valid_only and not self.valid_mask().all():
+            mask = self.valid_mask()
+            return {column: self.column(column)[mask] for column in self.columns}
+        return {column: self.column(column) for column in self.columns}
+
+    def rows(self, valid_only=True):
+        """Zeilenweise Werte, z.B. für die Anzeige in einer Tabelle."""
+        return zip(*(values.tolist() for values in self.view(valid_only).values()))
+
+    def to_dataframe(self, valid_only=True):
+        return pd.DataFrame(self.view(valid_only), columns=self.columns, copy=False)
+
+    @property
+    def nbytes(self):
+        """Belegter Speicher der gefüllten Zeilen in Bytes."""
+        return sum(self.dtypes[column].itemsize for column in self.columns) * self.n_rows
+
+    @property
+    def allocated_nbytes(self):
+        return sum(array.nbytes for array in self._arrays.values())
+
+    def memory_report(self):
+        return (f"{self.n_rows} rows x {len(self.columns)} columns, "
+                f"{self.nbytes / 1024:.1f} KiB used ({self.allocated_nbytes / 1024:.1f} KiB allocated)")
@@ -0,0 +1,166 @@
+import os
+import numpy as np
+import pandas as pd
+from opcua import ua
+import sps_verbindung
+from sps_verbindung import index_range
+from messpuffer import Messpuffer, dtype_for_variant
+
+# Datenbaustein mit den Messwerten
+MESSWERTE_DB = "Messwerte_DB"
+
+# Datei für die Variablen (Registernamen)
+VARIABLES_CSV = 'variables.csv'
+
+# Standard-Variablen im Messwerte_DB
+DEFAULT_VARIABLES = [
+    "index", "Messprogramm", "n_soll", "n", "M_soll", "M", "Strom_Effektivwert_soll", "I",
+    "Stromwinkel_soll", "phi", "id_soll", "id", "iq_soll", "iq", "U", "Pmech", "Pauf",
+    "eta", "Temperatur", "I_R_mess", "U_R_mess", "R"
+]
+
+# Spalte, deren letzter Eintrag ungleich 0 die Anzahl protokollierter Zeilen angibt
+INDEX_VARIABLE = "index"
+
+# Skalare Zählervariable der SPS mit der Anzahl protokollierter Zeilen (None: über INDEX_VARIABLE bestimmen)
+ROW_COUNT_VARIABLE = None
+
+# Anzahl Einträge der Index-Spalte, die je Request zur Bestimmung der Zeilenanzahl gelesen werden
+PROBE_ROWS = 1000
+
+def load_variables(csv_file=VARIABLES_CSV):
+    """Lädt die Variablen aus einer CSV-Datei oder verwendet die Standardwerte."""
+    if os.path.exists(csv_file):
+        try:
+            df = pd.read_csv(csv_file)
+            return df['variables'].tolist()
+        except pd.errors.EmptyDataError:
+            pass
+    # Standard-Variablen, falls die Datei nicht existiert oder leer ist
+    return list(DEFAULT_VARIABLES)
+
+def count_rows(value, offset=0):
+    """Bestimmt die Anzahl protokollierter Zeilen aus einem Zähler oder einem (Teil-)Array der Index-Spalte.
+
+    offset ist der Startindex, ab dem das Teil-Array gelesen wurde.
+    """
+    if isinstance(value, (list, tuple)):
+        for position in range(len(value) - 1, -1, -1):
+            if value[position] != 0:
+                return offset + position + 1
+        return offset
+    return int(value or 0)
+
+def slice_result(value, start, stop, sliced_by_server=True):
+    """Gibt den angeforderten Bereich eines gelesenen Arrays zurück.
+
+    Server, die IndexRange ignorieren, liefern das ganze Array; dann wird hier lokal ausgeschnitten.
+    """
+    if not isinstance(value, (list, tuple)):
+        return []
+    if not sliced_by_server:
+        return list(value[start:stop])
+    return list(value)
+
+class MesswerteLeser:
+    """Liest die Messwert-Arrays inkrementell: je Abruf werden nur die neuen Zeilen per IndexRange übertragen."""
+
+    def __init__(self, session, variables, db_name=MESSWERTE_DB, row_count_variable=ROW_COUNT_VARIABLE,
+                 batch_size=sps_verbindung.READ_BATCH_SIZE):
+        self.session = session
+        self.variables = list(variables)
+        self.db_name = db_name
+        self.row_count_variable = row_count_variable
+        self.batch_size = batch_size
+        self.dtypes = None
+        self.reset()
+
+    def reset(self):
+        """Verwirft die bereits gelesenen Zeilen, der nächste Abruf beginnt wieder bei Zeile 0."""
+        self.rows_fetched = 0
+        self.data = Messpuffer(self.variables, self.dtypes)
+        self.status_codes = {}
+
+    def _load_dtypes(self):
+        """Übernimmt die Datentypen der SPS-Variablen (einmalig, aus dem Cache der Session)."""
+        if self.dtypes is None:
+            data_types = self.session.get_data_types(self.db_name, self.variables)
+            self.dtypes = {variable: dtype_for_variant(data_type) for variable, data_type in data_types.items()}
+            if self.rows_fetched == 0:
+                self.data = Messpuffer(self.variables, self.dtypes)
+
+    def read_row_count(self):
+        """Liest die Anzahl der von der SPS protokollierten Zeilen."""
+        if self.row_count_variable:
+            node = self.session.get_node(self.db_name, self.row_count_variable)
+            result = self.session.read_values([node])[0]
+            result.StatusCode.check()
+            return count_rows(result.Value.Value)
+
+        # Index-Spalte ab der letzten bekannten Zeile lesen; die Überlappung um eine Zeile
+        # erkennt, ob die SPS inzwischen eine neue Messung begonnen hat
+        start = max(self.rows_fetched - 1, 0)
+        node = self.session.get_node(self.db_name, INDEX_VARIABLE)
+        sliced_by_server = self.session.supports_index_range(node)
+        values = []
+        window_start = start
+        while True:
+            window_stop = window_start + PROBE_ROWS
+            result = self.session.read_values([node], index_range=index_range(window_start, window_stop))[0]
+            if result.StatusCode.value == ua.StatusCodes.BadIndexRangeNoData:
+                break
+            result.StatusCode.check()
+            window = slice_result(result.Value.Value, window_start, window_stop, sliced_by_server)
+            values.extend(window)
+            if len(window) < PROBE_ROWS or window[-1] == 0:
+                break
+            window_start = window_stop
+
+        last_index = self.data[INDEX_VARIABLE] if INDEX_VARIABLE in self.data.columns else None
+        if self.rows_fetched and last_index is not None and (not values or values[0] != last_index[-1]):
+            print("Messwerte_DB was overwritten, reading all rows again")
+            self.reset()
+            return self.read_row_count()
+        return count_rows(values, start)
+
+    def fetch_range(self, start, stop, progress=None):
+        """Liest die Zeilen start bis stop (exklusiv) aller Variablen und gibt sie als Dict von Arrays zurück.
+
+        progress(done, total) wird mit der Anzahl gelesener Variablen aufgerufen.
+        """
+        nodes = self.session.get_nodes(self.db_name, self.variables)
+        results = self.session.read_values(nodes, self.batch_size, index_range=index_range(start, stop),
+                                           progress=progress)
+        sliced_by_server = self.session.supports_index_range(nodes[0])
+
+        columns = {}
+        for variable, result in zip(self.variables, results):
+            self.status_codes[variable] = result.StatusCode
+            if result.StatusCode.is_good():
+                column = slice_result(result.Value.Value, start, stop, sliced_by_server)
+            else:
+                print(f"Reading '{variable}' failed: {result.StatusCode.name}")
+                column = []
+            values = np.zeros(stop - start, dtype=self.data.dtypes[variable])
+            values[:len(column)] = column
+            columns[variable] = values
+        return columns
+
+    def fetch_new(self, row_count=None, progress=None):
+        """Liest nur die seit dem letzten Abruf hinzugekommenen Zeilen und hängt sie an die Daten an.
+
+        Ist row_count bereits bekannt (z.B. aus einer Subscription), entfällt die Abfrage der Zeilenanzahl.
+        Gibt die neuen Zeilen spaltenweise als Dict von Arrays zurück.
+        """
+        self._load_dtypes()
+        if row_count is None:
+            row_count = self.read_row_count()
+        elif row_count < self.rows_fetched:
+            self.reset()
+        if row_count <= self.rows_fetched:
+            return {}
+
+        columns = self.fetch_range(self.rows_fetched, row_count, progress)
+        self.data.append(columns)
+        self.rows_fetched = row_count
+        return columns
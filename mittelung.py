@@ -0,0 +1,222 @@
+import numpy as np
+import pandas as pd
+import messlauf_datei
+import verfeinerung
+
+# Sollwerte, an deren Wechsel ein neuer Arbeitspunkt erkannt wird (soweit im Messlauf vorhanden)
+SETPOINT_COLUMNS = ['n_soll', 'M_soll', 'Strom_Effektivwert_soll', 'Stromwinkel_soll']
+
+# Ohne Sollwerte: auf diese Toleranzen gerundete Istwerte
+FALLBACK_SETPOINTS = {'n': verfeinerung.SPEED_TOLERANCE, 'M': verfeinerung.TORQUE_TOLERANCE}
+
+# Ein Arbeitspunkt gilt als eingeschwungen, sobald diese Größen über STEADY_WINDOW aufeinanderfolgende
+# Messungen um höchstens die Toleranz schwanken; gemittelt wird ab der ersten Messung dieses Fensters.
+# Punkte mit weniger Messungen als das Fenster (z.B. eine von der SPS gemittelte Zeile je Arbeitspunkt)
+# sind nicht beurteilbar.
+STEADY_TOLERANCES = {'n': 5.0, 'M': 0.3, 'I': 0.3}
+STEADY_WINDOW = 3
+
+# Spalten, die nicht gemittelt werden
+EXCLUDED_COLUMNS = ('index',)
+
+# Werte darüber sind Platzhalter der SPS (9.91e37) und zählen als ungültig
+INVALID_LIMIT = 1e30
+
+# Zeilen je Block beim Lesen gespeicherter Messläufe
+CHUNK_ROWS = 100000
+
+class Statistik:
+    """Anzahl, Mittelwert, Streuung, Minimum und Maximum je Spalte in einem Durchgang.
+
+    Blöcke werden mit der Formel von Chan (paarweise Variante des Welford-Algorithmus) zusammengeführt, der
+    Speicherbedarf hängt daher nur von der Spaltenanzahl ab. Ungültige Werte (NaN) werden je Spalte ausgelassen.
+    """
+
+    def __init__(self, width):
+        self.count = np.zeros(width)
+        self.mean = np.zeros(width)
+        self.m2 = np.zeros(width)
+        self.min = np.full(width, np.inf)
+        self.max = np.full(width, -np.inf)
+
+    def add(self, block):
+        """Nimmt einen Block (Zeilen x Spalten) auf."""
+        if len(block) == 0:
+            return
+        valid = np.isfinite(block)
+        count = valid.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, np.where(valid, block, 0).sum(axis=0) / count, 0)
+        m2 = np.where(valid, (block - mean) ** 2, 0).sum(axis=0)
+        total = self.count + count
+        delta = mean - self.mean
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.mean = np.where(total > 0, self.mean + delta * count / total, 0)
+            self.m2 = np.where(total > 0, self.m2 + m2 + delta ** 2 * self.count * count / total, 0)
+        self.count = total
+        self.min = np.minimum(self.min, np.where(valid, block, np.inf).min(axis=0))
+        self.max = np.maximum(self.max, np.where(valid, block, -np.inf).max(axis=0))
+
+    def std(self):
+        """Stichproben-Standardabweichung (NaN bei weniger als zwei Werten)."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 1, np.sqrt(self.m2 / (self.count - 1)), np.nan)
+
+    def values(self):
+        """(mean, std, min, max); Spalten ohne gültige Werte sind NaN."""
+        empty = self.count == 0
+        return (np.where(empty, np.nan, self.mean), self.std(),
+                np.where(empty, np.nan, self.min), np.where(empty, np.nan, self.max))
+
+class Arbeitspunktmittelung:
+    """Reduziert einen Messlauf blockweise auf eine Zeile je Arbeitspunkt (Mittelwert, Streuung, Min, Max).
+
+    Ein Arbeitspunkt ist eine Folge von Zeilen mit gleichen Sollwerten. Verwendet werden nur die Messungen ab dem
+    Einschwingen (siehe STEADY_TOLERANCES); schwingt ein Punkt nie ein, gehen alle Messungen ein und die Zeile
+    wird mit stationaer = False markiert. Hat ein Punkt weniger Messungen als window, ist stationaer = None
+    (nicht beurteilbar). Gehalten werden nur die laufenden Statistiken und die letzten STEADY_WINDOW Zeilen,
+    daher eignet sich die Klasse für gespeicherte Dateien wie für den Live-Modus (add mit den Spalten neuer
+    Zeilen, z.B. aus LiveErfassung.on_rows).
+    """
+
+    def __init__(self, variables, setpoint_columns=None, steady_tolerances=None, window=STEADY_WINDOW):
+        self.variables = list(variables)
+        if setpoint_columns is None:
+            setpoint_columns = [column for column in SETPOINT_COLUMNS if column in self.variables]
+        self.setpoint_columns = list(setpoint_columns)
+        self.rounded = {} if self.setpoint_columns else {column: step for column, step in FALLBACK_SETPOINTS.items()
+                                                         if column in self.variables}
+        if not self.setpoint_columns and not self.rounded:
+            raise KeyError("Messlauf enthält weder Sollwerte noch n und M")
+        # Sollwerte stehen als Schlüssel in der Ergebniszeile und werden nicht zusätzlich gemittelt
+        self.columns = [column for column in self.variables
+                        if column not in EXCLUDED_COLUMNS and column not in self.setpoint_columns]
+        tolerances = STEADY_TOLERANCES if steady_tolerances is None else steady_tolerances
+        self.tolerances = {column: tolerance for column, tolerance in tolerances.items() if column in self.columns}
+        self.steady_positions = [self.columns.index(column) for column in self.tolerances]
+        self.steady_limits = np.array(list(self.tolerances.values()), dtype=float)
+        self.window = max(int(window), 1)
+        self.rows_seen = 0
+        self._key = None
+        self._start_row = 0
+        self._reset_point()
+
+    def _reset_point(self):
+        self._rows = 0
+        self._steady = Statistik(len(self.columns))
+        self._all = Statistik(len(self.columns))
+        self._settled = False
+        self._pending = np.empty((0, len(self.columns)))
+
+    def _keys(self, columns):
+        if self.setpoint_columns:
+            return np.stack([np.round(np.asarray(columns[column], dtype=float), 3)
+                             for column in self.setpoint_columns], axis=1)
+        return np.stack([np.round(np.asarray(columns[column], dtype=float) / step)
+                         for column, step in self.rounded.items()], axis=1)
+
+    def add(self, columns):
+        """Nimmt neue Zeilen auf (Dict Spalte -> Array); gibt die dabei abgeschlossenen Arbeitspunkte zurück."""
+        keys = self._keys(columns)
+        if len(keys) == 0:
+            return pd.DataFrame()
+        block = np.stack([np.asarray(columns[column], dtype=float) for column in self.columns], axis=1)
+        block[np.abs(block) > INVALID_LIMIT] = np.nan
+
+        # Zeilen, an denen sich die Sollwerte ändern (auch gegenüber der letzten Zeile des vorherigen Blocks)
+        previous = np.vstack([keys[:1] if self._key is None else self._key[np.newaxis], keys[:-1]])
+        changes = np.flatnonzero(np.any(keys != previous, axis=1))
+        finished = []
+        start = 0
+        for change in list(changes) + [len(keys)]:
+            if change > start:
+                self._add_segment(block[start:change], keys[start])
+            if change < len(keys):
+                finished.append(self._finish_point())
+                self._start_row = self.rows_seen + change
+            start = change
+        self.rows_seen += len(keys)
+        return pd.DataFrame(finished)
+
+    def _add_segment(self, segment, key):
+        self._key = key
+        self._rows += len(segment)
+        self._all.add(segment)
+        if self._settled:
+            self._steady.add(segment)
+            return
+        data = np.vstack([self._pending, segment])
+        first = self._settling_row(data)
+        if first is None:
+            self._pending = data[-(self.window - 1):] if self.window > 1 else data[:0]
+        else:
+            self._settled = True
+            self._steady.add(data[first:])
+            self._pending = data[:0]
+
+    def _settling_row(self, data):
+        """Erste Zeile eines Fensters, in dem alle Einschwinggrößen innerhalb ihrer Toleranz liegen."""
+        if len(data) < self.window:
+            return None
+        if not self.steady_positions:
+            return 0
+        windows = np.lib.stride_tricks.sliding_window_view(data[:, self.steady_positions], self.window, axis=0)
+        # NaN im Fenster ergibt keine gültige Schwankung, das Fenster zählt dann nicht als eingeschwungen
+        spread = windows.max(axis=2) - windows.min(axis=2)
+        steady = np.flatnonzero(np.all(spread <= self.steady_limits, axis=1))
+        return int(steady[0]) if len(steady) else None
+
+    def _finish_point(self):
+        """Schließt den laufenden Arbeitspunkt ab und gibt seine Zeile als Dict zurück."""
+        statistik = self._steady if self._settled else self._all
+        mean, std, minimum, maximum = statistik.values()
+        names = self.setpoint_columns or [f"{column}_stufe" for column in self.rounded]
+        key = self._key if self.setpoint_columns else self._key * np.array(list(self.rounded.values()))
+        row = dict(zip(names, key.tolist()))
+        row.update({'erste_zeile': self._start_row, 'zeilen': self._rows,
+                    'messungen': int(statistik.count.max()) if len(statistik.count) else 0,
+                    'stationaer': True if self._settled else (None if self._rows < self.window else False)})
+        for position, column in enumerate(self.columns):
+            row[column] = mean[position]
+            row[column + '_std'] = std[position]
+            row[column + '_min'] = minimum[position]
+            row[column + '_max'] = maximum[position]
+        self._reset_point()
+        return row
+
+    def finish(self):
+        """Schließt den letzten Arbeitspunkt ab (Ende des Messlaufs); gibt ihn als DataFrame zurück."""
+        if self._key is None or self._rows == 0:
+            return pd.DataFrame()
+        points = pd.DataFrame([self._finish_point()])
+        self._key = None
+        return points
+
+def steady_window(metadata):
+    """Einschwingfenster für einen Messlauf, höchstens samples_per_point aus den Metadaten."""
+    samples = metadata.get('samples_per_point')
+    return min([STEADY_WINDOW] + list(samples)) if samples else STEADY_WINDOW
+
+def aggregate_run(path, chunk_rows=CHUNK_ROWS, **options):
+    """Mittelt einen gespeicherten Messlauf blockweise (CSV in Blöcken gelesen, Binärformat per Memory-Mapping).
+
+    Ohne window in options wird das Fenster aus den Metadaten bestimmt (steady_window).
+    """
+    metadata = messlauf_datei.load_metadata(path)
+    variables = metadata['variables']
+    if options.get('window') is None:
+        options['window'] = steady_window(metadata)
+    mittelung = Arbeitspunktmittelung(variables, **options)
+    points = []
+    if messlauf_datei.is_binary_run(path):
+        columns = messlauf_datei.load_run(path)
+        rows = len(next(iter(columns.values()))) if columns else 0
+        for start in range(0, rows, chunk_rows):
+            points.append(mittelung.add({column: values[start:start + chunk_rows]
+                                         for column, values in columns.items()}))
+    else:
+        for chunk in pd.read_csv(path, chunksize=chunk_rows):
+            points.append(mittelung.add({column: chunk[column].to_numpy() for column in chunk.columns}))
+    points.append(mittelung.finish())
+    points = [frame for frame in points if len(frame)]
+    return pd.concat(points, ignore_index=True) if points else pd.DataFrame()
@@ -0,0 +1,251 @@
+import math
+import time
+import numpy as np
+import pandas as pd
+import messlauf_datei
+import sps_upload
+from messwerte_leser import MesswerteLeser, MESSWERTE_DB
+
+# Standardwerte der MTPA-Suche (Drehzahl und Strombereich wie bei der Stromwinkel-Messung)
+MTPA_DEFAULTS = {
+    'angle_min': 40,           # Suchbereich Stromwinkel (°)
+    'angle_max': 90,
+    'tolerance': 1.0,          # Suche endet, wenn das Intervall kleiner ist (°)
+    'warm_width': 16,          # Suchintervall einer Stromstufe um das Optimum der vorherigen (°)
+    'warm_start_width': 8,     # nächste Stromstufe startet, sobald das Intervall der vorherigen so klein ist (°)
+}
+
+# Auflösung der Stromwinkel in der Liste (°); gleiche Winkel werden nur einmal gemessen
+ANGLE_RESOLUTION = 0.1
+
+# Wie oft das Suchintervall erweitert wird, wenn das Optimum am Rand liegt
+MAX_EXPANSIONS = 3
+
+# Spalten einer Messung, die für die Suche gebraucht werden
+MEASUREMENT_COLUMNS = ['Strom_Effektivwert_soll', 'Stromwinkel_soll', 'M']
+
+GOLDEN = (math.sqrt(5) - 1) / 2
+
+def _round(value, resolution=ANGLE_RESOLUTION):
+    return round(round(value / resolution) * resolution, 6)
+
+class GoldenSection:
+    """Goldener-Schnitt-Suche nach dem Stromwinkel mit maximalem Drehmoment für eine Stromstufe.
+
+    Die Suche wird aus den bereits gemessenen Winkeln nachgespielt (advance) und meldet die Winkel, die als
+    nächstes gemessen werden müssen (pending). Liegt das Optimum am Rand des Intervalls, wird dieses bis zu
+    MAX_EXPANSIONS mal in Richtung des Rands verschoben (nicht über angle_min/angle_max hinaus).
+    """
+
+    def __init__(self, low, high, tolerance, angle_min, angle_max, warm_start_width):
+        self.angle_min, self.angle_max = angle_min, angle_max
+        self.tolerance = tolerance
+        self.warm_start_width = warm_start_width
+        self.expansions = 0
+        self.warm_center = None
+        self._start(low, high)
+
+    def _start(self, low, high):
+        self.low, self.high = max(low, self.angle_min), min(high, self.angle_max)
+        self.initial = (self.low, self.high)
+        self.x1 = _round(self.high - GOLDEN * (self.high - self.low))
+        self.x2 = _round(self.low + GOLDEN * (self.high - self.low))
+
+    @property
+    def done(self):
+        return self.high - self.low <= self.tolerance or self.x2 - self.x1 < ANGLE_RESOLUTION
+
+    def pending(self, measured):
+        if self.done:
+            return []
+        return sorted({angle for angle in (self.x1, self.x2) if angle not in measured})
+
+    def advance(self, measured):
+        """Führt alle Schritte aus, deren Winkel bereits gemessen sind (measured: Winkel -> Drehmoment)."""
+        while True:
+            self._note_warm_center()
+            if self.done:
+                if not self._expand(measured):
+                    return
+                continue
+            if self.x1 not in measured or self.x2 not in measured:
+                return
+            if measured[self.x1] >= measured[self.x2]:
+                self.high = self.x2
+                self.x2 = self.x1
+                self.x1 = _round(self.high - GOLDEN * (self.high - self.low))
+            else:
+                self.low = self.x1
+                self.x1 = self.x2
+                self.x2 = _round(self.low + GOLDEN * (self.high - self.low))
+
+    def _note_warm_center(self):
+        # Mitte des Intervalls, sobald es klein genug ist: Startpunkt der nächsten Stromstufe
+        if self.warm_center is None and (self.done or self.high - self.low <= self.warm_start_width):
+            self.warm_center = (self.low + self.high) / 2
+
+    def _expand(self, measured):
+        best = max(measured, key=measured.get) if measured else None
+        if best is None or self.expansions >= MAX_EXPANSIONS:
+            return False
+        width = self.initial[1] - self.initial[0]
+        if best <= self.initial[0] + self.tolerance and self.initial[0] > self.angle_min:
+            self._start(self.initial[0] - width, self.initial[0] + self.tolerance)
+        elif best >= self.initial[1] - self.tolerance and self.initial[1] < self.angle_max:
+            self._start(self.initial[1] - self.tolerance, self.initial[1] + width)
+        else:
+            return False
+        self.expansions += 1
+        return True
+
+def estimate_optimum(measured):
+    """MTPA-Winkel und Drehmoment: Scheitel der Parabel durch den besten Messpunkt und seine Nachbarn."""
+    angles = np.array(sorted(measured))
+    torques = np.array([measured[angle] for angle in angles])
+    best = int(np.argmax(torques))
+    if 0 < best < len(angles) - 1:
+        a, b, c = np.polyfit(angles[best - 1:best + 2], torques[best - 1:best + 2], 2)
+        if a < 0:
+            angle = min(max(-b / (2 * a), angles[best - 1]), angles[best + 1])
+            return angle, a * angle ** 2 + b * angle + c
+    return angles[best], torques[best]
+
+class MTPASuche:
+    """Sucht für jede Stromstufe den Stromwinkel mit maximalem Drehmoment je Ampere (MTPA).
+
+    Statt des vollständigen Rasters Strom x Winkel wird je Stromstufe ein goldener Schnitt über den Winkel
+    ausgeführt; jede Stufe startet in einem engen Intervall um das Optimum der vorherigen (Warmstart).
+    Die Suche hat keinen eigenen Zustand: next_round und results spielen sie aus allen bisherigen Messungen nach,
+    daher kann sie in Runden (Liste erzeugen, messen, nächste Liste) oder geschlossen an der SPS laufen.
+    """
+
+    def __init__(self, speed, current_start, current_end, current_step, angle_min=MTPA_DEFAULTS['angle_min'],
+                 angle_max=MTPA_DEFAULTS['angle_max'], tolerance=MTPA_DEFAULTS['tolerance'],
+                 warm_width=MTPA_DEFAULTS['warm_width'], warm_start_width=MTPA_DEFAULTS['warm_start_width']):
+        self.speed = int(speed)
+        current_start, current_end, current_step = int(current_start), int(current_end), int(current_step)
+        self.currents = list(range(current_start, current_end + current_step, current_step))
+        self.angle_min, self.angle_max = float(angle_min), float(angle_max)
+        self.tolerance = float(tolerance)
+        self.warm_width = float(warm_width)
+        self.warm_start_width = float(warm_start_width)
+
+    def _measured(self, measurements):
+        """Dict Strom -> (Winkel -> mittleres Drehmoment) aus den Messungen."""
+        measured = {current: {} for current in self.currents}
+        if measurements is None or len(measurements) == 0:
+            return measured
+        df = pd.DataFrame({
+            'strom': np.round(np.asarray(measurements['Strom_Effektivwert_soll'], dtype=float), 3),
+            'winkel': [_round(angle) for angle in np.asarray(measurements['Stromwinkel_soll'], dtype=float)],
+            'M': np.asarray(measurements['M'], dtype=float),
+        })
+        for (current, angle), torque in df.groupby(['strom', 'winkel'])['M'].mean().items():
+            if current in measured:
+                measured[current][angle] = torque
+        return measured
+
+    def _replay(self, measurements):
+        """Spielt die Suche nach; gibt je gestarteter Stromstufe (Strom, GoldenSection, Messwerte) zurück."""
+        measured = self._measured(measurements)
+        levels = []
+        low, high = self.angle_min, self.angle_max
+        for current in self.currents:
+            if levels:
+                center = levels[-1][1].warm_center
+                if center is None:
+                    break
+                low, high = center - self.warm_width / 2, center + self.warm_width / 2
+            search = GoldenSection(low, high, self.tolerance, self.angle_min, self.angle_max, self.warm_start_width)
+            search.advance(measured[current])
+            levels.append((current, search, measured[current]))
+        return levels
+
+    def next_round(self, measurements=None):
+        """Liste der als nächstes zu messenden Punkte (index, drehzahl, strom_effektiv, stromwinkel); leer = fertig."""
+        rows = [(current, angle) for current, search, measured in self._replay(measurements)
+                for angle in search.pending(measured)]
+        return pd.DataFrame({
+            "index": np.arange(1, len(rows) + 1),
+            "drehzahl": self.speed,
+            "strom_effektiv": [current for current, _ in rows],
+            "stromwinkel": [angle for _, angle in rows],
+        })
+
+    def results(self, measurements):
+        """Ergebnis je Stromstufe: MTPA-Winkel, Drehmoment, Drehmoment je Ampere, Anzahl Messpunkte, fertig."""
+        rows = []
+        for current, search, measured in self._replay(measurements):
+            if not measured:
+                continue
+            angle, torque = estimate_optimum(measured)
+            rows.append({'strom_effektiv': current, 'stromwinkel_mtpa': round(float(angle), 2),
+                         'drehmoment': float(torque), 'drehmoment_je_ampere': float(torque) / current,
+                         'messpunkte': len(measured), 'fertig': search.done})
+        return pd.DataFrame(rows, columns=['strom_effektiv', 'stromwinkel_mtpa', 'drehmoment', 'drehmoment_je_ampere',
+                                           'messpunkte', 'fertig'])
+
+def load_measurements(paths):
+    """Lädt die Messungen der bisherigen Runden (CSV oder .messlauf)."""
+    if not paths:
+        return pd.DataFrame(columns=MEASUREMENT_COLUMNS)
+    return pd.concat([messlauf_datei.load_dataframe(path, MEASUREMENT_COLUMNS) for path in paths], ignore_index=True)
+
+def completed_points(keys, pending, samples_per_point=None, stalled=False):
+    """Offene Punkte, deren Zeilen im Messwerte_DB vollständig sind.
+
+    keys sind die Sollwerte je Zeile in der Reihenfolge der SPS. Ein Punkt ist fertig, sobald danach ein anderer
+    Sollwert protokolliert wurde oder er samples_per_point Zeilen hat. Für den zuletzt protokollierten Punkt ohne
+    bekannte Anzahl gilt das erst, wenn seit der letzten Abfrage keine Zeile hinzugekommen ist (stalled).
+    """
+    if not keys:
+        return set()
+    counts = pd.Series(keys).value_counts()
+    return {key for key in pending & set(keys)
+            if key != keys[-1] or stalled or (samples_per_point and counts[key] >= samples_per_point)}
+
+def run_closed_loop(session, suche, messpunkte_db=sps_upload.MESSPUNKTE_DB, messwerte_db=MESSWERTE_DB, measurements=None,
+                    poll_interval=2.0, round_timeout=3600, progress=None, samples_per_point=None):
+    """Führt die Suche geschlossen an der SPS aus: Runde hochladen, auf die Messwerte warten, nächste Runde.
+
+    Die SPS arbeitet jede hochgeladene Liste ab (Start wie gewohnt am Prüfstand). Da die SPS den Messwerte_DB
+    je Runde von vorn beschreibt und die Runden nur wenige Punkte haben, wird er bei jeder Abfrage ganz gelesen;
+    übernommen werden die Zeilen eines offenen Punkts dieser Runde erst, wenn sie vollständig sind (siehe
+    completed_points), damit die Suche mit allen Messungen des Punkts statt der ersten, noch einschwingenden rechnet.
+    progress(runde, punkte, text) meldet den Stand. Gibt alle Messungen als DataFrame zurück.
+    """
+    measurements = measurements if measurements is not None else pd.DataFrame(columns=MEASUREMENT_COLUMNS)
+    reader = MesswerteLeser(session, MEASUREMENT_COLUMNS, db_name=messwerte_db)
+    # Gemeinsamer Upload-Cache mit GUI und CLI, damit deren nächster Delta-Upload auf dem Stand der SPS aufsetzt
+    cache = sps_upload.UploadCache()
+    round_number = 0
+    while True:
+        liste = suche.next_round(measurements)
+        if liste.empty:
+            return measurements
+        round_number += 1
+        sps_upload.upload_list(session, liste, "Stromwinkel", cache, db_name=messpunkte_db)
+        if progress is not None:
+            progress(round_number, len(liste), "Punkte hochgeladen, warte auf Messwerte")
+
+        pending = {(float(current), _round(angle)) for current, angle in zip(liste['strom_effektiv'], liste['stromwinkel'])}
+        deadline = time.monotonic() + round_timeout
+        previous_rows = None
+        while pending:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Runde {round_number}: {len(pending)} Punkte nicht gemessen")
+            time.sleep(poll_interval)
+            reader.reset()
+            rows = pd.DataFrame(reader.fetch_new())
+            if rows.empty:
+                continue
+            keys = [(round(float(current), 3), _round(angle)) for current, angle
+                    in zip(rows['Strom_Effektivwert_soll'], rows['Stromwinkel_soll'])]
+            complete = completed_points(keys, pending, samples_per_point, stalled=len(rows) == previous_rows)
+            previous_rows = len(rows)
+            if not complete:
+                continue
+            measurements = pd.concat([measurements, rows[[key in complete for key in keys]]], ignore_index=True)
+            pending -= complete
+            if progress is not None:
+                progress(round_number, len(liste) - len(pending), f"von {len(liste)} Punkten gemessen")
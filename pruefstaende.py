@@ -0,0 +1,113 @@
+import concurrent.futures
+import os
+import time
+import pandas as pd
+import sps_verbindung
+from sps_verbindung import OPCUA_URL, NAMESPACE_INDEX
+
+# Datei mit den Prüfständen (eine Zeile je Prüfstand)
+BENCHES_CSV = 'pruefstaende.csv'
+BENCH_COLUMNS = ['name', 'url', 'namespace', 'messpunkte_db', 'messwerte_db', 'username', 'password']
+
+# Prüfstand, falls keine Datei vorhanden ist
+DEFAULT_BENCH_NAME = "Pruefstand"
+
+class Pruefstand:
+    """Ein Prüfstand mit OPC-UA Adresse, Namespace und Datenbausteinen seiner SPS."""
+
+    def __init__(self, name, url=OPCUA_URL, namespace=NAMESPACE_INDEX, messpunkte_db="Messpunkte_DB",
+                 messwerte_db="Messwerte_DB", username="", password=""):
+        self.name = name
+        self.url = url
+        self.namespace = int(namespace)
+        self.messpunkte_db = messpunkte_db
+        self.messwerte_db = messwerte_db
+        self.username = username
+        self.password = password
+
+    def __repr__(self):
+        return f"Pruefstand({self.name!r}, {self.url!r})"
+
+    def session(self):
+        """Gemeinsam genutzte Verbindung zur SPS dieses Prüfstands (jeder Prüfstand hat eine eigene)."""
+        return sps_verbindung.get_session(self.url, self.username, self.password, self.namespace)
+
+def load_benches(csv_file=BENCHES_CSV):
+    """Lädt die Prüfstände als Dict Name -> Pruefstand; ohne Datei gibt es nur den Standard-Prüfstand."""
+    if os.path.exists(csv_file):
+        try:
+            df = pd.read_csv(csv_file, dtype=str, keep_default_na=False)
+            benches = {}
+            for _, row in df.iterrows():
+                values = {column: row[column] for column in BENCH_COLUMNS if column in df.columns and row[column] != ""}
+                benches[values['name']] = Pruefstand(**values)
+            if benches:
+                return benches
+        except pd.errors.EmptyDataError:
+            pass
+    return {DEFAULT_BENCH_NAME: Pruefstand(DEFAULT_BENCH_NAME)}
+
+def save_benches(benches, csv_file=BENCHES_CSV):
+    df = pd.DataFrame([{column: getattr(bench, column) for column in BENCH_COLUMNS} for bench in benches.values()],
+                      columns=BENCH_COLUMNS)
+    df.to_csv(csv_file, index=False)
+
+def select_benches(benches, names=None):
+    """Wählt Prüfstände nach Namen aus (None = alle); unbekannte Namen lösen einen KeyError aus."""
+    if not names:
+        return list(benches.values())
+    unknown = [name for name in names if name not in benches]
+    if unknown:
+        raise KeyError("Unbekannte Prüfstände: " + ", ".join(unknown))
+    return [benches[name] for name in names]
+
+class BenchErgebnis:
+    """Ergebnis eines Auftrags auf einem Prüfstand: result bei Erfolg, sonst error, dazu die Dauer in s."""
+
+    def __init__(self, bench, result=None, error=None, duration=0.0):
+        self.bench = bench
+        self.result = result
+        self.error = error
+        self.duration = duration
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __str__(self):
+        status = f"OK ({self.result})" if self.ok else f"Fehler: {self.error or type(self.error).__name__}"
+        return f"{self.bench.name} [{self.bench.url}] {status}, {self.duration:.1f} s"
+
+def run_on_benches(benches, function, on_result=None):
+    """Führt function(bench) für alle Prüfstände gleichzeitig aus (ein Thread je Prüfstand).
+
+    Jeder Prüfstand hat eine eigene OPC-UA Verbindung; ein langsamer oder nicht erreichbarer Prüfstand
+    hält die anderen daher nicht auf. Fehler werden je Prüfstand gesammelt statt weitergereicht.
+    on_result(ergebnis) wird aufgerufen, sobald ein Prüfstand fertig ist.
+    Gibt ein Dict Name -> BenchErgebnis in der Reihenfolge der Prüfstände zurück.
+    """
+    def run(bench):
+        started = time.monotonic()
+        try:
+            return BenchErgebnis(bench, result=function(bench), duration=time.monotonic() - started)
+        except Exception as e:
+            return BenchErgebnis(bench, error=e, duration=time.monotonic() - started)
+
+    results = {}
+    if not benches:
+        return results
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(benches)) as executor:
+        futures = [executor.submit(run, bench) for bench in benches]
+        for future in concurrent.futures.as_completed(futures):
+            ergebnis = future.result()
+            results[ergebnis.bench.name] = ergebnis
+            if on_result is not None:
+                on_result(ergebnis)
+    return {bench.name: results[bench.name] for bench in benches}
+
+def summary(results):
+    """Text mit einer Zeile je Prüfstand."""
+    failed = sum(1 for ergebnis in results.values() if not ergebnis.ok)
+    lines = [str(ergebnis) for ergebnis in results.values()]
+    lines.append(f"{len(results) - failed} von {len(results)} Prüfständen erfolgreich")
+    return "\n".join(lines)
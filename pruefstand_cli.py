@@ -0,0 +1,456 @@
+"""Kommandozeile für den Prüfstand ohne GUI (importiert kein tkinter).
+
+Beispiele:
+    python pruefstand_cli.py generate kennfeld --speed-end 3000 -o liste.csv
+    python pruefstand_cli.py generate stromwinkel --defaults default_values_stromwinkel.csv -o sw.csv
+    python pruefstand_cli.py upload liste.csv --url opc.tcp://192.168.0.1:4840 --verify
+    python pruefstand_cli.py fetch -o Messung1_8000ms_20Messung.messlauf --url opc.tcp://192.168.0.1:4840
+    python pruefstand_cli.py upload liste.csv --all-benches
+    python pruefstand_cli.py fetch -o Messung_{bench}.csv --bench PS1 --bench PS2
+    python pruefstand_cli.py refine Messung1_8000ms_20Messung.csv -o verfeinerung.csv --order best
+    python pruefstand_cli.py mtpa runde1.csv runde2.csv -o runde3.csv
+    python pruefstand_cli.py mtpa --closed-loop --bench PS1 --results mtpa.csv
+    python pruefstand_cli.py analyze stromwinkel stromwinkelmessung_11.9.csv --lut mtpa_lut.csv --torque-step 5
+    python pruefstand_cli.py analyze kennfeld Messung1.csv Messung2.csv -o eta.png --quantity eta
+    python pruefstand_cli.py analyze verluste Messung*.csv -o verluste.csv --image p_fe.png --quantity P_fe
+    python pruefstand_cli.py analyze punkte live_2024-09-11_10-00-00.csv -o punkte.csv
+    python pruefstand_cli.py catalog scan Testfiles/Messdaten
+    python pruefstand_cli.py catalog find --speed 2000 --min Temperatur=60 --paths
+"""
+import argparse
+import os
+import sys
+import arbeitspunkte_generator as generator
+
+# OPC-UA und NumPy werden erst in den Befehlen importiert, die sie brauchen (schneller Start für generate)
+
+def add_connection_arguments(parser):
+    parser.add_argument('--url', default="opc.tcp://192.168.0.1:4840", help="OPC-UA Adresse der SPS")
+    parser.add_argument('--namespace', type=int, default=3, help="Namespace-Index")
+    parser.add_argument('--username', default="")
+    parser.add_argument('--password', default="")
+    parser.add_argument('--db', help="Datenbaustein (Standard: aus dem Prüfstand)")
+    parser.add_argument('--bench', action='append', help="Prüfstand aus der Prüfstandsliste (mehrfach möglich)")
+    parser.add_argument('--all-benches', action='store_true', help="alle Prüfstände gleichzeitig")
+    parser.add_argument('--benches-file', default='pruefstaende.csv', help="Prüfstandsliste (CSV)")
+
+def benches_from_args(args):
+    """Prüfstände aus --bench/--all-benches, sonst ein einzelner Prüfstand aus --url."""
+    import pruefstaende
+    if args.bench or args.all_benches:
+        benches = pruefstaende.load_benches(args.benches_file)
+        return pruefstaende.select_benches(benches, None if args.all_benches else args.bench)
+    return [pruefstaende.Pruefstand(args.url, args.url, args.namespace, username=args.username,
+                                    password=args.password)]
+
+def run_benches(args, function):
+    """Führt function(bench, session) auf allen gewählten Prüfständen gleichzeitig aus und meldet je Prüfstand."""
+    import pruefstaende
+
+    def run(bench):
+        session = bench.session()
+        session.connect()
+        return function(bench, session)
+
+    benches = benches_from_args(args)
+    results = pruefstaende.run_on_benches(benches, run)
+    if len(results) > 1:
+        print(pruefstaende.summary(results))
+    for ergebnis in results.values():
+        if not ergebnis.ok:
+            print(f"Error ({ergebnis.bench.name}): {ergebnis.error or type(ergebnis.error).__name__}", file=sys.stderr)
+    return 0 if all(ergebnis.ok for ergebnis in results.values()) else 1
+
+def bench_progress(bench):
+    def print_progress(done, total, text=""):
+        print(f"{bench.name} [{done}/{total}] {text}", file=sys.stderr)
+    return print_progress
+
+def generate(args):
+    """Erzeugt eine Arbeitspunktliste aus den Standardwerten (CSV) und den übergebenen Parametern."""
+    if args.mode == 'kennfeld':
+        values = generator.load_default_values(args.defaults or generator.KENNFELD_DEFAULTS_CSV,
+                                               generator.KENNFELD_DEFAULTS)
+    else:
+        values = generator.load_default_values(args.defaults or generator.STROMWINKEL_DEFAULTS_CSV,
+                                               generator.STROMWINKEL_DEFAULTS)
+    values.update({key: value for key, value in vars(args).items() if key in values and value is not None})
+
+    if args.mode == 'kennfeld':
+        liste, removed = generator.kennfeld_punkte(**values)
+        print(f"{len(liste)} operating points, {removed} duplicates removed", file=sys.stderr)
+
+        # Geschätzte Prüfstandszeit je Strategie, bei "best" wird die schnellste verwendet
+        liste = order_list(liste, args)
+    else:
+        liste = generator.stromwinkel_liste(**values)
+        print(f"{len(liste)} operating points", file=sys.stderr)
+
+    write_list(liste, args.output)
+    return 0
+
+def print_comparison(comparison):
+    import reihenfolge
+    for _, row in comparison.iterrows():
+        print(f"  {row['strategy']:<18} {reihenfolge.format_duration(row['total'])} h "
+              f"(cooling {reihenfolge.format_duration(row['cooling'])} h)", file=sys.stderr)
+
+def order_list(liste, args):
+    """Sortiert eine Kennfeld-Liste nach --order (best = kürzeste geschätzte Prüfstandszeit)."""
+    import reihenfolge
+    model = reihenfolge.load_cost_model(args.cost_model)
+    comparison = reihenfolge.compare_strategies(liste, model)
+    print_comparison(comparison)
+    strategy = comparison['strategy'][0] if args.order == 'best' else args.order
+    print(f"Order: {strategy}", file=sys.stderr)
+    return reihenfolge.order_points(liste, strategy, model)
+
+def write_list(liste, output):
+    if output == '-':
+        liste.to_csv(sys.stdout, index=False)
+    else:
+        liste.to_csv(output, index=False)
+
+def refine(args):
+    """Verfeinerungsliste aus gemessenen Messläufen (nur Punkte, wo sich eta oder Verluste stark ändern)."""
+    import verfeinerung
+    torque_limits = args.torque_limits
+    if torque_limits is None:
+        torque_limits = generator.load_default_values(args.defaults or generator.KENNFELD_DEFAULTS_CSV,
+                                                      generator.KENNFELD_DEFAULTS)['torque_limits']
+    params = {key: getattr(args, key) for key in ('eta_accuracy', 'loss_accuracy', 'speed_tolerance', 'torque_tolerance',
+                                                  'max_points') if getattr(args, key) is not None}
+    liste, measured = verfeinerung.refinement_list(args.runs, torque_limits=torque_limits, **params)
+    print(f"{measured} measured operating points, {len(liste)} refinement points", file=sys.stderr)
+    if len(liste):
+        liste = order_list(liste, args)
+    write_list(liste, args.output)
+    return 0
+
+def mtpa(args):
+    """MTPA-Suche je Stromstufe: nächste Runde aus den bisherigen Messungen oder geschlossen an der SPS."""
+    import mtpa_suche
+    values = generator.load_default_values(args.defaults or generator.STROMWINKEL_DEFAULTS_CSV,
+                                           generator.STROMWINKEL_DEFAULTS)
+    values.update({key: getattr(args, key) for key in ('speed', 'current_start', 'current_end', 'current_step')
+                   if getattr(args, key) is not None})
+    search_values = {key: getattr(args, key) for key in mtpa_suche.MTPA_DEFAULTS if getattr(args, key) is not None}
+    suche = mtpa_suche.MTPASuche(values['speed'], values['current_start'], values['current_end'],
+                                 values['current_step'], **search_values)
+    measurements = mtpa_suche.load_measurements(args.runs)
+
+    def save_results(measurements, path):
+        results = suche.results(measurements)
+        if not results.empty:
+            print(results.to_string(index=False), file=sys.stderr)
+        if path:
+            results.to_csv(path, index=False)
+
+    if not args.closed_loop:
+        next_round = suche.next_round(measurements)
+        save_results(measurements, args.results)
+        if next_round.empty:
+            print(f"MTPA search finished ({len(measurements)} measurements)", file=sys.stderr)
+        else:
+            print(f"Next round: {len(next_round)} operating points", file=sys.stderr)
+            write_list(next_round, args.output)
+        return 0
+
+    several = bool(args.all_benches or (args.bench and len(args.bench) > 1))
+
+    def search_on_bench(bench, session):
+        def print_progress(round_number, points, text):
+            print(f"{bench.name} [Runde {round_number}] {points} {text}", file=sys.stderr)
+        result = mtpa_suche.run_closed_loop(session, suche, args.db or bench.messpunkte_db, bench.messwerte_db,
+                                            measurements, progress=print_progress, samples_per_point=args.samples)
+        if args.output != '-':
+            result.to_csv(output_path(args.output, bench, several), index=False)
+        save_results(result, args.results and output_path(args.results, bench, several))
+        return len(result)
+
+    return run_benches(args, search_on_bench)
+
+def analyze(args):
+    """Wertet eine Stromwinkel-Messung aus: MTPA-Winkel, Drehmoment je Ampere und id/iq je Stromstufe."""
+    import stromwinkel_auswertung
+    results = stromwinkel_auswertung.evaluate_file(args.run, None if args.no_cache else stromwinkel_auswertung.AUSWERTUNG_CACHE_DIR)
+    print(f"{len(results)} current levels evaluated", file=sys.stderr)
+    write_list(results, args.output)
+    if args.lut:
+        stromwinkel_auswertung.lookup_table(results, args.torque_step).to_csv(args.lut, index=False)
+    return 0
+
+def analyze_kennfeld(args):
+    """Wirkungsgradkennfeld aus einem oder mehreren Messläufen als Bild und/oder Raster (CSV)."""
+    import wirkungsgrad_kennfeld
+    kennfeld = wirkungsgrad_kennfeld.build(args.runs, args.speed_step, args.torque_step,
+                                           None if args.no_cache else wirkungsgrad_kennfeld.AUSWERTUNG_CACHE_DIR)
+    print(f"{len(kennfeld.points)} operating points, grid {len(kennfeld.speeds)} x {len(kennfeld.torques)}, "
+          f"quantities: {', '.join(kennfeld.quantities)}", file=sys.stderr)
+    if args.quantity not in kennfeld.grids:
+        raise KeyError(f"{args.quantity} ist nicht im Messlauf enthalten")
+    if args.grid:
+        kennfeld.to_dataframe(args.quantity).to_csv(args.grid, index=False)
+    if args.output:
+        import matplotlib
+        matplotlib.use('Agg')
+        from matplotlib.figure import Figure
+        figure = Figure(figsize=(8, 6))
+        ax = figure.add_subplot(111)
+        figure.colorbar(wirkungsgrad_kennfeld.plot(kennfeld, args.quantity, ax), ax=ax)
+        figure.savefig(args.output, dpi=150)
+    return 0
+
+def analyze_verluste(args):
+    """Verlustaufteilung je Arbeitspunkt für beliebig viele Messläufe, optional als Verlustkennfeld (Bild)."""
+    import verluste
+    rows, points = verluste.calculate_runs(args.runs, verluste.load_parameters(args.parameters))
+    print(f"{len(args.runs)} runs, {len(rows)} rows, {len(points)} operating points", file=sys.stderr)
+    write_list(points, args.output)
+    if args.rows:
+        rows.to_csv(args.rows, index=False)
+    if args.image:
+        if args.quantity not in verluste.LOSS_COLUMNS:
+            raise KeyError(f"{args.quantity} ist keine Verlustart")
+        import matplotlib
+        matplotlib.use('Agg')
+        from matplotlib.figure import Figure
+        import wirkungsgrad_kennfeld
+        kennfeld = verluste.loss_map(points, args.speed_step, args.torque_step)
+        figure = Figure(figsize=(8, 6))
+        ax = figure.add_subplot(111)
+        contour = wirkungsgrad_kennfeld.plot(kennfeld, args.quantity, ax, title=verluste.LOSS_COLUMNS[args.quantity])
+        figure.colorbar(contour, ax=ax)
+        figure.savefig(args.image, dpi=150)
+    return 0
+
+def analyze_punkte(args):
+    """Eine Zeile je Arbeitspunkt (Mittelwert, Streuung, Min, Max ab dem Einschwingen) aus einem Messlauf."""
+    import mittelung
+    points = mittelung.aggregate_run(args.run, window=args.window)
+    if len(points):
+        steady = points['stationaer']
+        print(f"{len(points)} operating points: {int(steady.eq(True).sum())} settled, {int(steady.eq(False).sum())} "
+              f"not settled, {int(steady.isna().sum())} unknown (fewer rows than the window)", file=sys.stderr)
+    write_list(points, args.output)
+    return 0
+
+def parse_bounds(values, option):
+    """Grenzen der Form Variable=Wert aus --min/--max."""
+    bounds = {}
+    for value in values or []:
+        variable, separator, number = value.partition('=')
+        if not separator:
+            raise ValueError(f"{option} erwartet Variable=Wert, nicht {value}")
+        bounds[variable] = float(number)
+    return bounds
+
+def catalog_scan(args):
+    import messlauf_katalog
+    counts = messlauf_katalog.scan(args.directories, args.catalog,
+                                   lambda path, status: print(f"{status}: {path}", file=sys.stderr))
+    print(", ".join(f"{count} {status}" for status, count in counts.items()), file=sys.stderr)
+    return 1 if counts['failed'] else 0
+
+def catalog_find(args):
+    """Messläufe aus dem Katalog; mit --paths nur die Pfade (z.B. als Eingabe für analyze oder refine)."""
+    import messlauf_katalog
+    lows, highs = parse_bounds(args.min, '--min'), parse_bounds(args.max, '--max')
+    ranges = {variable: (lows.get(variable), highs.get(variable)) for variable in set(lows) | set(highs)}
+    runs = messlauf_katalog.find_runs(args.catalog, args.speed, args.torque, ranges, args.has)
+    if args.paths:
+        print("\n".join(runs['path']))
+    else:
+        write_list(runs[['path', 'date', 'rows', 'operating_points', 'speed_min', 'speed_max', 'torque_min', 'torque_max']], '-')
+    return 0
+
+def upload(args):
+    import pandas as pd
+    import sps_upload
+
+    daten = pd.read_csv(args.file)
+    cache = sps_upload.UploadCache()
+
+    def upload_to_bench(bench, session):
+        db_name = args.db or bench.messpunkte_db
+        if args.no_cache:
+            # Eintrag verwerfen: es werden alle Arrays geschrieben und der Cache danach neu angelegt
+            cache.invalidate(session.url, db_name)
+        written = sps_upload.upload_list(session, daten, args.mode, cache, args.verify, db_name,
+                                         progress=bench_progress(bench))
+        if len(daten) > sps_upload.ARRAY_SIZE:
+            print(f"{bench.name}: {written} pages processed by the PLC")
+        else:
+            print(f"{bench.name}: {len(daten)} operating points uploaded ({written} values written)")
+        return written
+
+    return run_benches(args, upload_to_bench)
+
+def output_path(output, bench, several):
+    """Zieldatei je Prüfstand: {bench} im Namen wird ersetzt, bei mehreren Prüfständen sonst angehängt."""
+    if '{bench}' in output:
+        return output.replace('{bench}', bench.name)
+    if not several:
+        return output
+    root, extension = os.path.splitext(output)
+    return f"{root}_{bench.name}{extension}"
+
+def fetch(args):
+    import pandas as pd
+    import messlauf_datei
+    from messwerte_leser import MesswerteLeser, load_variables
+
+    variables = args.variables.split(',') if args.variables else load_variables(args.variables_file)
+    several = bool(args.all_benches or (args.bench and len(args.bench) > 1))
+
+    def fetch_from_bench(bench, session):
+        reader = MesswerteLeser(session, variables, db_name=args.db or bench.messwerte_db)
+        reader.fetch_new(progress=bench_progress(bench))
+        for variable, status in reader.status_codes.items():
+            if not status.is_good():
+                print(f"Warning ({bench.name}): {variable}: {status.name}", file=sys.stderr)
+
+        # Zeilen, in denen alle Werte 0 sind, werden vom Puffer herausgefiltert
+        columns = reader.data.view()
+        path = output_path(args.output, bench, several)
+        if path.endswith(messlauf_datei.BINARY_SUFFIX):
+            messlauf_datei.save_run(path, columns)
+        else:
+            pd.DataFrame(columns, columns=variables).to_csv(path, index=False)
+        rows = len(columns[variables[0]])
+        print(f"{bench.name}: {rows} rows saved to {path}")
+        return rows
+
+    return run_benches(args, fetch_from_bench)
+
+def add_order_arguments(parser):
+    parser.add_argument('--order', default='drehmoment',
+                        choices=['best', 'drehmoment', 'drehzahl', 'serpentine', 'nearest_neighbour', 'thermisch'],
+                        help="Reihenfolge (best = kürzeste geschätzte Prüfstandszeit)")
+    parser.add_argument('--cost-model', default='kostenmodell.csv', help="CSV mit dem Kostenmodell")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="TestbenchManager ohne GUI")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generate_parser = subparsers.add_parser('generate', help="Arbeitspunktliste erzeugen")
+    generate_modes = generate_parser.add_subparsers(dest='mode', required=True)
+    for mode, defaults in (('kennfeld', generator.KENNFELD_DEFAULTS), ('stromwinkel', generator.STROMWINKEL_DEFAULTS)):
+        mode_parser = generate_modes.add_parser(mode)
+        mode_parser.add_argument('-o', '--output', default='-', help="Ziel-CSV (Standard: stdout)")
+        mode_parser.add_argument('--defaults', help="CSV mit Standardwerten")
+        for key, value in defaults.items():
+            mode_parser.add_argument('--' + key.replace('_', '-'), dest=key, help=f"Standard: {value}")
+        if mode == 'kennfeld':
+            add_order_arguments(mode_parser)
+        mode_parser.set_defaults(function=generate)
+
+    refine_parser = subparsers.add_parser('refine', help="Verfeinerungsliste aus gemessenen Messläufen")
+    refine_parser.add_argument('runs', nargs='+', help="Messläufe (CSV oder .messlauf) mit n, M, eta, Pmech, Pauf")
+    refine_parser.add_argument('-o', '--output', default='-', help="Ziel-CSV (Standard: stdout)")
+    refine_parser.add_argument('--eta-accuracy', type=float, help="Zielgenauigkeit eta (absolut, Standard: 0.002)")
+    refine_parser.add_argument('--loss-accuracy', type=float, help="Zielgenauigkeit Verluste (W, Standard: 2)")
+    refine_parser.add_argument('--speed-tolerance', type=float, help="gilt als gemessen (min^-1, Standard: 25)")
+    refine_parser.add_argument('--torque-tolerance', type=float, help="gilt als gemessen (Nm, Standard: 1)")
+    refine_parser.add_argument('--max-points', type=int, help="höchstens so viele Punkte (größter Fehler zuerst)")
+    refine_parser.add_argument('--torque-limits', help="Drehmomentbegrenzung (Standard: aus --defaults)")
+    refine_parser.add_argument('--defaults', help="CSV mit Standardwerten Kennfeld")
+    add_order_arguments(refine_parser)
+    refine_parser.set_defaults(function=refine)
+
+    mtpa_parser = subparsers.add_parser('mtpa', help="MTPA-Suche je Stromstufe statt Raster Strom x Winkel")
+    mtpa_parser.add_argument('runs', nargs='*', help="Messungen der bisherigen Runden (CSV oder .messlauf)")
+    mtpa_parser.add_argument('-o', '--output', default='-',
+                             help="nächste Runde (CSV, Standard: stdout); mit --closed-loop: alle Messungen")
+    mtpa_parser.add_argument('--results', help="CSV mit dem MTPA-Winkel je Stromstufe")
+    mtpa_parser.add_argument('--closed-loop', action='store_true', help="Runden selbst hochladen und Messwerte abwarten")
+    mtpa_parser.add_argument('--samples', type=int,
+                             help="mit --closed-loop: Messungen je Arbeitspunkt (Standard: Punkt fertig, wenn der nächste beginnt)")
+    mtpa_parser.add_argument('--defaults', help="CSV mit Standardwerten Stromwinkel")
+    for key in ('speed', 'current_start', 'current_end', 'current_step'):
+        mtpa_parser.add_argument('--' + key.replace('_', '-'), dest=key, help=f"Standard: {generator.STROMWINKEL_DEFAULTS[key]}")
+    for key, value in (('angle_min', 40), ('angle_max', 90), ('tolerance', 1.0), ('warm_width', 16),
+                       ('warm_start_width', 8)):
+        mtpa_parser.add_argument('--' + key.replace('_', '-'), dest=key, type=float, help=f"Standard: {value}")
+    add_connection_arguments(mtpa_parser)
+    mtpa_parser.set_defaults(function=mtpa)
+
+    analyze_parser = subparsers.add_parser('analyze', help="Messung auswerten")
+    analyze_modes = analyze_parser.add_subparsers(dest='mode', required=True)
+    stromwinkel_parser = analyze_modes.add_parser('stromwinkel', help="MTPA-Kurve aus einer Stromwinkel-Messung")
+    stromwinkel_parser.add_argument('run', help="Stromwinkel-Messung (CSV oder .messlauf)")
+    stromwinkel_parser.add_argument('-o', '--output', default='-', help="Ergebnis je Stromstufe (Standard: stdout)")
+    stromwinkel_parser.add_argument('--lut', help="MTPA-Kennlinie (Drehmoment -> id, iq) als CSV")
+    stromwinkel_parser.add_argument('--torque-step', type=float, help="Drehmomentraster der Kennlinie (Nm)")
+    stromwinkel_parser.add_argument('--no-cache', action='store_true', help="Zwischenspeicher nicht verwenden")
+    stromwinkel_parser.set_defaults(function=analyze)
+    kennfeld_parser = analyze_modes.add_parser('kennfeld', help="Wirkungsgradkennfeld aus Messläufen")
+    kennfeld_parser.add_argument('runs', nargs='+', help="Messläufe (CSV oder .messlauf) mit n, M, eta, Pmech, Pauf")
+    kennfeld_parser.add_argument('-o', '--output', help="Bild (.png, .pdf, .svg)")
+    kennfeld_parser.add_argument('--grid', help="Raster der Größe als CSV (Zeile je Drehmoment, Spalte je Drehzahl)")
+    kennfeld_parser.add_argument('--quantity', default='eta', help="eta, verluste, Pmech, Pauf, I, U, Temperatur")
+    kennfeld_parser.add_argument('--speed-step', type=float, default=25, help="Rasterweite Drehzahl (min^-1)")
+    kennfeld_parser.add_argument('--torque-step', type=float, default=0.5, help="Rasterweite Drehmoment (Nm)")
+    kennfeld_parser.add_argument('--no-cache', action='store_true', help="Zwischenspeicher nicht verwenden")
+    kennfeld_parser.set_defaults(function=analyze_kennfeld)
+    verluste_parser = analyze_modes.add_parser('verluste', help="Verlustaufteilung aus Messläufen")
+    verluste_parser.add_argument('runs', nargs='+', help="Messläufe (CSV oder .messlauf) mit n, M, I, eta, Pmech, Pauf")
+    verluste_parser.add_argument('-o', '--output', default='-', help="Verluste je Arbeitspunkt (Standard: stdout)")
+    verluste_parser.add_argument('--rows', help="Verluste je Messzeile als CSV")
+    verluste_parser.add_argument('--parameters', default='maschinenparameter.csv', help="CSV mit den Maschinenkenndaten")
+    verluste_parser.add_argument('--image', help="Verlustkennfeld als Bild (.png, .pdf, .svg)")
+    verluste_parser.add_argument('--quantity', default='P_fe', help="verluste, P_cu, P_cu_ref, P_reib, P_zus, P_fe, R_wicklung, T_wicklung")
+    verluste_parser.add_argument('--speed-step', type=float, default=25, help="Rasterweite Drehzahl (min^-1)")
+    verluste_parser.add_argument('--torque-step', type=float, default=0.5, help="Rasterweite Drehmoment (Nm)")
+    verluste_parser.set_defaults(function=analyze_verluste)
+    punkte_parser = analyze_modes.add_parser('punkte', help="Messzeilen je Arbeitspunkt mitteln")
+    punkte_parser.add_argument('run', help="Messlauf (CSV oder .messlauf)")
+    punkte_parser.add_argument('-o', '--output', default='-', help="Arbeitspunkte als CSV (Standard: stdout)")
+    punkte_parser.add_argument('--window', type=int,
+                               help="Messungen, über die ein Punkt eingeschwungen sein muss (Standard: 3, höchstens "
+                                    "die Messungen je Arbeitspunkt aus den Metadaten)")
+    punkte_parser.set_defaults(function=analyze_punkte)
+
+    catalog_parser = subparsers.add_parser('catalog', help="Katalog der Messläufe (SQLite)")
+    catalog_modes = catalog_parser.add_subparsers(dest='mode', required=True)
+    scan_parser = catalog_modes.add_parser('scan', help="Verzeichnisse inkrementell in den Katalog aufnehmen")
+    scan_parser.add_argument('directories', nargs='+', help="Verzeichnisse mit Messläufen (CSV oder .messlauf)")
+    scan_parser.add_argument('--catalog', default='messlauf_katalog.sqlite', help="Katalogdatei")
+    scan_parser.set_defaults(function=catalog_scan)
+    find_parser = catalog_modes.add_parser('find', help="Messläufe im Katalog suchen")
+    find_parser.add_argument('--speed', type=float, help="Arbeitspunkt bei dieser Drehzahl (min^-1)")
+    find_parser.add_argument('--torque', type=float, help="Arbeitspunkt bei diesem Drehmoment (Nm)")
+    find_parser.add_argument('--min', action='append', help="Variable=Wert: Wert erreicht oder überschritten (mehrfach möglich)")
+    find_parser.add_argument('--max', action='append', help="Variable=Wert: Wert erreicht oder unterschritten (mehrfach möglich)")
+    find_parser.add_argument('--has', action='append', help="Variable muss vorhanden sein (mehrfach möglich)")
+    find_parser.add_argument('--paths', action='store_true', help="nur die Pfade ausgeben")
+    find_parser.add_argument('--catalog', default='messlauf_katalog.sqlite', help="Katalogdatei")
+    find_parser.set_defaults(function=catalog_find)
+
+    upload_parser = subparsers.add_parser('upload', help="Arbeitspunktliste in den Messpunkte_DB laden")
+    upload_parser.add_argument('file', help="CSV mit Arbeitspunkten")
+    upload_parser.add_argument('--mode', choices=['Kennfeld', 'Stromwinkel'], help="Standard: aus den Spalten")
+    upload_parser.add_argument('--verify', action='store_true', help="Upload stichprobenartig prüfen")
+    upload_parser.add_argument('--no-cache', action='store_true',
+                               help="Cache verwerfen und alle Arrays schreiben")
+    add_connection_arguments(upload_parser)
+    upload_parser.set_defaults(function=upload)
+
+    fetch_parser = subparsers.add_parser('fetch', help="Messwerte_DB auslesen und speichern")
+    fetch_parser.add_argument('-o', '--output', required=True, help="Ziel (.csv oder .messlauf, {bench} = Prüfstand)")
+    fetch_parser.add_argument('--variables', help="kommagetrennte Variablen")
+    fetch_parser.add_argument('--variables-file', default='variables.csv')
+    add_connection_arguments(fetch_parser)
+    fetch_parser.set_defaults(function=fetch)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.function(args)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+import math
+import numpy as np
+import pandas as pd
+import arbeitspunkte_generator as generator
+
+# Datei für das Kostenmodell der Übergänge
+KOSTENMODELL_CSV = 'kostenmodell.csv'
+
+# Standardwerte des Kostenmodells (Prüfstand und Prüfling)
+KOSTENMODELL_DEFAULTS = {
+    'speed_ramp_rate': 500,          # Drehzahlrampe (min^-1/s)
+    'torque_ramp_rate': 50,          # Drehmomentrampe (Nm/s)
+    'settle_time': 2,                # Einschwingzeit nach jedem Wechsel des Arbeitspunkts (s)
+    'dwell_time_ms': 8000,           # Verweilzeit je Arbeitspunkt (ms), z.B. 8000 oder 4000
+    'torque_nominal': 70,            # Drehmoment, bei dem sich die Erwärmung temperature_rise_nominal einstellt (Nm)
+    'temperature_rise_nominal': 80,  # stationäre Erwärmung bei torque_nominal (K), Kupferverluste ~ M^2
+    'temperature_rise_max': 60,      # zulässige Erwärmung, darüber wird im Leerlauf abgekühlt (K)
+    'thermal_time_constant': 900,    # thermische Zeitkonstante (s)
+}
+
+# 2-opt nur bis zu dieser Anzahl Arbeitspunkte (Aufwand wächst quadratisch) und höchstens so viele Durchläufe
+TWO_OPT_MAX_POINTS = 3000
+TWO_OPT_MAX_PASSES = 10
+
+def load_cost_model(csv_file=KOSTENMODELL_CSV):
+    return {key: float(value) for key, value in generator.load_default_values(csv_file, KOSTENMODELL_DEFAULTS).items()}
+
+def save_cost_model(model, csv_file=KOSTENMODELL_CSV):
+    generator.save_default_values(csv_file, model)
+
+def transition_times(speed, torque, speeds, torques, model):
+    """Dauer der Übergänge von einem Arbeitspunkt zu (vielen) anderen bzw. paarweise zwischen zwei Arrays.
+
+    Drehzahl- und Drehmomentrampe laufen parallel, danach wird eingeschwungen.
+    """
+    ramp = np.maximum(np.abs(speeds - speed) / model['speed_ramp_rate'],
+                      np.abs(torques - torque) / model['torque_ramp_rate'])
+    return ramp + np.where((speeds != speed) | (torques != torque), model['settle_time'], 0.0)
+
+def estimate_time(speeds, torques, model):
+    """Schätzt die Prüfstandszeit einer Reihenfolge.
+
+    Neben Rampen, Einschwingen und Verweilzeit wird die Erwärmung als System erster Ordnung mitgerechnet:
+    würde ein Arbeitspunkt die zulässige Erwärmung überschreiten, wird vorher im Leerlauf abgekühlt.
+    Gibt ein Dict mit total, transition, dwell und cooling (jeweils in s) zurück.
+    """
+    speeds = np.asarray(speeds, dtype=float)
+    torques = np.asarray(torques, dtype=float)
+    dwell = model['dwell_time_ms'] / 1000
+    if len(speeds) == 0:
+        return {'total': 0.0, 'transition': 0.0, 'dwell': 0.0, 'cooling': 0.0}
+
+    # Übergänge (vom Stillstand zum ersten Punkt, dann paarweise)
+    transitions = transition_times(np.concatenate(([0.0], speeds[:-1])), np.concatenate(([0.0], torques[:-1])),
+                                   speeds, torques, model)
+
+    # Thermische Vorgeschichte: stationäre Erwärmung je Punkt, Verlauf über die Dauer des Punkts
+    heating = model['temperature_rise_nominal'] / model['torque_nominal'] ** 2
+    tau = model['thermal_time_constant']
+    limit = model['temperature_rise_max']
+    steady = heating * torques ** 2
+    decay = np.exp(-(transitions + dwell) / tau)
+    temperature = 0.0
+    cooling = 0.0
+    for point in range(len(speeds)):
+        end_temperature = steady[point] + (temperature - steady[point]) * decay[point]
+        if end_temperature > limit and temperature > 0:
+            # Starttemperatur, bei der der Punkt gerade noch unter der Grenze endet
+            allowed = (limit - steady[point] * (1 - decay[point])) / decay[point]
+            if 0 < allowed < temperature:
+                cooling += tau * math.log(temperature / allowed)
+                temperature = allowed
+                end_temperature = steady[point] + (temperature - steady[point]) * decay[point]
+        temperature = end_temperature
+
+    total_transition = float(transitions.sum())
+    total_dwell = dwell * len(speeds)
+    return {'total': total_transition + total_dwell + cooling, 'transition': total_transition,
+            'dwell': total_dwell, 'cooling': cooling}
+
+def order_torque_major(speeds, torques, model):
+    return np.lexsort((speeds, torques))
+
+def order_speed_major(speeds, torques, model):
+    return np.lexsort((torques, speeds))
+
+def order_serpentine(speeds, torques, model):
+    """Nach Drehzahl, innerhalb jeder Drehzahl abwechselnd auf- und absteigendes Drehmoment (Boustrophedon)."""
+    _, speed_rank = np.unique(speeds, return_inverse=True)
+    direction = np.where(speed_rank % 2 == 0, 1, -1)
+    return np.lexsort((direction * torques, speeds))
+
+def order_thermal(speeds, torques, model):
+    """Wie serpentine, aber innerhalb jeder Drehzahl hohe und niedrige Drehmomente im Wechsel.
+
+    Auf einen Punkt mit hohen Verlusten folgt einer mit geringen, damit die Wicklung zwischendurch abkühlt
+    und Wartezeiten an der Temperaturgrenze entfallen.
+    """
+    order = order_serpentine(speeds, torques, model)
+    result = []
+    sorted_speeds = speeds[order]
+    boundaries = np.flatnonzero(np.diff(sorted_speeds)) + 1
+    for group in np.split(order, boundaries):
+        by_torque = group[np.argsort(torques[group], kind='stable')]
+        interleaved = np.empty_like(by_torque)
+        interleaved[0::2] = by_torque[::-1][:(len(by_torque) + 1) // 2]
+        interleaved[1::2] = by_torque[:len(by_torque) // 2]
+        result.append(interleaved)
+    return np.concatenate(result) if result else order
+
+def _two_opt(path, speeds, torques, model, max_passes=TWO_OPT_MAX_PASSES):
+    """Verbessert einen offenen Pfad durch Umkehren von Teilstücken (2-opt), vektorisiert je Startkante."""
+    path = path.copy()
+    for _ in range(max_passes):
+        improved = False
+        for i in range(len(path) - 2):
+            a, b = path[i], path[i + 1]
+            c = path[i + 2:]
+            d = np.append(path[i + 3:], -1)
+            # Kosten der Kanten (a,b) und (c,d) gegen (a,c) und (b,d); am Pfadende entfällt (c,d) bzw. (b,d)
+            old_ab = transition_times(speeds[a], torques[a], speeds[b], torques[b], model)
+            new_ac = transition_times(speeds[a], torques[a], speeds[c], torques[c], model)
+            has_d = d >= 0
+            old_cd = np.zeros(len(c))
+            new_bd = np.zeros(len(c))
+            old_cd[has_d] = transition_times(speeds[c[has_d]], torques[c[has_d]], speeds[d[has_d]], torques[d[has_d]], model)
+            new_bd[has_d] = transition_times(speeds[b], torques[b], speeds[d[has_d]], torques[d[has_d]], model)
+            delta = new_ac + new_bd - old_ab - old_cd
+            best = int(np.argmin(delta))
+            if delta[best] < -1e-9:
+                j = i + 2 + best
+                path[i + 1:j + 1] = path[i + 1:j + 1][::-1]
+                improved = True
+        if not improved:
+            break
+    return path
+
+def order_nearest_neighbour(speeds, torques, model):
+    """Nächster Nachbar ab dem Punkt mit kleinster Drehzahl und kleinstem Drehmoment, danach 2-opt."""
+    remaining = np.ones(len(speeds), dtype=bool)
+    current = int(np.lexsort((torques, speeds))[0])
+    path = [current]
+    remaining[current] = False
+    for _ in range(len(speeds) - 1):
+        costs = transition_times(speeds[current], torques[current], speeds, torques, model)
+        costs[~remaining] = np.inf
+        current = int(np.argmin(costs))
+        path.append(current)
+        remaining[current] = False
+    path = np.array(path)
+    if len(path) <= TWO_OPT_MAX_POINTS:
+        path = _two_opt(path, speeds, torques, model)
+    return path
+
+# Strategien: Name -> Funktion(Drehzahlen, Drehmomente, Modell) -> Reihenfolge (Indizes)
+STRATEGIES = {
+    'drehmoment': order_torque_major,
+    'drehzahl': order_speed_major,
+    'serpentine': order_serpentine,
+    'nearest_neighbour': order_nearest_neighbour,
+    'thermisch': order_thermal,
+}
+
+def order_points(liste, strategy, model=None):
+    """Sortiert eine Kennfeld-Liste (drehzahl, drehmoment) nach einer Strategie und nummeriert den Index neu."""
+    model = model or dict(KOSTENMODELL_DEFAULTS)
+    speeds = liste['drehzahl'].to_numpy(dtype=float)
+    torques = liste['drehmoment'].to_numpy(dtype=float)
+    order = STRATEGIES[strategy](speeds, torques, model)
+    ordered = liste.iloc[order].reset_index(drop=True)
+    ordered['index'] = np.arange(1, len(ordered) + 1)
+    return ordered[['index'] + [column for column in ordered.columns if column != 'index']]
+
+def compare_strategies(liste, model=None, strategies=None):
+    """Schätzt die Prüfstandszeit je Strategie; Ergebnis nach Gesamtzeit sortiert (schnellste zuerst)."""
+    model = model or dict(KOSTENMODELL_DEFAULTS)
+    rows = []
+    for strategy in strategies or STRATEGIES:
+        ordered = order_points(liste, strategy, model)
+        times = estimate_time(ordered['drehzahl'], ordered['drehmoment'], model)
+        rows.append(dict(strategy=strategy, **times))
+    return pd.DataFrame(rows).sort_values('total').reset_index(drop=True)
+
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
@@ -0,0 +1,381 @@
+"""Simulierte SPS für Tests ohne Prüfstand (OPC-UA-Server mit Messpunkte_DB und Messwerte_DB).
+
+Beispiel:
+    python sps_simulator.py --port 4840 --latency 0.005 --bandwidth 2e6 --measure-interval 0.5
+    python pruefstand_cli.py upload liste.csv --url opc.tcp://127.0.0.1:4840
+"""
+import argparse
+import math
+import threading
+import time
+import numpy as np
+from opcua import Server, ua
+from opcua.server.address_space import AttributeService
+import sps_upload
+from messpuffer import INITIAL_CAPACITY
+from messwerte_leser import MESSWERTE_DB, DEFAULT_VARIABLES, INDEX_VARIABLE
+from sps_verbindung import NAMESPACE_INDEX
+
+SIMULATOR_URL = "opc.tcp://127.0.0.1:4840"
+
+# Größe der Arrays im Messwerte_DB (Zeilen)
+MESSWERTE_ARRAY_SIZE = INITIAL_CAPACITY
+
+# Ganzzahlige Variablen im Messwerte_DB (INT in der SPS), alle übrigen sind REAL
+INT16_VARIABLES = ("index", "Messprogramm")
+
+# Bytes je Wert für die simulierte Bandbreite
+ITEM_BYTES = {ua.VariantType.Int16: 2, ua.VariantType.Float: 4}
+
+# Messprogramm, das die simulierte SPS protokolliert (Stromwinkel wie in den Messdateien = 1)
+MESSPROGRAMM = {'Kennfeld': 2, 'Stromwinkel': 1}
+
+# Kenndaten der simulierten Maschine (Größenordnung des Prüflings in Testfiles/Messdaten)
+MACHINE = {
+    'resistance': 0.6,       # Klemmenwiderstand (Ohm)
+    'torque_constant': 0.9,  # Nm/A
+    'reluctance': 0.15,      # Anteil des Reluktanzmoments (sin 2θ) bei Stromwinkel-Messungen
+    'iron_loss': 2e-4,       # W je (min^-1)^1.6
+    'friction': 0.01,        # W je min^-1
+    'temperature': 40.0,     # Wicklungstemperatur zu Beginn (°C)
+    'heating': 2e-5,         # Temperaturanstieg je Joule Verlustenergie (K/J)
+}
+
+def parse_index_range(text):
+    """Eindimensionaler IndexRange "a" oder "a:b" als (start, stop); stop exklusiv."""
+    parts = text.split(':')
+    if len(parts) > 2 or not all(part.isdigit() for part in parts):
+        raise ValueError(text)
+    start, last = int(parts[0]), int(parts[-1])
+    if last < start:
+        raise ValueError(text)
+    return start, last + 1
+
+def _status(code):
+    data_value = ua.DataValue()
+    data_value.StatusCode = ua.StatusCode(code)
+    return data_value
+
+def payload_bytes(variant):
+    values = variant.Value if isinstance(variant.Value, (list, tuple)) else [variant.Value]
+    return len(values) * ITEM_BYTES.get(variant.VariantType, 4)
+
+class SimulierterAttributeService(AttributeService):
+    """Read/Write des Servers mit IndexRange und künstlicher Latenz und Bandbreite.
+
+    Der Server von python-opcua ignoriert IndexRange (Lesen liefert das ganze Array, Schreiben ersetzt es durch
+    den Ausschnitt). Hier wird der Ausschnitt wie von der SPS ausgewertet; mit index_range=False verhält sich
+    der Simulator wie ein Server ohne IndexRange. Jede Anfrage wartet latency + Nutzdaten / bandwidth Sekunden;
+    Anfragen werden wie von der SPS nacheinander bearbeitet.
+    """
+
+    def __init__(self, aspace, latency=0.0, bandwidth=None, index_range=True):
+        super().__init__(aspace)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.index_range = index_range
+        self.requests = 0
+        self.bytes = 0
+
+    def _delay(self, size):
+        self.requests += 1
+        self.bytes += size
+        delay = self.latency + (size / self.bandwidth if self.bandwidth else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def read(self, params):
+        results = []
+        for read_value in params.NodesToRead:
+            data_value = self._aspace.get_attribute_value(read_value.NodeId, read_value.AttributeId)
+            if (self.index_range and read_value.IndexRange and read_value.AttributeId == ua.AttributeIds.Value
+                    and data_value.StatusCode.is_good()):
+                data_value = self._slice(data_value, read_value.IndexRange)
+            results.append(data_value)
+        self._delay(sum(payload_bytes(result.Value) for result in results if result.Value is not None))
+        return results
+
+    @staticmethod
+    def _slice(data_value, text):
+        value = data_value.Value.Value
+        try:
+            start, stop = parse_index_range(text)
+        except ValueError:
+            return _status(ua.StatusCodes.BadIndexRangeInvalid)
+        if not isinstance(value, (list, tuple)) or start >= len(value):
+            return _status(ua.StatusCodes.BadIndexRangeNoData)
+        return ua.DataValue(ua.Variant(list(value[start:stop]), data_value.Value.VariantType))
+
+    def write(self, params, user=None):
+        results = {}
+        accepted = ua.WriteParameters()
+        positions = []
+        for position, write_value in enumerate(params.NodesToWrite):
+            if self.index_range and write_value.IndexRange and write_value.AttributeId == ua.AttributeIds.Value:
+                status = self._merge(write_value)
+                if status is not None:
+                    results[position] = ua.StatusCode(status)
+                    continue
+            accepted.NodesToWrite.append(write_value)
+            positions.append(position)
+        self._delay(sum(payload_bytes(write_value.Value.Value) for write_value in params.NodesToWrite))
+        # Ohne IndexRange-Auswertung ersetzt der Ausschnitt wie beim Server von python-opcua das ganze Array
+        arguments = (accepted,) if user is None else (accepted, user)
+        results.update(zip(positions, super().write(*arguments)))
+        return [results[position] for position in range(len(params.NodesToWrite))]
+
+    def _merge(self, write_value):
+        """Setzt den Ausschnitt in das aktuelle Array ein; gibt einen Fehlercode zurück oder None."""
+        try:
+            start, stop = parse_index_range(write_value.IndexRange)
+        except ValueError:
+            return ua.StatusCodes.BadIndexRangeInvalid
+        current = self._aspace.get_attribute_value(write_value.NodeId, ua.AttributeIds.Value)
+        if not current.StatusCode.is_good():
+            return current.StatusCode.value
+        values = list(current.Value.Value) if isinstance(current.Value.Value, (list, tuple)) else None
+        part = write_value.Value.Value.Value
+        part = list(part) if isinstance(part, (list, tuple)) else [part]
+        if values is None or stop > len(values) or len(part) != stop - start:
+            return ua.StatusCodes.BadIndexRangeInvalid
+        values[start:stop] = part
+        write_value.Value = ua.DataValue(ua.Variant(values, current.Value.VariantType))
+        write_value.IndexRange = None
+        return None
+
+def simulated_row(point, mode, temperature):
+    """Messwerte eines Arbeitspunkts aus einem einfachen Maschinenmodell (Dict Variable -> Wert)."""
+    speed = point['drehzahl']
+    if mode == 'Stromwinkel':
+        current, angle = point['Strom_Effektivwert'], point['Stromwinkel']
+        theta = math.radians(angle)
+        torque = current * MACHINE['torque_constant'] * (math.sin(theta) + MACHINE['reluctance'] * math.sin(2 * theta))
+        setpoints = {'Strom_Effektivwert_soll': current, 'Stromwinkel_soll': angle,
+                     'id_soll': math.sqrt(2) * current * math.cos(theta), 'iq_soll': math.sqrt(2) * current * math.sin(theta)}
+    else:
+        torque = point['drehmoment']
+        current = abs(torque) / MACHINE['torque_constant'] + 0.5
+        angle = 90.0
+        setpoints = {'M_soll': torque}
+    speed_measured = speed + np.random.normal(0, 0.3)
+    torque_measured = torque + np.random.normal(0, 0.02)
+    p_mech = torque_measured * 2 * math.pi * speed_measured / 60
+    losses = (1.5 * current ** 2 * MACHINE['resistance'] + MACHINE['iron_loss'] * abs(speed) ** 1.6 +
+              MACHINE['friction'] * abs(speed))
+    p_auf = p_mech + losses
+    row = {
+        'Messprogramm': MESSPROGRAMM[mode], 'n_soll': speed, 'n': speed_measured, 'M': torque_measured,
+        'I': current, 'phi': angle, 'id': math.sqrt(2) * current * math.cos(math.radians(angle)),
+        'iq': math.sqrt(2) * current * math.sin(math.radians(angle)), 'U': p_auf / (math.sqrt(3) * current * 0.85),
+        'Pmech': p_mech, 'Pauf': p_auf, 'eta': p_mech / p_auf if p_mech > 0 else 0.0, 'Temperatur': temperature,
+        'I_R_mess': 0.003, 'U_R_mess': 0.0, 'R': 0.0,
+    }
+    row.update(setpoints)
+    return row, losses
+
+class SPSSimulator:
+    """OPC-UA-Server mit den Datenbausteinen der SPS (gleiche Knoten-IDs, Arraygrößen und Datentypen).
+
+    Messpunkte_DB: index (INT), drehzahl, drehmoment, Strom_Effektivwert, Stromwinkel (REAL) mit je array_size
+    Einträgen und der Handshake für seitenweises Hochladen (Seiten_gesamt, Seiten_geladen, Seiten_fertig).
+    Messwerte_DB: die Variablen aus DEFAULT_VARIABLES mit je messwerte_size Einträgen.
+    Mit measure_interval arbeitet der Simulator hochgeladene Listen ab wie der Prüfstand: je Intervall wird
+    eine Zeile in den Messwerte_DB geschrieben (Index zuletzt, wie die SPS).
+    """
+
+    def __init__(self, url=SIMULATOR_URL, latency=0.0, bandwidth=None, index_range=True, measure_interval=None,
+                 array_size=sps_upload.ARRAY_SIZE, messwerte_size=MESSWERTE_ARRAY_SIZE,
+                 messwerte_variables=DEFAULT_VARIABLES):
+        self.url = url
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.index_range = index_range
+        self.measure_interval = measure_interval
+        self.array_size = array_size
+        self.messwerte_size = messwerte_size
+        self.messwerte_variables = list(messwerte_variables)
+        self.server = None
+        self.service = None
+        self.nodes = {}
+        self._stop_event = threading.Event()
+        self._worker = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @staticmethod
+    def _zeros(size, variant_type):
+        return [0 if variant_type == ua.VariantType.Int16 else 0.0] * size
+
+    def _add_variable(self, folder, db_name, variable, value, variant_type):
+        node = folder.add_variable(ua.NodeId(f'"{db_name}"."{variable}"', NAMESPACE_INDEX), variable,
+                                   ua.Variant(value, variant_type), datatype=ua.NodeId(variant_type.value))
+        node.set_writable()
+        self.nodes[(db_name, variable)] = node
+
+    def start(self):
+        self.server = Server()
+        self.server.set_endpoint(self.url)
+        self.server.set_server_name("Pruefstand SPS-Simulator")
+        namespace = 0
+        while namespace < NAMESPACE_INDEX:
+            namespace = self.server.register_namespace(f"urn:pruefstand:simulator:{namespace + 1}")
+        folder = self.server.get_objects_node().add_folder(ua.NodeId("SPS", NAMESPACE_INDEX), "SPS")
+
+        variables = {}
+        for mode_columns in sps_upload.MODE_COLUMNS.values():
+            variables.update({variable: variant_type for _, variable, variant_type in mode_columns})
+        for variable, variant_type in variables.items():
+            self._add_variable(folder, sps_upload.MESSPUNKTE_DB, variable, self._zeros(self.array_size, variant_type),
+                               variant_type)
+        for variable in (sps_upload.PAGES_TOTAL_VARIABLE, sps_upload.PAGES_LOADED_VARIABLE, sps_upload.PAGES_DONE_VARIABLE):
+            self._add_variable(folder, sps_upload.MESSPUNKTE_DB, variable, 0, ua.VariantType.Int16)
+        for variable in self.messwerte_variables:
+            variant_type = ua.VariantType.Int16 if variable in INT16_VARIABLES else ua.VariantType.Float
+            self._add_variable(folder, MESSWERTE_DB, variable, self._zeros(self.messwerte_size, variant_type), variant_type)
+
+        self.service = SimulierterAttributeService(self.server.iserver.aspace, self.latency, self.bandwidth,
+                                                   self.index_range)
+        self.server.iserver.attribute_service = self.service
+        self.server.start()
+        if self.measure_interval:
+            self._stop_event.clear()
+            self._worker = threading.Thread(target=self._measure_loop, daemon=True)
+            self._worker.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+        if self.server is not None:
+            self.server.stop()
+            self.server = None
+
+    def _variant_type(self, db_name, variable):
+        return self.nodes[(db_name, variable)].get_data_value().Value.VariantType
+
+    def get_array(self, db_name, variable):
+        return np.array(self.nodes[(db_name, variable)].get_value())
+
+    def set_array(self, db_name, variable, values):
+        """Setzt ein Array direkt im Server (ohne Latenz), z.B. um den Messwerte_DB für Messungen vorzubelegen."""
+        variant_type = self._variant_type(db_name, variable)
+        values = np.asarray(values)
+        values = [int(value) for value in values] if variant_type == ua.VariantType.Int16 else values.astype(float).tolist()
+        self.nodes[(db_name, variable)].set_value(ua.Variant(values, variant_type))
+
+    def set_messwerte(self, columns):
+        """Belegt den Messwerte_DB mit Zeilen vor (Dict Variable -> Array); der Rest der Arrays ist 0."""
+        for variable in sorted(columns, key=lambda variable: variable == INDEX_VARIABLE):
+            values = np.zeros(self.messwerte_size)
+            values[:len(columns[variable])] = columns[variable]
+            self.set_array(MESSWERTE_DB, variable, values)
+
+    def messpunkte(self):
+        """Aktuelle Arbeitspunktliste im Messpunkte_DB (Dict Variable -> Array, nur Zeilen mit Index)."""
+        arrays = self._arrays()
+        used = arrays['index'] != 0
+        return {variable: values[used] for variable, values in arrays.items()}
+
+    def _read_int(self, variable):
+        return int(self.nodes[(sps_upload.MESSPUNKTE_DB, variable)].get_value())
+
+    def _list_signature(self):
+        return hash(b"".join(values.tobytes() for values in self._arrays().values()))
+
+    def _measure_loop(self):
+        """Arbeitet hochgeladene Listen ab: neue Liste (normal) bzw. freigegebene Seiten (seitenweise).
+
+        Eine neue Liste wird erst gemessen, wenn sie ein Intervall lang unverändert ist (Upload abgeschlossen).
+        Solange geladene Seiten nicht abgearbeitet sind, läuft ein seitenweiser Upload.
+        """
+        measured = previous = self._list_signature()
+        while not self._stop_event.wait(self.measure_interval):
+            pages_total = self._read_int(sps_upload.PAGES_TOTAL_VARIABLE)
+            pages_done = self._read_int(sps_upload.PAGES_DONE_VARIABLE)
+            if pages_total and pages_done < pages_total:
+                self._measure_pages(pages_total)
+                measured = previous = self._list_signature()
+                continue
+            if self._read_int(sps_upload.PAGES_LOADED_VARIABLE) > pages_done:
+                continue
+            signature = self._list_signature()
+            if signature != measured and signature == previous:
+                measured = signature
+                points = self.messpunkte()
+                if len(points['index']):
+                    self._measure(points, reset=True)
+            previous = signature
+
+    def _measure_pages(self, pages_total):
+        done = self._read_int(sps_upload.PAGES_DONE_VARIABLE)
+        reset = done == 0
+        while done < pages_total and not self._stop_event.is_set():
+            if self._read_int(sps_upload.PAGES_LOADED_VARIABLE) <= done:
+                return
+            half = slice((done % 2) * sps_upload.PAGE_SIZE, (done % 2 + 1) * sps_upload.PAGE_SIZE)
+            page = {variable: values[half] for variable, values in self._arrays().items()}
+            used = page['index'] != 0
+            self._measure({variable: values[used] for variable, values in page.items()}, reset)
+            reset = False
+            done += 1
+            self.nodes[(sps_upload.MESSPUNKTE_DB, sps_upload.PAGES_DONE_VARIABLE)].set_value(
+                ua.Variant(done, ua.VariantType.Int16))
+
+    def _arrays(self):
+        return {variable: self.get_array(db_name, variable) for db_name, variable in self.nodes
+                if db_name == sps_upload.MESSPUNKTE_DB and isinstance(self.nodes[(db_name, variable)].get_value(), list)}
+
+    def _measure(self, points, reset):
+        """Schreibt je Arbeitspunkt eine Messzeile in den Messwerte_DB (eine Zeile je measure_interval)."""
+        mode = 'Stromwinkel' if np.any(points.get('Stromwinkel', [])) else 'Kennfeld'
+        if reset:
+            self._row = 0
+            self._temperature = MACHINE['temperature']
+            self._messwerte = {variable: np.zeros(self.messwerte_size) for variable in self.messwerte_variables}
+        for position in range(len(points['index'])):
+            if self._stop_event.is_set():
+                return
+            if self._row >= self.messwerte_size:
+                print("Messwerte_DB full, further rows are not logged")
+                return
+            point = {variable: float(values[position]) for variable, values in points.items()}
+            row, losses = simulated_row(point, mode, self._temperature)
+            self._temperature += losses * self.measure_interval * MACHINE['heating']
+            row[INDEX_VARIABLE] = self._row + 1
+            for variable in self.messwerte_variables:
+                self._messwerte[variable][self._row] = row.get(variable, 0.0)
+            self._row += 1
+            self.set_messwerte({variable: values[:self._row] for variable, values in self._messwerte.items()})
+            self._stop_event.wait(self.measure_interval)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulierte SPS (OPC-UA) mit Messpunkte_DB und Messwerte_DB")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=4840)
+    parser.add_argument('--latency', type=float, default=0.0, help="Wartezeit je Anfrage (s)")
+    parser.add_argument('--bandwidth', type=float, help="Nutzdaten je Sekunde (Byte/s), Standard: unbegrenzt")
+    parser.add_argument('--no-index-range', action='store_true', help="IndexRange ignorieren wie manche Server")
+    parser.add_argument('--measure-interval', type=float, help="hochgeladene Listen abarbeiten, eine Zeile je Intervall (s)")
+    args = parser.parse_args(argv)
+
+    simulator = SPSSimulator(f"opc.tcp://{args.host}:{args.port}", args.latency, args.bandwidth,
+                             not args.no_index_range, args.measure_interval)
+    simulator.start()
+    print(f"PLC simulator running at {simulator.url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.stop()
+    return 0
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,490 @@
+import hashlib
+import os
+import time
+import numpy as np
+from opcua import ua
+from sps_verbindung import index_range
+from messwerte_leser import slice_result
+
+# Datenbaustein mit den Arbeitspunkten
+MESSPUNKTE_DB = "Messpunkte_DB"
+
+# Größe der Arrays im Messpunkte_DB
+ARRAY_SIZE = 1000
+
+# Spalte der CSV-Datei -> Variable im Messpunkte_DB und Datentyp je Modus
+MODE_COLUMNS = {
+    "Kennfeld": [
+        ("index", "index", ua.VariantType.Int16),
+        ("drehzahl", "drehzahl", ua.VariantType.Float),
+        ("drehmoment", "drehmoment", ua.VariantType.Float),
+    ],
+    "Stromwinkel": [
+        ("index", "index", ua.VariantType.Int16),
+        ("drehzahl", "drehzahl", ua.VariantType.Float),
+        ("strom_effektiv", "Strom_Effektivwert", ua.VariantType.Float),
+        ("stromwinkel", "Stromwinkel", ua.VariantType.Float),
+    ],
+}
+
+# Prüfung nach dem Upload: je Block wird ein zufälliger Eintrag gelesen, bei Abweichung der ganze Block
+VERIFY_BLOCK_SIZE = 50
+
+# Optionale Prüfsumme, die die SPS über die Arbeitspunkte bildet (LREAL, Summe über alle Arrays von
+# Wert * (Position + 1)); None = keine Prüfsumme in der SPS, nur Stichproben
+CHECKSUM_VARIABLE = None
+CHECKSUM_TOLERANCE = 1e-5  # relativ
+
+# Ohne Prüfsumme wird dem Upload-Cache vertraut; True = vor jedem Delta-Upload alle Arrays zurücklesen
+CACHE_FULL_CHECK = False
+
+# Seitenweiser Upload: der Messpunkte_DB wird als Doppelpuffer genutzt, jede Hälfte ist eine Seite
+PAGE_SIZE = ARRAY_SIZE // 2
+
+# Handshake-Variablen (Int16) im Messpunkte_DB für den seitenweisen Upload
+PAGES_TOTAL_VARIABLE = "Seiten_gesamt"    # vom PC: Gesamtzahl der Seiten (0 = normaler Betrieb ohne Seiten)
+PAGES_LOADED_VARIABLE = "Seiten_geladen"  # vom PC: Anzahl vollständig geschriebener Seiten
+PAGES_DONE_VARIABLE = "Seiten_fertig"     # von der SPS: Anzahl abgearbeiteter Seiten
+
+# Abfrageintervall des Handshakes beim seitenweisen Upload (s)
+PAGE_POLL_INTERVAL = 1.0
+
+# NumPy-Datentyp je VariantType der Arrays
+ARRAY_DTYPES = {
+    ua.VariantType.Int16: np.int16,
+    ua.VariantType.Float: np.float32,
+}
+
+# Verzeichnis für den Upload-Cache (zuletzt erfolgreich geschriebene Arrays je SPS)
+UPLOAD_CACHE_DIR = ".upload_cache"
+
+# Geänderte Bereiche mit höchstens dieser Lücke werden zu einem Schreibauftrag zusammengefasst
+MERGE_GAP = 4
+
+class UploadFehler(Exception):
+    """Der Upload wurde von der SPS nicht vollständig angenommen; status_codes enthält den Status je Variable."""
+
+    def __init__(self, message, status_codes=None):
+        super().__init__(message)
+        self.status_codes = status_codes or {}
+
+def detect_mode(daten):
+    """Bestimmt den Modus anhand der Spalten der Liste (Stromwinkel hat zusätzlich Strom und Winkel)."""
+    for mode in ("Stromwinkel", "Kennfeld"):
+        if all(column in daten.columns for column, _, _ in MODE_COLUMNS[mode]):
+            return mode
+    raise KeyError("Liste passt zu keinem Modus, Spalten: " + ", ".join(daten.columns))
+
+def prepare_columns(daten, mode):
+    """Wandelt die CSV-Daten in ungekürzte Spalten (Variable, Array, VariantType) im Datentyp der SPS um.
+
+    Fehlende Spalten lösen einen KeyError aus, Werte außerhalb des Int16-Bereichs einen UploadFehler.
+    """
+    columns = []
+    for column, variable, value_type in MODE_COLUMNS[mode]:
+        values = daten[column].to_numpy()
+        dtype = ARRAY_DTYPES[value_type]
+        if np.issubdtype(dtype, np.integer) and len(values):
+            limits = np.iinfo(dtype)
+            if values.min() < limits.min or values.max() > limits.max:
+                raise UploadFehler(f"Spalte '{column}' enthält Werte außerhalb von {limits.min}..{limits.max}")
+        columns.append((variable, values.astype(dtype), value_type))
+    return columns
+
+def prepare_arrays(daten, mode, array_size=ARRAY_SIZE):
+    """Erzeugt die Arrays für den Messpunkte_DB aus den CSV-Daten.
+
+    Gibt eine Liste (Variable, Array, VariantType) zurück. Fehlende Spalten lösen einen KeyError aus.
+    Längere Listen werden auf array_size gekürzt, dafür gibt es upload_paged().
+    """
+    rows_to_copy = min(len(daten), array_size)
+    arrays = []
+    for variable, values, value_type in prepare_columns(daten, mode):
+        value_array = np.zeros(array_size, dtype=values.dtype)
+        value_array[:rows_to_copy] = values[:rows_to_copy]
+        arrays.append((variable, value_array, value_type))
+    return arrays
+
+def to_variant(value_array, value_type):
+    if value_type == ua.VariantType.Int16:
+        value_array = value_array.astype(int)
+    return ua.Variant(value_array.tolist(), value_type)
+
+def check_data_types(session, arrays, db_name=MESSPUNKTE_DB):
+    """Prüft vor dem Schreiben, ob alle Variablen existieren und den erwarteten Datentyp haben."""
+    data_types = session.get_data_types(db_name, [variable for variable, _, _ in arrays])
+    errors = {}
+    for variable, _, value_type in arrays:
+        if data_types[variable] is None:
+            errors[variable] = "Variable nicht gefunden"
+        elif data_types[variable] != value_type:
+            errors[variable] = f"Datentyp {data_types[variable].name} statt {value_type.name}"
+    if errors:
+        raise UploadFehler("Upload abgelehnt: " + ", ".join(f"{variable}: {error}" for variable, error in errors.items()),
+                           errors)
+
+def upload_arrays(session, arrays, db_name=MESSPUNKTE_DB):
+    """Schreibt alle Arrays in einem einzigen Write-Request in die SPS.
+
+    Gibt die StatusCodes je Variable zurück. Lehnt die SPS eine Variable ab, wird UploadFehler ausgelöst,
+    der Upload gilt dann insgesamt als fehlgeschlagen.
+    """
+    check_data_types(session, arrays, db_name)
+    variables = [variable for variable, _, _ in arrays]
+    nodes = session.get_nodes(db_name, variables)
+    values = [to_variant(value_array, value_type) for _, value_array, value_type in arrays]
+
+    status_codes = dict(zip(variables, session.write_values(nodes, values)))
+    for variable, status in status_codes.items():
+        print(f"Write '{variable}': {status.name}")
+
+    failed = {variable: status for variable, status in status_codes.items() if not status.is_good()}
+    if failed:
+        raise UploadFehler("Upload fehlgeschlagen: " + ", ".join(f"{variable}: {status.name}"
+                                                                 for variable, status in failed.items()),
+                           status_codes)
+    return status_codes
+
+def content_hash(arrays):
+    """Hash über Variablennamen, Datentypen und Inhalt der Arrays."""
+    digest = hashlib.sha256()
+    for variable, value_array, _ in arrays:
+        digest.update(variable.encode())
+        digest.update(value_array.dtype.str.encode())
+        digest.update(np.ascontiguousarray(value_array).tobytes())
+    return digest.hexdigest()
+
+def changed_ranges(old_array, new_array, merge_gap=MERGE_GAP):
+    """Gibt die geänderten Bereiche als Liste (start, stop) zurück; nahe beieinander liegende werden zusammengefasst."""
+    changed = np.flatnonzero(old_array != new_array)
+    if len(changed) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(changed) > merge_gap + 1)
+    starts = np.concatenate(([changed[0]], changed[breaks + 1]))
+    stops = np.concatenate((changed[breaks], [changed[-1]])) + 1
+    return list(zip(starts.tolist(), stops.tolist()))
+
+class UploadCache:
+    """Merkt sich je SPS und Datenbaustein den Hash und eine Kopie der zuletzt erfolgreich geschriebenen Arrays.
+
+    Zusätzlich zur Datei wird der Inhalt im Speicher gehalten und nur neu geladen, wenn sich die Datei geändert hat.
+    """
+
+    def __init__(self, directory=UPLOAD_CACHE_DIR):
+        self.directory = directory
+        self._loaded = {}  # Pfad -> (Änderungszeit der Datei, (Hash, Arrays))
+
+    def _path(self, url, db_name):
+        key = hashlib.sha1(f"{url}|{db_name}".encode()).hexdigest()[:16]
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def load(self, url, db_name):
+        """Gibt (Hash, {Variable: Array}) zurück oder None, wenn für die SPS nichts gespeichert ist."""
+        path = self._path(url, db_name)
+        try:
+            modified = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        if path in self._loaded and self._loaded[path][0] == modified:
+            return self._loaded[path][1]
+        try:
+            with np.load(path) as cached:
+                arrays = {variable: cached[variable] for variable in cached.files if variable != '__hash__'}
+                entry = str(cached['__hash__']), arrays
+        except Exception:
+            # Beschädigte Cache-Datei wie einen leeren Cache behandeln
+            return None
+        self._loaded[path] = modified, entry
+        return entry
+
+    def store(self, url, db_name, arrays):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(url, db_name)
+        digest = content_hash(arrays)
+        stored = {variable: value_array.copy() for variable, value_array, _ in arrays}
+        with open(path + ".tmp", 'wb') as cache_file:
+            np.savez(cache_file, __hash__=np.array(digest), **stored)
+        os.replace(path + ".tmp", path)
+        self._loaded[path] = os.stat(path).st_mtime_ns, (digest, stored)
+
+    def invalidate(self, url, db_name):
+        path = self._path(url, db_name)
+        self._loaded.pop(path, None)
+        if os.path.exists(path):
+            os.remove(path)
+
+def read_ranges(session, ranges, db_name=MESSPUNKTE_DB):
+    """Liest mehrere Bereiche (Variable, start, stop) in einem Read-Request.
+
+    Gibt je Bereich ein Array zurück bzw. None, wenn die SPS den Bereich nicht liefern konnte.
+    """
+    nodes = session.get_nodes(db_name, [variable for variable, _, _ in ranges])
+    results = session.read_values(nodes, index_range=[index_range(start, stop) for _, start, stop in ranges])
+    sliced_by_server = session.supports_index_range(nodes[0]) if nodes else True
+    values = []
+    for (_, start, stop), result in zip(ranges, results):
+        value = result.Value.Value if result.StatusCode.is_good() else None
+        if stop - start == 1 and value is not None and not isinstance(value, (list, tuple)):
+            value = [value]
+        values.append(None if value is None else np.array(slice_result(value, start, stop, sliced_by_server)))
+    return values
+
+def cache_matches_plc(session, cached_arrays, db_name=MESSPUNKTE_DB, checksum_variable=CHECKSUM_VARIABLE,
+                      full_check=CACHE_FULL_CHECK):
+    """Prüft, ob die SPS genau den Inhalt des Caches enthält.
+
+    Mit Prüfsumme in der SPS genügt ein Wert. Ohne Prüfsumme wird dem Cache vertraut, da Uploads am Cache
+    vorbei ihn verwerfen; nur mit full_check werden alle Arrays vollständig gelesen (ein Read-Request).
+    """
+    if checksum_variable is not None:
+        result = session.read_values([session.get_node(db_name, checksum_variable)])[0]
+        arrays = [(variable, value_array, None) for variable, value_array in cached_arrays.items()]
+        return result.StatusCode.is_good() and bool(np.isclose(result.Value.Value, checksum(arrays),
+                                                               rtol=CHECKSUM_TOLERANCE))
+    if not full_check:
+        return True
+
+    ranges = [(variable, 0, len(value_array)) for variable, value_array in cached_arrays.items()]
+    return all(len(_mismatches(cached_arrays[variable], value)) == 0
+               for (variable, _, _), value in zip(ranges, read_ranges(session, ranges, db_name)))
+
+def checksum(arrays):
+    """Prüfsumme wie in der SPS: Summe über alle Arrays von Wert * (Position + 1)."""
+    return sum(float(np.dot(value_array.astype(np.float64), np.arange(1, len(value_array) + 1)))
+               for _, value_array, _ in arrays)
+
+def _mismatches(expected, value):
+    if value is None or len(value) != len(expected):
+        return np.arange(len(expected))
+    return np.flatnonzero(value.astype(expected.dtype) != expected)
+
+def verify_upload(session, arrays, db_name=MESSPUNKTE_DB, block_size=VERIFY_BLOCK_SIZE,
+                  checksum_variable=CHECKSUM_VARIABLE):
+    """Prüft nach dem Upload, ob die SPS die gesendeten Arrays enthält, ohne sie vollständig zurückzulesen.
+
+    Mit Prüfsumme in der SPS genügt ein einziger Wert. Sonst wird je Block von block_size Einträgen ein
+    zufälliger Eintrag gelesen (alle Variablen in einem Read-Request). Nur Blöcke mit Abweichung
+    (oder bei falscher Prüfsumme) werden gezielt vollständig nachgelesen.
+    Gibt ein Dict Variable -> Positionen mit abweichendem Inhalt zurück (leer, wenn alles stimmt).
+    """
+    if checksum_variable is not None:
+        result = session.read_values([session.get_node(db_name, checksum_variable)])[0]
+        if result.StatusCode.is_good() and np.isclose(result.Value.Value, checksum(arrays),
+                                                      rtol=CHECKSUM_TOLERANCE):
+            print("Upload verified by PLC checksum")
+            return {}
+        print("PLC checksum differs, checking samples")
+
+    rng = np.random.default_rng()
+    samples = []
+    for variable, value_array, _ in arrays:
+        starts = np.arange(0, len(value_array), block_size)
+        stops = np.minimum(starts + block_size, len(value_array))
+        positions = rng.integers(starts, stops)
+        samples += [(variable, position, position + 1) for position in positions.tolist()]
+    values = read_ranges(session, samples, db_name)
+
+    expected = {variable: value_array for variable, value_array, _ in arrays}
+    suspect = [(variable, position - position % block_size, min(position - position % block_size + block_size,
+                                                                 len(expected[variable])))
+               for (variable, position, _), value in zip(samples, values)
+               if len(_mismatches(expected[variable][position:position + 1], value))]
+
+    # Stimmt eine Prüfsumme nicht, obwohl alle Stichproben passen, alle Blöcke nachlesen
+    if checksum_variable is not None and not suspect:
+        suspect = [(variable, position - position % block_size,
+                    min(position - position % block_size + block_size, len(expected[variable])))
+                   for variable, position, _ in samples]
+
+    mismatches = {}
+    for (variable, start, stop), value in zip(suspect, read_ranges(session, suspect, db_name) if suspect else []):
+        positions = _mismatches(expected[variable][start:stop], value) + start
+        if len(positions):
+            mismatches.setdefault(variable, []).extend(positions.tolist())
+
+    read_count = len(samples) + sum(stop - start for _, start, stop in suspect)
+    print(f"Upload verification: {read_count} values read, "
+          f"{sum(len(positions) for positions in mismatches.values())} mismatches")
+    return mismatches
+
+def upload_delta(session, arrays, cache, db_name=MESSPUNKTE_DB, full_check=CACHE_FULL_CHECK):
+    """Schreibt nur die gegenüber dem letzten erfolgreichen Upload geänderten Bereiche per IndexRange.
+
+    Stimmen Cache, SPS-Inhalt (siehe cache_matches_plc) und Hash überein, wird nichts geschrieben.
+    Ein vollständiger Upload erfolgt, wenn der Cache leer ist, nicht zu den Arrays passt, die SPS andere Inhalte
+    meldet oder der Server IndexRange nicht unterstützt (er würde sonst das ganze Array durch den Ausschnitt
+    ersetzen).
+    Gibt (StatusCodes, Anzahl geschriebener Werte) zurück.
+    """
+    cached = cache.load(session.url, db_name)
+    variables = [variable for variable, _, _ in arrays]
+    nodes = session.get_nodes(db_name, variables)
+
+    cache_valid = (cached is not None
+                   and list(cached[1]) == variables
+                   and all(cached[1][variable].shape == value_array.shape for variable, value_array, _ in arrays)
+                   and cache_matches_plc(session, cached[1], db_name, full_check=full_check))
+
+    if cache_valid and cached[0] == content_hash(arrays):
+        print("Operating points unchanged, nothing to write")
+        return {}, 0
+
+    if not cache_valid or not session.supports_index_range(nodes[0]):
+        print("Upload cache cold or outdated or IndexRange not supported, writing all arrays")
+        cache.invalidate(session.url, db_name)
+        status_codes = upload_arrays(session, arrays, db_name)
+        cache.store(session.url, db_name, arrays)
+        return status_codes, sum(len(value_array) for _, value_array, _ in arrays)
+
+    check_data_types(session, arrays, db_name)
+    write_nodes, values, ranges, keys = [], [], [], []
+    for node, (variable, value_array, value_type) in zip(nodes, arrays):
+        for start, stop in changed_ranges(cached[1][variable], value_array):
+            write_nodes.append(node)
+            values.append(to_variant(value_array[start:stop], value_type))
+            ranges.append(index_range(start, stop))
+            keys.append(f"{variable}[{index_range(start, stop)}]")
+
+    status_codes = dict(zip(keys, session.write_values(write_nodes, values, ranges)))
+    failed = {key: status for key, status in status_codes.items() if not status.is_good()}
+    if failed:
+        # Inhalt der SPS ist unbekannt, beim nächsten Mal vollständig schreiben
+        cache.invalidate(session.url, db_name)
+        raise UploadFehler("Upload fehlgeschlagen: " + ", ".join(f"{key}: {status.name}"
+                                                                 for key, status in failed.items()),
+                           status_codes)
+
+    cache.store(session.url, db_name, arrays)
+    written = sum(len(value.Value) for value in values)
+    print(f"Delta upload: {len(values)} ranges, {written} values written")
+    return status_codes, written
+
+def check_upload(session, arrays, cache=None, db_name=MESSPUNKTE_DB):
+    """Prüft den Upload mit verify_upload() und löst bei Abweichungen UploadFehler aus (Cache wird verworfen)."""
+    mismatches = verify_upload(session, arrays, db_name)
+    if mismatches:
+        if cache is not None:
+            cache.invalidate(session.url, db_name)
+        raise UploadFehler("Prüfung fehlgeschlagen, abweichende Einträge: " + ", ".join(
+            f"{variable} {positions[0]}..{positions[-1]} ({len(positions)})"
+            for variable, positions in mismatches.items()))
+
+def page_count(rows, page_size=PAGE_SIZE):
+    return -(-rows // page_size)
+
+def _read_int(session, node):
+    result = session.read_values([node])[0]
+    if not result.StatusCode.is_good():
+        raise UploadFehler(f"Handshake-Variable nicht lesbar: {result.StatusCode.name}")
+    return int(result.Value.Value)
+
+def _write_int(session, node, value):
+    status = session.write_values([node], [ua.Variant(int(value), ua.VariantType.Int16)])[0]
+    if not status.is_good():
+        raise UploadFehler(f"Handshake-Variable nicht beschreibbar: {status.name}")
+
+def _write_page(session, nodes, buffers, page, page_size):
+    """Schreibt die Hälfte des Doppelpuffers, in der die Seite liegt (bzw. den ganzen Puffer ohne IndexRange)."""
+    if session.supports_index_range(nodes[0]):
+        start = (page % 2) * page_size
+        values = [to_variant(value_array[start:start + page_size], value_type) for value_array, value_type in buffers]
+        status_codes = session.write_values(nodes, values, index_range(start, start + page_size))
+    else:
+        # Die andere Hälfte wird mit ihrem unveränderten Inhalt mitgeschrieben
+        values = [to_variant(value_array, value_type) for value_array, value_type in buffers]
+        status_codes = session.write_values(nodes, values)
+    failed = [status.name for status in status_codes if not status.is_good()]
+    if failed:
+        raise UploadFehler(f"Seite {page + 1} fehlgeschlagen: {', '.join(failed)}")
+
+def upload_paged(session, columns, db_name=MESSPUNKTE_DB, page_size=PAGE_SIZE, progress=None,
+                 poll_interval=PAGE_POLL_INTERVAL, verify=False):
+    """Lädt beliebig lange Listen seitenweise in den Messpunkte_DB, während die SPS sie abarbeitet.
+
+    Die beiden Hälften der Arrays bilden einen Doppelpuffer. Seite k liegt in Hälfte k % 2 und wird erst
+    geschrieben, wenn die SPS Seite k - 2 abgearbeitet hat (Seiten_fertig >= k - 1). Danach wird
+    Seiten_geladen auf k + 1 gesetzt. Nach der letzten Seite sind die restlichen Einträge 0.
+    Mit verify wird jede Seite vor der Freigabe mit check_upload() geprüft; bei Abweichungen wird sie nicht
+    freigegeben (UploadFehler).
+    progress(done, total, text) meldet die abgearbeiteten Seiten; eine Exception daraus (z.B. Abbruch)
+    beendet das Nachladen, bereits geladene Seiten arbeitet die SPS noch ab.
+    Gibt die Anzahl der Seiten zurück.
+    """
+    variables = [variable for variable, _, _ in columns]
+    rows = len(columns[0][1])
+    pages = page_count(rows, page_size)
+    handshake = [PAGES_TOTAL_VARIABLE, PAGES_LOADED_VARIABLE, PAGES_DONE_VARIABLE]
+    check_data_types(session, columns + [(variable, None, ua.VariantType.Int16) for variable in handshake], db_name)
+    if pages > np.iinfo(np.int16).max:
+        raise UploadFehler(f"Zu viele Seiten für den Handshake: {pages}")
+
+    nodes = session.get_nodes(db_name, variables)
+    total_node, loaded_node, done_node = session.get_nodes(db_name, handshake)
+    buffers = [(np.zeros(2 * page_size, dtype=values.dtype), value_type) for _, values, value_type in columns]
+
+    def wait_until(target):
+        """Wartet, bis die SPS mindestens target Seiten abgearbeitet hat."""
+        done = _read_int(session, done_node)
+        while done < target:
+            if progress is not None:
+                progress(done, pages, f"Warte auf SPS: Seite {done + 1} von {pages} in Bearbeitung")
+            time.sleep(poll_interval)
+            done = _read_int(session, done_node)
+        return done
+
+    # Handshake zurücksetzen, bevor die ersten Seiten geschrieben werden
+    _write_int(session, total_node, 0)
+    _write_int(session, loaded_node, 0)
+    _write_int(session, done_node, 0)
+
+    for page in range(pages):
+        # Die Hälfte wird erst überschrieben, wenn die SPS die vorherige Seite darin abgearbeitet hat
+        done = wait_until(page - 1)
+
+        start = (page % 2) * page_size
+        rows_in_page = min(page_size, rows - page * page_size)
+        for (value_array, _), (_, values, _) in zip(buffers, columns):
+            value_array[start:start + page_size] = 0
+            value_array[start:start + rows_in_page] = values[page * page_size:page * page_size + rows_in_page]
+        _write_page(session, nodes, buffers, page, page_size)
+        if verify:
+            check_upload(session, [(variable, value_array, value_type)
+                                   for variable, (value_array, value_type) in zip(variables, buffers)], db_name=db_name)
+
+        # Erst nach den Daten freigeben; Seiten_gesamt startet die Abarbeitung
+        _write_int(session, loaded_node, page + 1)
+        if page == min(1, pages - 1):
+            _write_int(session, total_node, pages)
+        print(f"Page {page + 1} of {pages} loaded")
+        if progress is not None:
+            progress(done, pages, f"Seite {page + 1} von {pages} geladen")
+
+    wait_until(pages)
+    print(f"All {pages} pages processed by the PLC")
+    return pages
+
+def upload_list(session, daten, mode=None, cache=None, verify=False, db_name=MESSPUNKTE_DB, progress=None):
+    """Lädt eine Arbeitspunktliste (DataFrame) ohne GUI in die SPS.
+
+    Listen, die in den Messpunkte_DB passen, werden per Delta-Upload geschrieben, längere seitenweise
+    (optional jeweils mit Prüfung, beim seitenweisen Upload je Seite); dann kehrt die Funktion erst zurück, wenn die SPS alle Seiten abgearbeitet hat.
+    Ohne cache werden alle Arrays geschrieben; ein Cache des Aufrufers muss dann von ihm verworfen werden.
+    Gibt die Anzahl geschriebener Werte bzw. der Seiten zurück.
+    """
+    mode = mode or detect_mode(daten)
+    columns = prepare_columns(daten, mode)
+    if len(daten) > ARRAY_SIZE:
+        # Der Messpunkte_DB entspricht danach nicht mehr dem Cache
+        if cache is not None:
+            cache.invalidate(session.url, db_name)
+        return upload_paged(session, columns, db_name, progress=progress, verify=verify)
+
+    arrays = prepare_arrays(daten, mode)
+    if cache is not None:
+        _, written = upload_delta(session, arrays, cache, db_name)
+    else:
+        upload_arrays(session, arrays, db_name)
+        written = sum(len(value_array) for _, value_array, _ in arrays)
+    if verify:
+        check_upload(session, arrays, cache, db_name)
+    return written
@@ -0,0 +1,278 @@
+import atexit
+import concurrent.futures
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from opcua import Client, ua
+
+# Standard-Einstellungen der SPS
+OPCUA_URL = "opc.tcp://192.168.0.1:4840"
+NAMESPACE_INDEX = 3
+CONNECT_TIMEOUT = 4  # s
+
+# Verbindungsüberwachung
+KEEPALIVE_INTERVAL = 5  # s
+RECONNECT_DELAY_MIN = 1  # s
+RECONNECT_DELAY_MAX = 30  # s
+
+# Maximale Anzahl Knoten pro Read-Request
+READ_BATCH_SIZE = 50
+
+# Anzahl gleichzeitig laufender Requests, wenn mehrere Batches nötig sind
+MAX_PARALLEL_REQUESTS = 4
+
+# Fehler, die auf eine verlorene Verbindung hindeuten
+CONNECTION_ERRORS = (OSError, concurrent.futures.TimeoutError)
+SESSION_STATUS_CODES = (
+    ua.StatusCodes.BadSessionIdInvalid,
+    ua.StatusCodes.BadSessionClosed,
+    ua.StatusCodes.BadSecureChannelIdInvalid,
+    ua.StatusCodes.BadSecureChannelClosed,
+    ua.StatusCodes.BadConnectionClosed,
+)
+
+# Gemeinsam genutzte Verbindungen je (URL, Benutzer, Namespace)
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def index_range(start, stop):
+    """Erzeugt einen OPC-UA IndexRange für die Einträge start bis stop (exklusiv)."""
+    if stop - start == 1:
+        return str(start)
+    return f"{start}:{stop - 1}"
+
+def run_batches(function, batches, progress=None, max_workers=MAX_PARALLEL_REQUESTS):
+    """Führt function(batch) für alle Batches aus und gibt die aneinandergehängten Ergebnisse zurück.
+
+    Unabhängige Batches laufen gleichzeitig (der Client ordnet die Antworten über die Request-ID zu).
+    progress(done, total) wird nach jedem Batch mit der Anzahl bearbeiteter Einträge aufgerufen.
+    """
+    total = sum(len(batch) for batch in batches)
+    results = []
+    if len(batches) <= 1 or max_workers <= 1:
+        for batch in batches:
+            results.extend(function(batch))
+            if progress is not None:
+                progress(len(results), total)
+        return results
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for future in [executor.submit(function, batch) for batch in batches]:
+            results.extend(future.result())
+            if progress is not None:
+                progress(len(results), total)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    return results
+
+def read_values(client, nodes, batch_size=READ_BATCH_SIZE, attribute=ua.AttributeIds.Value, index_range=None,
+                progress=None):
+    """Liest ein Attribut mehrerer Knoten mit möglichst wenigen Read-Requests.
+
+    Mit index_range (z.B. "100:149") wird bei Arrays nur der angegebene Bereich übertragen; es kann auch
+    eine Liste mit einem Bereich je Knoten sein (derselbe Knoten darf mehrfach vorkommen).
+    Gibt die DataValues in der Reihenfolge der Knoten zurück, inklusive StatusCode je Knoten.
+    """
+    if not isinstance(index_range, (list, tuple)):
+        index_range = [index_range] * len(nodes)
+
+    def read_batch(batch):
+        params = ua.ReadParameters()
+        for node, node_range in batch:
+            read_value = ua.ReadValueId()
+            read_value.NodeId = node.nodeid
+            read_value.AttributeId = attribute
+            read_value.IndexRange = node_range
+            params.NodesToRead.append(read_value)
+        return client.uaclient.read(params)
+
+    entries = list(zip(nodes, index_range))
+    batches = [entries[start:start + batch_size] for start in range(0, len(entries), batch_size)]
+    return run_batches(read_batch, batches, progress)
+
+def write_values(client, nodes, values, index_range=None):
+    """Schreibt die Werte mehrerer Knoten in einem einzigen Write-Request.
+
+    values sind ua.Variant bzw. ua.DataValue in der Reihenfolge der Knoten; index_range ist entweder
+    ein gemeinsamer Bereich, eine Liste mit einem Bereich je Knoten oder None.
+    Gibt die StatusCodes je Knoten zurück.
+    """
+    if not isinstance(index_range, (list, tuple)):
+        index_range = [index_range] * len(nodes)
+    params = ua.WriteParameters()
+    for node, value, node_range in zip(nodes, values, index_range):
+        write_value = ua.WriteValue()
+        write_value.NodeId = node.nodeid
+        write_value.AttributeId = ua.AttributeIds.Value
+        write_value.IndexRange = node_range
+        write_value.Value = value if isinstance(value, ua.DataValue) else ua.DataValue(value)
+        params.NodesToWrite.append(write_value)
+    return client.uaclient.write(params)
+
+def is_connection_error(error):
+    """Prüft, ob ein Fehler durch eine abgebrochene Verbindung/Session verursacht wurde."""
+    if isinstance(error, CONNECTION_ERRORS):
+        return True
+    return isinstance(error, ua.UaStatusCodeError) and error.code in SESSION_STATUS_CODES
+
+class SPSVerbindung:
+    """Langlebige OPC-UA-Session zur SPS mit Keep-Alive, automatischem Reconnect und Knoten-Cache."""
+
+    def __init__(self, url=OPCUA_URL, username="", password="", namespace_index=NAMESPACE_INDEX):
+        self.url = url
+        self.username = username
+        self.password = password
+        self.namespace_index = namespace_index
+        self.client = None
+        self.connected = False
+        self.connection_count = 0  # wird bei jedem (Re-)Connect erhöht, z.B. um Subscriptions neu anzulegen
+        self._lock = threading.RLock()
+        self._nodes = {}
+        self._data_types = {}
+        self._index_range_supported = None
+        self._stop_event = threading.Event()
+        self._watchdog = None
+
+    def node_id(self, db_name, variable):
+        return f'ns={self.namespace_index};s="{db_name}"."{variable}"'
+
+    def connect(self):
+        """Stellt die Verbindung her, falls sie noch nicht besteht, und gibt den Client zurück."""
+        with self._lock:
+            if self.connected:
+                return self.client
+            if self.client is None:
+                # Der Client wird bei einem Reconnect wiederverwendet, damit gecachte Knoten gültig bleiben
+                self.client = Client(self.url, timeout=CONNECT_TIMEOUT)
+                if self.username and self.password:
+                    self.client.set_user(self.username)
+                    self.client.set_password(self.password)
+            self.client.connect()
+            self.connected = True
+            self.connection_count += 1
+            print(f"Connected to OPC-UA server {self.url}")
+
+            if self._watchdog is None or not self._watchdog.is_alive():
+                self._stop_event.clear()
+                self._watchdog = threading.Thread(target=self._watch_connection, daemon=True)
+                self._watchdog.start()
+            return self.client
+
+    def disconnect(self):
+        """Trennt die Verbindung endgültig und beendet die Überwachung."""
+        self._stop_event.set()
+        with self._lock:
+            if self.connected:
+                self._close_client()
+                print(f"Disconnected from OPC-UA server {self.url}")
+
+    def _close_client(self):
+        self.connected = False
+        try:
+            self.client.disconnect()
+        except Exception:
+            # Verbindung ist bereits abgebrochen
+            pass
+
+    def _watch_connection(self):
+        """Prüft zyklisch den Serverstatus und baut die Verbindung bei Abbruch mit Backoff neu auf."""
+        server_state = ua.FourByteNodeId(ua.ObjectIds.Server_ServerStatus_State)
+        delay = RECONNECT_DELAY_MIN
+        while not self._stop_event.wait(KEEPALIVE_INTERVAL if self.connected else delay):
+            with self._lock:
+                try:
+                    if self.connected:
+                        self.client.get_node(server_state).get_value()
+                        continue
+                    self.client.connect()
+                    self.connected = True
+                    self.connection_count += 1
+                    delay = RECONNECT_DELAY_MIN
+                    print(f"Reconnected to OPC-UA server {self.url}")
+                except Exception as e:
+                    if self.connected:
+                        print(f"Connection to OPC-UA server {self.url} lost: {e}")
+                        self._close_client()
+                    else:
+                        delay = min(delay * 2, RECONNECT_DELAY_MAX)
+                        print(f"Reconnect to {self.url} failed, next attempt in {delay} s")
+
+    def call(self, function, *args, **kwargs):
+        """Führt eine Operation auf dem Client aus und wiederholt sie einmal nach einem Verbindungsabbruch."""
+        with self._lock:
+            self.connect()
+            try:
+                return function(*args, **kwargs)
+            except Exception as e:
+                if not is_connection_error(e):
+                    raise
+                print(f"Connection to OPC-UA server {self.url} lost: {e}")
+                self._close_client()
+                self.connect()
+                return function(*args, **kwargs)
+
+    def get_node(self, db_name, variable):
+        """Gibt den (gecachten) Knoten einer DB-Variable zurück."""
+        key = (db_name, variable)
+        with self._lock:
+            if key not in self._nodes:
+                self.connect()
+                self._nodes[key] = self.client.get_node(self.node_id(db_name, variable))
+            return self._nodes[key]
+
+    def get_nodes(self, db_name, variables):
+        return [self.get_node(db_name, variable) for variable in variables]
+
+    def get_data_types(self, db_name, variables):
+        """Gibt die VariantTypes der Variablen zurück; noch unbekannte werden gesammelt gelesen."""
+        with self._lock:
+            missing = [variable for variable in variables if (db_name, variable) not in self._data_types]
+            if missing:
+                results = self.read_values(self.get_nodes(db_name, missing), attribute=ua.AttributeIds.DataType)
+                for variable, result in zip(missing, results):
+                    if result.StatusCode.is_good():
+                        self._data_types[(db_name, variable)] = ua.VariantType(result.Value.Value.Identifier)
+            return {variable: self._data_types.get((db_name, variable)) for variable in variables}
+
+    def supports_index_range(self, node):
+        """Prüft einmalig anhand eines Array-Knotens, ob der Server IndexRange auswertet.
+
+        Manche Server ignorieren IndexRange und liefern immer das ganze Array.
+        """
+        with self._lock:
+            if self._index_range_supported is None:
+                value = self.read_values([node], index_range="0:1")[0].Value.Value
+                self._index_range_supported = isinstance(value, (list, tuple)) and len(value) == 2
+            return self._index_range_supported
+
+    def read_values(self, nodes, batch_size=READ_BATCH_SIZE, attribute=ua.AttributeIds.Value, index_range=None,
+                    progress=None):
+        return self.call(read_values, self.client, nodes, batch_size, attribute, index_range, progress)
+
+    def write_values(self, nodes, values, index_range=None):
+        return self.call(write_values, self.client, nodes, values, index_range)
+
+def get_session(url=OPCUA_URL, username="", password="", namespace_index=NAMESPACE_INDEX):
+    """Gibt die gemeinsam genutzte Verbindung zu einer SPS zurück (wird bei Bedarf angelegt).
+
+    Prüfstände mit derselben URL, aber anderem Benutzer oder Namespace erhalten eigene Verbindungen.
+    """
+    key = (url, username, namespace_index)
+    with _sessions_lock:
+        if key not in _sessions:
+            _sessions[key] = SPSVerbindung(url, username, password, namespace_index)
+        return _sessions[key]
+
+def close_all_sessions():
+    """Trennt alle gemeinsam genutzten Verbindungen."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.disconnect()
+        _sessions.clear()
+
+# Die Threads von python-opcua sind keine Daemon-Threads; atexit-Handler laufen aber erst, nachdem der
+# Interpreter auf diese Threads gewartet hat. Daher vorher trennen, sonst hängt das Programm beim Beenden.
+if hasattr(threading, '_register_atexit'):
+    threading._register_atexit(close_all_sessions)
+else:
+    atexit.register(close_all_sessions)
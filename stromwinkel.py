@@ -1,65 +1,37 @@
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
-import pandas as pd
+from tkinter import filedialog, messagebox
 import os
+from tabelle import VirtualTable
+import arbeitspunkte_generator as generator
+import messlauf_datei
+import mtpa_suche
+import stromwinkel_auswertung
 
 # Datei für Standardwerte
-DEFAULT_VALUES_CSV = 'default_values_stromwinkel.csv'
+DEFAULT_VALUES_CSV = generator.STROMWINKEL_DEFAULTS_CSV
 
 # Standardwerte
-default_values = {
-    'speed': 500,  # konstante Drehzahl
-    'current_start': 1,
-    'current_end': 20,
-    'current_step': 1,
-    'angle_values': "0,40,42,44,46,48,50,52,54,56,58,60,62,64,66,68,70,72,74,76,78,80,82,84,86,88,90"
-}
+default_values = dict(generator.STROMWINKEL_DEFAULTS)
 
 df_global = None
 
 def load_default_values():
     """Lädt die Standardwerte aus der CSV-Datei oder verwendet Standardwerte."""
     if os.path.exists(DEFAULT_VALUES_CSV):
-        try:
-            df = pd.read_csv(DEFAULT_VALUES_CSV)
-            for key in default_values.keys():
-                if key in df.columns:
-                    default_values[key] = df[key].iloc[0]
-        except pd.errors.EmptyDataError:
-            pass
+        default_values.update(generator.load_default_values(DEFAULT_VALUES_CSV, default_values))
     else:
         save_default_values()
 
 def save_default_values():
     """Speichert die Standardwerte in der CSV-Datei."""
-    df = pd.DataFrame(default_values, index=[0])
-    df.to_csv(DEFAULT_VALUES_CSV, index=False)
+    generator.save_default_values(DEFAULT_VALUES_CSV, default_values)
 
 def generate_and_show_table():
     global df_global
     try:
         # Eingabewerte aus der GUI holen
-        speed = int(speed_var.get())
-        current_start = int(current_start_var.get())
-        current_end = int(current_end_var.get())
-        current_step = int(current_step_var.get())
-        angle_values = list(map(int, angle_values_var.get().split(',')))
-
-        # Erstelle die Messpunkte
-        currents = range(current_start, current_end + current_step, current_step)
-
-        # Erstelle eine leere Liste für die Tabelle
-        table_data = []
-        index = 1
-
-        # Generiere die Tabelle
-        for current in currents:
-            for angle in angle_values:
-                table_data.append([index, speed, current, angle])
-                index += 1
-
-        # DataFrame erstellen
-        df_global = pd.DataFrame(table_data, columns=["index", "drehzahl", "strom_effektiv", "stromwinkel"])
+        df_global = generator.stromwinkel_liste(speed_var.get(), current_start_var.get(), current_end_var.get(),
+                                                current_step_var.get(), angle_values_var.get())
 
         show_table()
     except ValueError:
@@ -71,22 +43,9 @@ def show_table():
         table_window = tk.Toplevel(root)
         table_window.title("Erzeugte Tabelle")
 
-        tree = ttk.Treeview(table_window, columns=list(df_global.columns), show='headings')
-
-        for col in df_global.columns:
-            tree.heading(col, text=col)
-            tree.column(col, width=100, anchor='center')
-
-        for index, row in df_global.iterrows():
-            tree.insert('', 'end', values=list(row))
-
-        vsb = ttk.Scrollbar(table_window, orient="vertical", command=tree.yview)
-        hsb = ttk.Scrollbar(table_window, orient="horizontal", command=tree.xview)
-        tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
-
-        tree.pack(side='left', fill='both', expand=True)
-        vsb.pack(side='right', fill='y')
-        hsb.pack(side='bottom', fill='x')
+        table = VirtualTable(table_window)
+        table.pack(fill='both', expand=True)
+        table.set_data(df_global)
 
 def save_csv():
     if df_global is not None:
@@ -94,6 +53,65 @@ def save_csv():
         if file_path:
             df_global.to_csv(file_path, index=False)
 
+def mtpa_next_round():
+    """MTPA-Suche in Runden: aus den bisher gemessenen Runden die nächste Liste erzeugen.
+
+    Der Suchbereich reicht vom kleinsten bis zum größten Stromwinkel größer 0 der Eingabe.
+    """
+    paths = messlauf_datei.selected_runs(filedialog.askopenfilenames(
+        filetypes=messlauf_datei.DIALOG_FILETYPES, title="Bisher gemessene Runden wählen (Abbrechen = erste Runde)"))
+    try:
+        angles = [angle for angle in generator.parse_angles(angle_values_var.get()) if angle > 0]
+        suche = mtpa_suche.MTPASuche(speed_var.get(), current_start_var.get(), current_end_var.get(),
+                                     current_step_var.get(), angle_min=min(angles), angle_max=max(angles))
+        measurements = mtpa_suche.load_measurements(paths)
+    except ValueError:
+        messagebox.showerror("Ungültige Eingabe", "Bitte stellen Sie sicher, dass alle Werte gültige Zahlen sind.")
+        return
+    except KeyError as e:
+        messagebox.showerror("Fehler", f"Messung enthält nicht alle benötigten Spalten: {e}")
+        return
+
+    results = suche.results(measurements)
+    if not results.empty:
+        show_results(results)
+    next_round = suche.next_round(measurements)
+    if next_round.empty:
+        messagebox.showinfo("Info", f"MTPA-Suche abgeschlossen ({len(measurements)} Messpunkte).")
+        return
+    file_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")], title="Nächste Runde speichern")
+    if file_path:
+        next_round.to_csv(file_path, index=False)
+        messagebox.showinfo("Info", f"Nächste Runde mit {len(next_round)} Arbeitspunkten gespeichert.")
+
+def evaluate_measurement():
+    """Wertet eine Stromwinkel-Messung aus (Anpassung je Stromstufe) und speichert die MTPA-Kennlinie."""
+    file_path = filedialog.askopenfilename(filetypes=messlauf_datei.DIALOG_FILETYPES, title="Stromwinkel-Messung wählen")
+    if not file_path:
+        return
+    file_path, = messlauf_datei.selected_runs([file_path])
+    try:
+        results = stromwinkel_auswertung.evaluate_file(file_path)
+    except (KeyError, ValueError) as e:
+        messagebox.showerror("Fehler", f"Messung kann nicht ausgewertet werden: {e}")
+        return
+    if results.empty:
+        messagebox.showinfo("Info", "Keine Stromstufe mit genügend Stromwinkeln gefunden.")
+        return
+    show_results(results.drop(columns=['c0', 'c1', 's1', 'c2', 's2']), "Auswertung je Stromstufe")
+
+    lut_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")], title="MTPA-Kennlinie speichern")
+    if lut_path:
+        stromwinkel_auswertung.lookup_table(results).to_csv(lut_path, index=False)
+
+def show_results(results, title="MTPA je Stromstufe"):
+    results_window = tk.Toplevel(root)
+    results_window.title(title)
+
+    table = VirtualTable(results_window)
+    table.pack(fill='both', expand=True)
+    table.set_data(results.round(4))
+
 def on_closing():
     save_default_values()
     root.destroy()
@@ -136,6 +154,12 @@ def main():
     save_button = tk.Button(frame, text="Tabelle als CSV speichern", command=save_csv)
     save_button.grid(row=8, column=0, columnspan=2, pady=5)
 
+    mtpa_button = tk.Button(frame, text="MTPA-Suche: nächste Runde", command=mtpa_next_round)
+    mtpa_button.grid(row=9, column=0, columnspan=2, pady=5)
+
+    evaluate_button = tk.Button(frame, text="Messung auswerten", command=evaluate_measurement)
+    evaluate_button.grid(row=10, column=0, columnspan=2, pady=5)
+
     root.protocol("WM_DELETE_WINDOW", on_closing)
     root.mainloop()
 
@@ -0,0 +1,145 @@
+import os
+import numpy as np
+import pandas as pd
+import messlauf_datei
+from messlauf_datei import AUSWERTUNG_CACHE_DIR
+
+# Bei Änderungen an Ansatz oder Ergebnisspalten erhöhen, damit alte Einträge nicht mehr passen
+CACHE_VERSION = 1
+
+# Spalten einer Stromwinkel-Messung, die für die Auswertung gebraucht werden
+MEASUREMENT_COLUMNS = ['Strom_Effektivwert_soll', 'Stromwinkel_soll', 'M']
+
+# Auflösung, mit der das Maximum der angepassten Kurve gesucht wird (°)
+ANGLE_RESOLUTION = 0.01
+
+# Referenzpunkte (0° = reiner d-Strom) liegen weit vom MTPA-Bereich und gehen nicht in die Anpassung ein
+EXCLUDED_ANGLES = (0,)
+
+# Mindestanzahl Winkel je Stromstufe für die Anpassung (5 Koeffizienten)
+MIN_ANGLES = 5
+
+RESULT_COLUMNS = ['strom_effektiv', 'stromwinkel_mtpa', 'drehmoment', 'drehmoment_je_ampere', 'id', 'iq',
+                  'rms_fehler', 'winkel_min', 'winkel_max', 'messpunkte', 'c0', 'c1', 's1', 'c2', 's2']
+
+def basis(angles):
+    """Ansatz für das Drehmoment über dem Stromwinkel: [1, cos θ, sin θ, cos 2θ, sin 2θ] (θ in Grad)."""
+    theta = np.radians(np.asarray(angles, dtype=float))
+    return np.stack([np.ones_like(theta), np.cos(theta), np.sin(theta), np.cos(2 * theta), np.sin(2 * theta)], axis=-1)
+
+def fit_groups(groups, angles, torques, group_count):
+    """Kleinste Quadrate für alle Stromstufen gleichzeitig.
+
+    Die Normalgleichungen X^T X c = X^T M werden je Gruppe mit np.add.at aufsummiert und als Stapel gelöst.
+    Gibt die Koeffizienten (Gruppen x 5) und den RMS-Fehler je Gruppe zurück.
+    """
+    X = basis(angles)
+    normal = np.zeros((group_count, 5, 5))
+    rhs = np.zeros((group_count, 5))
+    np.add.at(normal, groups, X[:, :, np.newaxis] * X[:, np.newaxis, :])
+    np.add.at(rhs, groups, X * torques[:, np.newaxis])
+    coefficients = np.linalg.solve(normal, rhs[:, :, np.newaxis])[:, :, 0]
+    residuals = torques - np.einsum('ij,ij->i', X, coefficients[groups])
+    counts = np.bincount(groups, minlength=group_count)
+    rms = np.sqrt(np.bincount(groups, weights=residuals ** 2, minlength=group_count) / counts)
+    return coefficients, rms
+
+def evaluate(df, excluded_angles=EXCLUDED_ANGLES):
+    """Wertet eine Stromwinkel-Messung aus: je Stromstufe Anpassung Drehmoment über Winkel und MTPA-Punkt.
+
+    Gesucht wird das Maximum der angepassten Kurve im gemessenen Winkelbereich der Stufe. id und iq folgen
+    der Konvention der SPS (Winkel 0° = reiner d-Strom): id = √2·I·cos θ, iq = √2·I·sin θ.
+    """
+    currents = np.asarray(df['Strom_Effektivwert_soll'], dtype=float)
+    angles = np.asarray(df['Stromwinkel_soll'], dtype=float)
+    torques = np.asarray(df['M'], dtype=float)
+    valid = (currents > 0) & np.isfinite(angles) & np.isfinite(torques) & ~np.isin(angles, excluded_angles)
+    currents, angles, torques = currents[valid], angles[valid], torques[valid]
+
+    levels, groups = np.unique(np.round(currents, 3), return_inverse=True)
+    # Stufen mit zu wenigen verschiedenen Winkeln lassen sich nicht anpassen
+    distinct = np.unique(np.stack([groups, np.round(angles, 3)], axis=1), axis=0)
+    angle_counts = np.bincount(distinct[:, 0].astype(int), minlength=len(levels))
+    usable = angle_counts >= MIN_ANGLES
+    keep = usable[groups]
+    levels = levels[usable]
+    groups = (np.cumsum(usable) - 1)[groups[keep]]
+    angles, torques = angles[keep], torques[keep]
+    if len(levels) == 0:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+
+    coefficients, rms = fit_groups(groups, angles, torques, len(levels))
+    angle_min = np.full(len(levels), np.inf)
+    angle_max = np.full(len(levels), -np.inf)
+    np.minimum.at(angle_min, groups, angles)
+    np.maximum.at(angle_max, groups, angles)
+
+    # Maximum auf einem gemeinsamen Winkelraster, außerhalb des Messbereichs der Stufe gesperrt
+    grid = np.arange(angle_min.min(), angle_max.max() + ANGLE_RESOLUTION / 2, ANGLE_RESOLUTION)
+    curves = basis(grid) @ coefficients.T
+    outside = (grid[:, np.newaxis] < angle_min) | (grid[:, np.newaxis] > angle_max)
+    curves[outside] = -np.inf
+    best = np.argmax(curves, axis=0)
+    mtpa_angles = grid[best]
+    mtpa_torques = curves[best, np.arange(len(levels))]
+
+    peak = np.sqrt(2) * levels
+    result = pd.DataFrame({
+        'strom_effektiv': levels,
+        'stromwinkel_mtpa': np.round(mtpa_angles, 2),
+        'drehmoment': mtpa_torques,
+        'drehmoment_je_ampere': mtpa_torques / levels,
+        'id': peak * np.cos(np.radians(mtpa_angles)),
+        'iq': peak * np.sin(np.radians(mtpa_angles)),
+        'rms_fehler': rms,
+        'winkel_min': angle_min,
+        'winkel_max': angle_max,
+        'messpunkte': np.bincount(groups, minlength=len(levels)),
+    })
+    for column, values in zip(['c0', 'c1', 's1', 'c2', 's2'], coefficients.T):
+        result[column] = values
+    return result
+
+def fitted_torque(result, angles):
+    """Angepasstes Drehmoment je Stromstufe (Zeilen von result) an den Winkeln angles."""
+    coefficients = result[['c0', 'c1', 's1', 'c2', 's2']].to_numpy(dtype=float)
+    return basis(angles) @ coefficients.T
+
+def _cache_path(path, cache_dir):
+    return os.path.join(cache_dir, f"stromwinkel_v{CACHE_VERSION}_{messlauf_datei.file_hash(path)[:32]}.csv")
+
+def evaluate_file(path, cache_dir=AUSWERTUNG_CACHE_DIR):
+    """Wertet eine Messdatei aus; das Ergebnis wird je Hash der Datei zwischengespeichert (cache_dir=None: nie)."""
+    cache_path = _cache_path(path, cache_dir) if cache_dir else None
+    if cache_path and os.path.exists(cache_path):
+        try:
+            return pd.read_csv(cache_path)
+        except (pd.errors.ParserError, pd.errors.EmptyDataError):
+            pass
+    result = evaluate(messlauf_datei.load_dataframe(path, MEASUREMENT_COLUMNS))
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        result.to_csv(cache_path + ".tmp", index=False)
+        os.replace(cache_path + ".tmp", cache_path)
+    return result
+
+def lookup_table(result, torque_step=None):
+    """Kennlinie für die Regelung: Soll-Drehmoment -> id, iq, Strom und Winkel entlang der MTPA-Kurve.
+
+    Ohne torque_step werden die Stromstufen selbst ausgegeben, sonst wird auf ein Drehmomentraster
+    (0 bis größtes Drehmoment) linear interpoliert.
+    """
+    table = result[['drehmoment', 'strom_effektiv', 'stromwinkel_mtpa', 'id', 'iq']].sort_values('drehmoment')
+    table = table.reset_index(drop=True)
+    if not torque_step:
+        return table
+    torques = np.arange(0, table['drehmoment'].max() + torque_step / 2, torque_step)
+    # Bei 0 Nm ist der Strom 0, der Winkel bleibt der der kleinsten Stufe
+    anchor = table.iloc[0]
+    interpolated = {'drehmoment': torques}
+    for column in ('strom_effektiv', 'id', 'iq'):
+        interpolated[column] = np.interp(torques, np.concatenate(([0.0], table['drehmoment'])),
+                                         np.concatenate(([0.0], table[column])))
+    interpolated['stromwinkel_mtpa'] = np.interp(torques, np.concatenate(([0.0], table['drehmoment'])),
+                                                 np.concatenate(([anchor['stromwinkel_mtpa']], table['stromwinkel_mtpa'])))
+    return pd.DataFrame(interpolated)[table.columns]
@@ -0,0 +1,158 @@
+import tkinter as tk
+from tkinter import ttk
+import numpy as np
+import pandas as pd
+
+# Standardbreite der Spalten (px)
+COLUMN_WIDTH = 100
+
+# Zeilenhöhe, falls der Style keine liefert (px)
+DEFAULT_ROW_HEIGHT = 20
+
+# Höhe der Spaltenüberschriften (px)
+HEADING_HEIGHT = 25
+
+class VirtualTable(tk.Frame):
+    """Tabelle für große DataFrames/Arrays, die nur die sichtbaren Zeilen als Treeview-Einträge anlegt.
+
+    Beim Scrollen werden die vorhandenen Einträge mit den Werten des neuen Ausschnitts befüllt.
+    Sortieren per Klick auf die Spaltenüberschrift erfolgt über eine Indexpermutation ohne Kopie der Daten.
+    """
+
+    def __init__(self, master, column_width=COLUMN_WIDTH, **kwargs):
+        super().__init__(master, **kwargs)
+        self.column_width = column_width
+        self.follow = False  # automatisch ans Ende scrollen, wenn neue Zeilen hinzukommen
+        self._columns = []
+        self._arrays = []
+        self._n_rows = 0
+        self._order = None
+        self._sort_column = None
+        self._sort_descending = False
+        self._offset = 0
+        self._items = []
+
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        self.tree = ttk.Treeview(self, columns=[], show='headings', selectmode='browse')
+        self.tree.grid(row=0, column=0, sticky='nsew')
+
+        self.vsb = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.vsb.grid(row=0, column=1, sticky='ns')
+
+        self.hsb = ttk.Scrollbar(self, orient="horizontal", command=self.tree.xview)
+        self.hsb.grid(row=1, column=0, sticky='ew')
+        self.tree.configure(xscrollcommand=self.hsb.set)
+
+        self.tree.bind("<Configure>", lambda event: self._render())
+        self.tree.bind("<MouseWheel>", lambda event: self.scroll(-1 if event.delta > 0 else 1, "units"))
+        self.tree.bind("<Button-4>", lambda event: self.scroll(-1, "units"))
+        self.tree.bind("<Button-5>", lambda event: self.scroll(1, "units"))
+        self.tree.bind("<Prior>", lambda event: self.scroll(-1, "pages"))
+        self.tree.bind("<Next>", lambda event: self.scroll(1, "pages"))
+
+    def set_data(self, data, columns=None):
+        """Setzt die anzuzeigenden Daten: DataFrame, Messpuffer oder Dict Spaltenname -> Array.
+
+        Bleiben die Spalten gleich (z.B. bei neuen Zeilen im Live-Modus), bleiben Scrollposition und Sortierung erhalten.
+        """
+        if isinstance(data, pd.DataFrame):
+            columns = list(columns or data.columns)
+            arrays = [data[column].to_numpy() for column in columns]
+        elif hasattr(data, 'view') and hasattr(data, 'columns'):
+            columns = list(columns or data.columns)
+            view = data.view()
+            arrays = [np.asarray(view[column]) for column in columns]
+        else:
+            columns = list(columns or data.keys())
+            arrays = [np.asarray(data[column]) for column in columns]
+
+        if columns != self._columns:
+            self._columns = columns
+            self._order = None
+            self._sort_column = None
+            self._offset = 0
+            self._setup_columns()
+
+        self._arrays = arrays
+        self._n_rows = len(arrays[0]) if arrays else 0
+        if self._sort_column is not None:
+            self._apply_sort()
+        if self.follow:
+            self._offset = max(self._n_rows - self._visible_rows(), 0)
+        self._render()
+
+    def clear(self):
+        self.set_data({})
+
+    def _setup_columns(self):
+        self.tree.delete(*self.tree.get_children())
+        self._items = []
+        self.tree["columns"] = self._columns
+        for column in self._columns:
+            self.tree.heading(column, text=column, command=lambda c=column: self.sort_by(c))
+            self.tree.column(column, width=self.column_width, anchor='center', stretch=False)
+
+    def sort_by(self, column):
+        """Sortiert nach einer Spalte; erneuter Klick kehrt die Reihenfolge um."""
+        if self._sort_column == column:
+            self._sort_descending = not self._sort_descending
+        else:
+            self._sort_column = column
+            self._sort_descending = False
+        self._apply_sort()
+        self._render()
+
+    def _apply_sort(self):
+        values = self._arrays[self._columns.index(self._sort_column)]
+        order = np.argsort(values, kind='stable')
+        self._order = order[::-1] if self._sort_descending else order
+        for column in self._columns:
+            arrow = (" ▼" if self._sort_descending else " ▲") if column == self._sort_column else ""
+            self.tree.heading(column, text=column + arrow)
+
+    def _visible_rows(self):
+        row_height = ttk.Style(self).lookup("Treeview", "rowheight") or DEFAULT_ROW_HEIGHT
+        return max(1, (self.tree.winfo_height() - HEADING_HEIGHT) // int(row_height))
+
+    def yview(self, *args):
+        """Scrollbar-Protokoll ("moveto", Anteil) bzw. ("scroll", Anzahl, "units"/"pages")."""
+        if args[0] == "moveto":
+            self._offset = int(float(args[1]) * self._n_rows)
+            self._render()
+        elif args[0] == "scroll":
+            self.scroll(int(args[1]), args[2])
+
+    def scroll(self, count, what="units"):
+        step = self._visible_rows() if what == "pages" else 1
+        self._offset += count * step
+        self._render()
+        return "break"
+
+    def see_end(self):
+        self._offset = self._n_rows
+        self._render()
+
+    def _render(self):
+        """Befüllt die sichtbaren Einträge mit dem aktuellen Ausschnitt der Daten."""
+        visible = min(self._visible_rows(), self._n_rows)
+        self._offset = max(0, min(self._offset, self._n_rows - visible))
+
+        # Einträge nur anlegen bzw. entfernen, wenn sich die Fenstergröße ändert
+        while len(self._items) < visible:
+            self._items.append(self.tree.insert("", "end"))
+        while len(self._items) > visible:
+            self.tree.delete(self._items.pop())
+
+        rows = np.arange(self._offset, self._offset + visible)
+        if self._order is not None:
+            rows = self._order[rows]
+        values = [array[rows].tolist() for array in self._arrays]
+        for item, row in zip(self._items, zip(*values)):
+            self.tree.item(item, values=row)
+
+        if self._n_rows:
+            self.vsb.set(self._offset / self._n_rows, (self._offset + visible) / self._n_rows)
+        else:
+            self.vsb.set(0, 1)
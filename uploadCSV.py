@@ -1,20 +1,22 @@
 import tkinter as tk
-from tkinter import filedialog, messagebox, ttk, Toplevel
+from tkinter import filedialog, messagebox, ttk
 import pandas as pd
-import numpy as np
-from opcua import Client, ua
+import sps_upload
+import pruefstaende
+from tabelle import VirtualTable
+from hintergrund import AuftragAbgebrochen, run_in_background
 
-# Globale Variablen für Einstellungen
-opcua_url = "opc.tcp://192.168.0.1:4840"
-db_name = "Messpunkte_DB"
-namespace_index = 3
-opcua_username = ""
-opcua_password = ""
+# Prüfstände (Adresse, Namespace, Datenbausteine und Zugangsdaten aus pruefstaende.csv)
+benches = pruefstaende.load_benches()
+ALL_BENCHES = "Alle Prüfstände"
 
 # Globale Variable für Daten
 daten = None
 dateiname = ""
 
+# Zuletzt erfolgreich geschriebene Arbeitspunkte je SPS (für Delta-Uploads)
+upload_cache = sps_upload.UploadCache()
+
 # CSV Datei öffnen
 def read_csv(csv_datei):
     try:
@@ -43,44 +45,18 @@ def validate_csv_format(daten, mode):
     
     return True, ""
 
-# Variable in SPS schreiben
-def write_SPS(variable, value_array, value_type, client):
-    try:
-        node_id = f'ns={namespace_index};s="{db_name}"."{variable}"'
-        node = client.get_node(node_id)
-        
-        if value_type == ua.VariantType.Int16:
-            value_array = value_array.astype(int)
-        
-        new_value = ua.DataValue(ua.Variant(value_array.tolist(), value_type))
-        node.set_value(new_value)
-        print(f"Value of '{variable}' set to: {new_value.Value}")
-    except Exception as e:
-        messagebox.showerror("Fehler", f"Fehler beim Schreiben der Variable in SPS: {e}")
+# Verbindung zu OPC-UA Server herstellen (gemeinsame Session je Prüfstand, bleibt zwischen Uploads bestehen)
+def connect_to_server(bench):
+    session = bench.session()
+    session.connect()
+    return session
 
-# Verbindung zu OPC-UA Server herstellen
-def connect_to_server():
-    global client
-    try:
-        client = Client(opcua_url)
-        if opcua_username and opcua_password:
-            client.set_user(opcua_username)
-            client.set_password(opcua_password)
-        client.connect()
-        print("Connected to OPC-UA server")
-    except Exception as e:
-        messagebox.showerror("Fehler", f"Fehler beim Verbinden zum OPC-UA Server: {e}")
-
-# Verbindung zu OPC-UA Server trennen
-def disconnect_from_server():
-    try:
-        client.disconnect()
-        print("Disconnected from OPC-UA server")
-    except Exception as e:
-        messagebox.showerror("Fehler", f"Fehler beim Trennen vom OPC-UA Server: {e}")
+# Ausgewählte Prüfstände
+def selected_benches(bench_name):
+    return pruefstaende.select_benches(benches, None if bench_name == ALL_BENCHES else [bench_name])
 
 # CSV Datei hochladen und anzeigen
-def upload_csv(tree, mode, filename_label):
+def upload_csv(table, mode, filename_label):
     global daten, dateiname
     csv_datei = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])
     if csv_datei:
@@ -93,72 +69,105 @@ def upload_csv(tree, mode, filename_label):
             else:
                 # Dateinamen Label aktualisieren
                 filename_label.config(text=f"Dateiname: {dateiname}")
-                display_data(daten, tree)
-
-# CSV-Daten in der Tabelle anzeigen
-def display_data(daten, tree):
-    for row in tree.get_children():
-        tree.delete(row)
-
-    tree["columns"] = list(daten.columns)
-    tree["show"] = "headings"
-
-    for col in tree["columns"]:
-        tree.heading(col, text=col)
-
-    for index, row in daten.iterrows():
-        tree.insert("", "end", values=list(row))
+                display_data(daten, table)
+
+# CSV-Daten in der Tabelle anzeigen (nur die sichtbaren Zeilen werden angelegt)
+def display_data(daten, table):
+    table.set_data(daten)
+
+# Arrays im Hintergrund an die SPS senden (nur geänderte Bereiche, in einem einzigen Write-Request)
+def send_to_bench(bench, arrays, verify=False):
+    session = connect_to_server(bench)
+    result = sps_upload.upload_delta(session, arrays, upload_cache, bench.messpunkte_db)
+    if verify:
+        # Stichproben statt vollständigem Zurücklesen, nur abweichende Blöcke werden nachgelesen
+        sps_upload.check_upload(session, arrays, upload_cache, bench.messpunkte_db)
+    return f"{result[1]} Werte geschrieben"
+
+# Lange Listen seitenweise senden, während die SPS sie abarbeitet (läuft bis zum Ende der Messung)
+def send_paged_to_bench(bench, columns, verify=False, progress=None):
+    session = connect_to_server(bench)
+    # Der Inhalt des Messpunkte_DB entspricht danach nicht mehr dem Cache des Delta-Uploads
+    upload_cache.invalidate(session.url, bench.messpunkte_db)
+    pages = sps_upload.upload_paged(session, columns, bench.messpunkte_db, progress=progress, verify=verify)
+    return f"{pages} Seiten abgearbeitet"
+
+# Alle ausgewählten Prüfstände gleichzeitig bedienen; ein nicht erreichbarer Prüfstand hält die anderen nicht auf
+def send_job(job, targets, send):
+    job.check_cancelled()
+    job.progress(0, len(targets), "Arbeitspunkte werden geschrieben...")
+    finished = []
+
+    def on_result(ergebnis):
+        finished.append(ergebnis)
+        if not job.cancelled:
+            job.progress(len(finished), len(targets), f"{ergebnis.bench.name} fertig")
+
+    # Kein Abbruch mehr nach den Schreibaufträgen: die SPS wurden bereits beschrieben, gemeldet wird das Ergebnis
+    results = pruefstaende.run_on_benches(targets, send, on_result)
+    failed = [ergebnis for ergebnis in results.values() if not ergebnis.ok]
+    if len(results) == 1 and failed:
+        raise failed[0].error
+    return results
+
+def on_send_done(results):
+    failed = [ergebnis for ergebnis in results.values() if not ergebnis.ok]
+    if failed:
+        messagebox.showwarning("Teilweise fehlgeschlagen", pruefstaende.summary(results))
+    elif len(results) > 1:
+        messagebox.showinfo("Erfolg", pruefstaende.summary(results))
+    else:
+        ergebnis = next(iter(results.values()))
+        messagebox.showinfo("Erfolg", f"Daten erfolgreich an SPS gesendet ({ergebnis.result})")
+
+def on_send_error(error, cancel_message="Das Senden wurde abgebrochen, die Daten in der SPS wurden nicht verändert."):
+    if isinstance(error, AuftragAbgebrochen):
+        messagebox.showinfo("Abgebrochen", cancel_message)
+    else:
+        messagebox.showerror("Fehler", f"Fehler beim Senden an die SPS, die Arbeitspunkte wurden nicht vollständig übernommen:\n{error}")
 
 # Daten an SPS senden
-def send_to_sps(mode, tree):
+def send_to_sps(mode, table, verify, bench_name):
     global daten
     if daten is None:
         messagebox.showerror("Fehler", "Keine CSV-Daten zum Senden. Bitte laden Sie zuerst eine CSV-Datei hoch.")
         return
 
     try:
-        # Verbindung herstellen
-        connect_to_server()
-
-        if mode.get() == "Kennfeld":
-            index_array = np.zeros(1000, dtype=np.int16)
-            drehzahl_array = np.zeros(1000, dtype=np.float32)
-            drehmoment_array = np.zeros(1000, dtype=np.float32)
-
-            rows_to_copy = min(len(daten), 1000)
-            index_array[:rows_to_copy] = daten['index'][:rows_to_copy].values
-            drehzahl_array[:rows_to_copy] = daten['drehzahl'][:rows_to_copy].values
-            drehmoment_array[:rows_to_copy] = daten['drehmoment'][:rows_to_copy].values
-            
-            write_SPS("index", index_array, ua.VariantType.Int16, client)
-            write_SPS("drehzahl", drehzahl_array, ua.VariantType.Float, client)
-            write_SPS("drehmoment", drehmoment_array, ua.VariantType.Float, client)
-        
-        elif mode.get() == "Stromwinkel":
-            index_array = np.zeros(1000, dtype=np.int16)
-            drehzahl_array = np.zeros(1000, dtype=np.float32)
-            strom_effektiv_array = np.zeros(1000, dtype=np.float32)
-            stromwinkel_array = np.zeros(1000, dtype=np.float32)
-
-            rows_to_copy = min(len(daten), 1000)
-            index_array[:rows_to_copy] = daten['index'][:rows_to_copy].values
-            drehzahl_array[:rows_to_copy] = daten['drehzahl'][:rows_to_copy].values
-            strom_effektiv_array[:rows_to_copy] = daten['strom_effektiv'][:rows_to_copy].values
-            stromwinkel_array[:rows_to_copy] = daten['stromwinkel'][:rows_to_copy].values
-            
-            write_SPS("index", index_array, ua.VariantType.Int16, client)
-            write_SPS("drehzahl", drehzahl_array, ua.VariantType.Float, client)
-            write_SPS("Strom_Effektivwert", strom_effektiv_array, ua.VariantType.Float, client)
-            write_SPS("Stromwinkel", stromwinkel_array, ua.VariantType.Float, client)
-        
-        messagebox.showinfo("Erfolg", "Daten erfolgreich an SPS gesendet")
-
+        columns = sps_upload.prepare_columns(daten, mode.get())
+        targets = selected_benches(bench_name.get())
     except KeyError as e:
         messagebox.showerror("Fehler", f"Fehlender Spaltenname in der CSV-Datei: {e}")
+        return
+    except sps_upload.UploadFehler as e:
+        messagebox.showerror("Fehler", str(e))
+        return
+
+    root = table.winfo_toplevel()
+    verify_upload = verify.get()
+    if len(daten) > sps_upload.ARRAY_SIZE:
+        pages = sps_upload.page_count(len(daten))
+        if not messagebox.askyesno("Seitenweiser Upload",
+                                   f"Die Liste enthält {len(daten)} Arbeitspunkte, der Messpunkte_DB fasst {sps_upload.ARRAY_SIZE}.\n"
+                                   f"Seitenweise in {pages} Seiten zu je {sps_upload.PAGE_SIZE} Arbeitspunkten senden?\n"
+                                   "Die Seiten werden nachgeladen, während die SPS die Liste abarbeitet; "
+                                   "das Programm muss bis zum Ende der Messung geöffnet bleiben."):
+            return
+        # Fortschritt der Seiten nur bei einem einzelnen Prüfstand anzeigen
+        run_in_background(root, "Arbeitspunkte seitenweise senden...",
+                          lambda job: send_job(job, targets, lambda bench: send_paged_to_bench(
+                              bench, columns, verify_upload, job.progress if len(targets) == 1 else None)),
+                          on_done=on_send_done,
+                          on_error=lambda error: on_send_error(error, "Das Nachladen wurde abgebrochen, bereits geladene Seiten arbeitet die SPS noch ab."))
+        return
+
+    arrays = sps_upload.prepare_arrays(daten, mode.get())
 
-    finally:
-        # Verbindung trennen
-        disconnect_from_server()
+    # Verbindung und Übertragung laufen im Hintergrund, die Oberfläche bleibt bedienbar
+    run_in_background(root, "Daten an SPS senden...",
+                      lambda job: send_job(job, targets, lambda bench: send_to_bench(bench, arrays, verify_upload)),
+                      on_done=on_send_done,
+                      on_error=on_send_error)
 
 # Hauptfunktion, die das GUI und die gesamte Logik startet
 def main():
@@ -178,7 +187,7 @@ def main():
     tk.Radiobutton(mode_frame, text="Stromwinkel", variable=mode, value="Stromwinkel").pack(anchor='w')
 
     # CSV hochladen Button
-    btn_upload = tk.Button(main_frame, text="CSV Datei hochladen", command=lambda: upload_csv(tree, mode, filename_label), width=30)
+    btn_upload = tk.Button(main_frame, text="CSV Datei hochladen", command=lambda: upload_csv(table, mode, filename_label), width=30)
     btn_upload.pack(pady=10)
 
     # Dateiname Label
@@ -189,20 +198,23 @@ def main():
     table_frame = tk.LabelFrame(main_frame, text="CSV Daten", padx=10, pady=10)
     table_frame.pack(fill='both', expand=True, padx=10, pady=10)
 
-    # Scrollbars und Tabelle erstellen
-    tree = ttk.Treeview(table_frame, columns=[], show='headings')
-    tree.pack(side='left', fill='both', expand=True)
+    # Tabelle mit Scrollbars erstellen
+    table = VirtualTable(table_frame)
+    table.pack(fill='both', expand=True)
 
-    vsb = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
-    vsb.pack(side='right', fill='y')
-    tree.configure(yscrollcommand=vsb.set)
+    # Prüfstand auswählen
+    bench_frame = tk.LabelFrame(main_frame, text="Prüfstand", padx=10, pady=10)
+    bench_frame.pack(fill='x', padx=10, pady=10)
+    bench_names = list(benches) + ([ALL_BENCHES] if len(benches) > 1 else [])
+    bench_name = tk.StringVar(value=bench_names[0])
+    ttk.Combobox(bench_frame, textvariable=bench_name, values=bench_names, state='readonly').pack(fill='x')
 
-    hsb = ttk.Scrollbar(table_frame, orient="horizontal", command=tree.xview)
-    hsb.pack(side='bottom', fill='x')
-    tree.configure(xscrollcommand=hsb.set)
+    # Upload nach dem Senden stichprobenartig prüfen
+    verify = tk.BooleanVar(value=False)
+    tk.Checkbutton(main_frame, text="Upload prüfen", variable=verify).pack()
 
     # Daten senden Button
-    btn_send = tk.Button(main_frame, text="Daten an SPS senden", command=lambda: send_to_sps(mode, tree), width=30)
+    btn_send = tk.Button(main_frame, text="Daten an SPS senden", command=lambda: send_to_sps(mode, table, verify, bench_name), width=30)
     btn_send.pack(pady=10)
 
     root.mainloop()
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+import arbeitspunkte_generator as generator
+import messlauf_datei
+
+# Zielgenauigkeit des Kennfelds: größter zulässiger Interpolationsfehler zwischen benachbarten Messpunkten
+ETA_ACCURACY = 0.002     # Wirkungsgrad (absolut, 0.002 = 0,2 Prozentpunkte)
+LOSS_ACCURACY = 2.0      # Verluste Pauf - Pmech (W)
+
+# Arbeitspunkte innerhalb dieser Toleranz gelten als bereits gemessen
+SPEED_TOLERANCE = 25.0   # min^-1
+TORQUE_TOLERANCE = 1.0   # Nm
+
+# Raster, auf das neue Arbeitspunkte gerundet werden
+SPEED_RESOLUTION = 10
+TORQUE_RESOLUTION = 0.5
+
+# Zeilen im Stillstand (zwischen den Arbeitspunkten) werden verworfen
+MIN_SPEED = 10.0
+
+# Dreiecke am Rand mit kleinerem Verhältnis Inkreis/Umkreis werden ignoriert (lange, flache Randkanten)
+MIN_CIRCLE_RATIO = 0.01
+
+def load_measurement(path):
+    """Lädt die für die Verfeinerung benötigten Spalten eines Messlaufs (CSV oder .messlauf)."""
+    meta = messlauf_datei.load_metadata(path)
+    columns = [column for column in ('n_soll', 'M_soll', 'n', 'M', 'eta', 'Pmech', 'Pauf') if column in meta['variables']]
+    return messlauf_datei.load_dataframe(path, columns).astype(float)
+
+def aggregate_points(df, speed_tolerance=SPEED_TOLERANCE, torque_tolerance=TORQUE_TOLERANCE,
+                     columns=('eta', 'verluste')):
+    """Eine Zeile je Arbeitspunkt mit drehzahl, drehmoment und den Mittelwerten von columns.
+
+    verluste (Pauf - Pmech) wird berechnet. Stillstandszeilen und ungültige Wirkungsgrade (inf, 9.91e37 von
+    der SPS) werden verworfen. Sind Sollwerte (n_soll, M_soll) vorhanden, wird nach ihnen gemittelt, sonst
+    nach den auf die Toleranz gerundeten Istwerten.
+    """
+    valid = (df['n'].abs() >= MIN_SPEED) & np.isfinite(df['eta']) & (df['eta'] > 0) & (df['eta'] <= 1)
+    df = df[valid].copy()
+    df['verluste'] = df['Pauf'] - df['Pmech']
+    if 'n_soll' in df.columns and 'M_soll' in df.columns:
+        df['drehzahl'], df['drehmoment'] = df['n_soll'], df['M_soll']
+    else:
+        df['drehzahl'], df['drehmoment'] = df['n'], df['M']
+    keys = [np.round(df['drehzahl'] / speed_tolerance), np.round(df['drehmoment'] / torque_tolerance)]
+    points = df.groupby(keys)[['drehzahl', 'drehmoment'] + list(columns)].mean()
+    return points.reset_index(drop=True)
+
+def _normalized(points):
+    """Drehzahl und Drehmoment auf 0..1 normiert, damit beide Achsen in der Triangulierung gleich zählen."""
+    speeds = points['drehzahl'].to_numpy(dtype=float)
+    torques = points['drehmoment'].to_numpy(dtype=float)
+    return (speeds - speeds.min()) / (np.ptp(speeds) or 1.0), (torques - torques.min()) / (np.ptp(torques) or 1.0)
+
+def interpolation_error(triangulation, values):
+    """Geschätzter Fehler der linearen Interpolation in der Mitte jeder Kante der Triangulierung.
+
+    Aus den Knotengradienten (kubische Interpolation) ergibt sich in der Kantenmitte die Abweichung der
+    kubischen von der linearen Interpolation zu |(g_start - g_end) · d| / 8. Sie ist dort groß, wo sich der
+    Wert am stärksten und am wenigsten linear ändert; gleichmäßige Steigungen kosten keine Messpunkte.
+    """
+    from matplotlib import tri
+    x, y = triangulation.x, triangulation.y
+    interpolator = tri.CubicTriInterpolator(triangulation, np.array(values, dtype=float), kind='geom')
+    gradient_x, gradient_y = (np.asarray(gradient) for gradient in interpolator.gradient(x, y))
+    start, end = triangulation.edges[:, 0], triangulation.edges[:, 1]
+    return np.abs((gradient_x[start] - gradient_x[end]) * (x[end] - x[start]) +
+                  (gradient_y[start] - gradient_y[end]) * (y[end] - y[start])) / 8
+
+def _measured(speeds, torques, measured_speeds, measured_torques, speed_tolerance, torque_tolerance):
+    """True für Punkte, die innerhalb der Toleranz eines gemessenen Punkts liegen."""
+    near = ((np.abs(speeds[:, np.newaxis] - measured_speeds[np.newaxis, :]) <= speed_tolerance) &
+            (np.abs(torques[:, np.newaxis] - measured_torques[np.newaxis, :]) <= torque_tolerance))
+    return near.any(axis=1)
+
+def refinement_candidates(points, eta_accuracy=ETA_ACCURACY, loss_accuracy=LOSS_ACCURACY,
+                          speed_tolerance=SPEED_TOLERANCE, torque_tolerance=TORQUE_TOLERANCE, torque_limits="",
+                          max_points=None):
+    """Schlägt neue Arbeitspunkte dort vor, wo sich Wirkungsgrad oder Verluste am stärksten ändern.
+
+    Die gemessenen Punkte werden trianguliert; jede Kante, auf der der geschätzte Interpolationsfehler von eta
+    oder den Verlusten die Zielgenauigkeit überschreitet, erhält einen Punkt in der Mitte. Wiederholt man
+    Messung und Verfeinerung, halbieren sich die Abstände nur in diesen Bereichen, bis die Zielgenauigkeit
+    erreicht ist. Punkte nahe an gemessenen Punkten und oberhalb der Drehmomentgrenze entfallen.
+    Gibt drehzahl, drehmoment und den Fehler (Vielfaches der Zielgenauigkeit) zurück, größter zuerst.
+    """
+    columns = ['drehzahl', 'drehmoment', 'fehler']
+    if len(points) < 3:
+        return pd.DataFrame(columns=columns)
+    # matplotlib erst hier importieren: arbeitspunkte.py und main.py starten auch ohne matplotlib
+    from matplotlib import tri
+    x, y = _normalized(points)
+    triangulation = tri.Triangulation(x, y)
+    triangulation.set_mask(tri.TriAnalyzer(triangulation).get_flat_tri_mask(MIN_CIRCLE_RATIO))
+    error = np.maximum(interpolation_error(triangulation, points['eta']) / eta_accuracy,
+                       interpolation_error(triangulation, points['verluste']) / loss_accuracy)
+    refine = error > 1
+    start, end = triangulation.edges[refine, 0], triangulation.edges[refine, 1]
+    error = error[refine]
+
+    measured_speeds = points['drehzahl'].to_numpy(dtype=float)
+    measured_torques = points['drehmoment'].to_numpy(dtype=float)
+    speeds = np.round((measured_speeds[start] + measured_speeds[end]) / 2 / SPEED_RESOLUTION) * SPEED_RESOLUTION
+    torques = np.round((measured_torques[start] + measured_torques[end]) / 2 / TORQUE_RESOLUTION) * TORQUE_RESOLUTION
+    keep = ~_measured(speeds, torques, measured_speeds, measured_torques, speed_tolerance, torque_tolerance)
+    keep &= torques <= generator.torque_limit_curve(speeds, torque_limits)
+    candidates = pd.DataFrame({'drehzahl': speeds[keep], 'drehmoment': torques[keep], 'fehler': error[keep]})
+
+    # Gleiche Punkte aus mehreren Kanten nur einmal, mit dem größten Fehler
+    candidates = candidates.sort_values('fehler', ascending=False).drop_duplicates(['drehzahl', 'drehmoment'])
+    return candidates.head(max_points).reset_index(drop=True) if max_points else candidates.reset_index(drop=True)
+
+def refinement_list(paths, sort_by="drehmoment", **params):
+    """Erzeugt aus einem oder mehreren Messläufen die Verfeinerungsliste (index, drehzahl, drehmoment).
+
+    Gibt (Liste, Anzahl gemessener Arbeitspunkte) zurück.
+    """
+    measurements = pd.concat([load_measurement(path) for path in paths], ignore_index=True)
+    points = aggregate_points(measurements, params.get('speed_tolerance', SPEED_TOLERANCE),
+                              params.get('torque_tolerance', TORQUE_TOLERANCE))
+    candidates = refinement_candidates(points, **params)
+    speeds = candidates['drehzahl'].to_numpy(dtype=float)
+    torques = candidates['drehmoment'].to_numpy(dtype=float)
+    order = np.lexsort((speeds, torques)) if sort_by == "drehmoment" else np.lexsort((torques, speeds))
+    liste = pd.DataFrame({
+        "index": np.arange(1, len(order) + 1),
+        "drehzahl": speeds[order].astype(int),
+        "drehmoment": torques[order],
+    })
+    return liste, len(points)
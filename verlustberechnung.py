@@ -0,0 +1,151 @@
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+import matplotlib
+matplotlib.use('TkAgg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+from tabelle import VirtualTable
+import messlauf_datei
+import verluste
+import wirkungsgrad_kennfeld
+
+# Beschriftung der Maschinenkenndaten in der Eingabemaske
+PARAMETER_LABELS = {
+    'resistance_ref': "Klemmenwiderstand R (Ohm)",
+    'temperature_ref': "bei Temperatur (°C)",
+    'temperature_target': "Bezugstemperatur P_cu (°C)",
+    'temperature_constant': "Temperaturkonstante (K)",
+    'friction_torque': "Reibmoment Lager (Nm)",
+    'windage_loss_ref': "Luftreibung (W)",
+    'speed_ref': "bei Drehzahl (min^-1)",
+    'stray_fraction': "Zusatzverluste (Anteil Pauf)",
+}
+
+parameters = dict(verluste.MASCHINENPARAMETER_DEFAULTS)
+paths = []
+points = None
+kennfeld = None
+
+def read_parameters():
+    """Übernimmt die Eingaben; gibt False zurück, wenn ein Wert keine Zahl ist."""
+    try:
+        values = {key: float(var.get().replace(',', '.')) for key, var in parameter_vars.items()}
+    except ValueError:
+        messagebox.showerror("Ungültige Eingabe", "Bitte stellen Sie sicher, dass alle Werte gültige Zahlen sind.")
+        return False
+    parameters.update(values)
+    return True
+
+def open_runs():
+    global paths
+    selected = filedialog.askopenfilenames(filetypes=messlauf_datei.DIALOG_FILETYPES, title="Messläufe wählen")
+    if selected:
+        paths = messlauf_datei.selected_runs(selected)
+        files_label.config(text=f"{len(paths)} Messläufe")
+        calculate()
+
+def calculate():
+    """Berechnet die Verluste aller gewählten Messläufe und zeigt Arbeitspunkte und Kennfeld."""
+    global points, kennfeld
+    if not paths or not read_parameters():
+        return
+    try:
+        _, points = verluste.calculate_runs(paths, parameters)
+        kennfeld = verluste.loss_map(points, float(speed_step_var.get()), float(torque_step_var.get()))
+    except ValueError as e:
+        messagebox.showerror("Fehler", f"Verlustberechnung nicht möglich: {e}")
+        return
+    except KeyError as e:
+        messagebox.showerror("Fehler", f"Messlauf enthält nicht alle benötigten Spalten: {e}")
+        return
+    table.set_data(points.round(4))
+    show_loss()
+
+def show_loss(event=None):
+    if kennfeld is None:
+        return
+    figure.clear()
+    ax = figure.add_subplot(111)
+    quantity = quantity_var.get()
+    contour = wirkungsgrad_kennfeld.plot(kennfeld, quantity, ax, title=verluste.LOSS_COLUMNS[quantity])
+    figure.colorbar(contour, ax=ax)
+    canvas.draw()
+
+def save_points():
+    if points is not None:
+        file_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")], title="Verluste speichern")
+        if file_path:
+            points.to_csv(file_path, index=False)
+
+def save_image():
+    if kennfeld is not None:
+        file_path = filedialog.asksaveasfilename(defaultextension=".png", filetypes=[("PNG", "*.png"), ("PDF", "*.pdf")], title="Bild speichern")
+        if file_path:
+            figure.savefig(file_path, dpi=150)
+
+def on_closing():
+    if read_parameters():
+        verluste.save_parameters(parameters)
+    root.destroy()
+
+def main():
+    global root, parameter_vars, files_label, speed_step_var, torque_step_var, quantity_var, table, figure, canvas
+
+    root = tk.Tk()
+    root.title("Verlustberechnung")
+
+    parameters.update(verluste.load_parameters())
+
+    left = tk.Frame(root)
+    left.pack(side=tk.LEFT, fill=tk.Y, padx=10, pady=10)
+
+    tk.Label(left, text="Maschinenkenndaten", font=('Arial', 12, 'bold')).grid(row=0, column=0, columnspan=2, pady=5, sticky='w')
+    parameter_vars = {}
+    for row, (key, label) in enumerate(PARAMETER_LABELS.items(), start=1):
+        tk.Label(left, text=label).grid(row=row, column=0, sticky=tk.E)
+        parameter_vars[key] = tk.StringVar(root, value=f"{parameters[key]:g}")
+        tk.Entry(left, textvariable=parameter_vars[key], width=10).grid(row=row, column=1, padx=5, pady=2, sticky='ew')
+
+    row = len(PARAMETER_LABELS) + 1
+    tk.Label(left, text="Raster Kennfeld", font=('Arial', 12, 'bold')).grid(row=row, column=0, columnspan=2, pady=5, sticky='w')
+    tk.Label(left, text="Drehzahl (min^-1)").grid(row=row + 1, column=0, sticky=tk.E)
+    speed_step_var = tk.StringVar(root, value=str(wirkungsgrad_kennfeld.SPEED_STEP))
+    tk.Entry(left, textvariable=speed_step_var, width=10).grid(row=row + 1, column=1, padx=5, pady=2, sticky='ew')
+    tk.Label(left, text="Drehmoment (Nm)").grid(row=row + 2, column=0, sticky=tk.E)
+    torque_step_var = tk.StringVar(root, value=str(wirkungsgrad_kennfeld.TORQUE_STEP))
+    tk.Entry(left, textvariable=torque_step_var, width=10).grid(row=row + 2, column=1, padx=5, pady=2, sticky='ew')
+
+    tk.Button(left, text="Messläufe öffnen", command=open_runs).grid(row=row + 3, column=0, columnspan=2, pady=(15, 5))
+    files_label = tk.Label(left, text="keine Messläufe")
+    files_label.grid(row=row + 4, column=0, columnspan=2)
+    tk.Button(left, text="Neu berechnen", command=calculate).grid(row=row + 5, column=0, columnspan=2, pady=5)
+    tk.Button(left, text="Verluste als CSV speichern", command=save_points).grid(row=row + 6, column=0, columnspan=2, pady=5)
+    tk.Button(left, text="Bild speichern", command=save_image).grid(row=row + 7, column=0, columnspan=2, pady=5)
+
+    right = ttk.Notebook(root)
+    right.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+    map_frame = tk.Frame(right)
+    right.add(map_frame, text="Verlustkennfeld")
+    controls = tk.Frame(map_frame)
+    controls.pack(fill=tk.X)
+    tk.Label(controls, text="Verlustart:").pack(side=tk.LEFT, padx=(0, 2))
+    quantity_var = tk.StringVar(root, value='P_fe')
+    quantity_box = ttk.Combobox(controls, textvariable=quantity_var, values=list(verluste.LOSS_COLUMNS), state='readonly', width=12)
+    quantity_box.pack(side=tk.LEFT)
+    quantity_box.bind("<<ComboboxSelected>>", show_loss)
+
+    figure = Figure(figsize=(8, 6))
+    canvas = FigureCanvasTkAgg(figure, master=map_frame)
+    NavigationToolbar2Tk(canvas, map_frame).update()
+    canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+    table = VirtualTable(right)
+    right.add(table, text="Arbeitspunkte")
+
+    root.protocol("WM_DELETE_WINDOW", on_closing)
+    root.mainloop()
+
+# Wenn das Skript direkt ausgeführt wird, starte das Hauptprogramm
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import math
+import numpy as np
+import pandas as pd
+import arbeitspunkte_generator as generator
+import messlauf_datei
+import verfeinerung
+import wirkungsgrad_kennfeld
+
+# Datei mit den Maschinenkenndaten
+MASCHINENPARAMETER_CSV = 'maschinenparameter.csv'
+
+# Standardwerte der Maschinenkenndaten
+MASCHINENPARAMETER_DEFAULTS = {
+    'resistance_ref': 0.54,        # Klemmenwiderstand (zwischen zwei Anschlüssen) bei temperature_ref (Ohm)
+    'temperature_ref': 20,         # Bezugstemperatur von resistance_ref (°C)
+    'temperature_target': 75,      # Temperatur, auf die die Kupferverluste zusätzlich umgerechnet werden (°C)
+    'temperature_constant': 235,   # Temperaturkonstante des Leiterwerkstoffs (Kupfer 235, Aluminium 225) (K)
+    'friction_torque': 0.0,        # Reibmoment der Lager (Nm), Reibverluste ~ n
+    'windage_loss_ref': 0.0,       # Luftreibungsverluste bei speed_ref (W), ~ n^3
+    'speed_ref': 1000,             # Bezugsdrehzahl der Luftreibung (min^-1)
+    'stray_fraction': 0.0,         # Zusatzverluste als Anteil der aufgenommenen Leistung
+}
+
+# Widerstandsmessung im Stillstand zwischen den Arbeitspunkten: gültig ab diesem Messstrom (A)
+MIN_RESISTANCE_CURRENT = 0.5
+
+# Verlustarten mit Beschriftung
+LOSS_COLUMNS = {
+    'verluste': "Gesamtverluste (W)",
+    'P_cu': "Kupferverluste (W)",
+    'P_cu_ref': "Kupferverluste bei Bezugstemperatur (W)",
+    'P_reib': "Reibungsverluste (W)",
+    'P_zus': "Zusatzverluste (W)",
+    'P_fe': "Eisen- und Restverluste (W)",
+    'R_wicklung': "Klemmenwiderstand (Ohm)",
+    'T_wicklung': "Wicklungstemperatur (°C)",
+}
+
+# Spalten eines Messlaufs, die verwendet werden (soweit vorhanden)
+RUN_COLUMNS = ['n_soll', 'M_soll', 'n', 'M', 'I', 'U', 'R', 'I_R_mess', 'U_R_mess', 'Temperatur', 'Pmech', 'Pauf', 'eta']
+
+def load_parameters(csv_file=MASCHINENPARAMETER_CSV):
+    return {key: float(value) for key, value in generator.load_default_values(csv_file, MASCHINENPARAMETER_DEFAULTS).items()}
+
+def save_parameters(parameters, csv_file=MASCHINENPARAMETER_CSV):
+    generator.save_default_values(csv_file, parameters)
+
+def load_runs(paths):
+    """Lädt die Messläufe in eine gemeinsame Tabelle; die Spalte lauf nummeriert die Messläufe."""
+    frames = []
+    for number, path in enumerate(paths):
+        variables = messlauf_datei.load_metadata(path)['variables']
+        df = messlauf_datei.load_dataframe(path, [column for column in RUN_COLUMNS if column in variables]).astype(float)
+        df.insert(0, 'lauf', number)
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+def winding_resistance(df, parameters):
+    """Klemmenwiderstand je Zeile.
+
+    Bevorzugt wird die Widerstandsmessung im Stillstand direkt nach dem Arbeitspunkt (U_R_mess / I_R_mess,
+    sonst die davor), danach eine Spalte R der SPS. Ohne Messung wird resistance_ref über die Temperatur
+    umgerechnet: R = R_ref · (k + T) / (k + T_ref).
+    """
+    resistance = pd.Series(np.nan, index=df.index)
+    if 'I_R_mess' in df.columns and 'U_R_mess' in df.columns:
+        measured = df['I_R_mess'] >= MIN_RESISTANCE_CURRENT
+        resistance[measured] = df['U_R_mess'][measured] / df['I_R_mess'][measured]
+        # Messung nach dem Arbeitspunkt, am Ende eines Laufs die letzte davor (nie über Laufgrenzen hinweg)
+        resistance = resistance.groupby(df['lauf']).transform(lambda values: values.bfill().ffill())
+    if 'R' in df.columns:
+        resistance = resistance.fillna(df['R'].where(df['R'] > 0))
+    if 'Temperatur' in df.columns:
+        k = parameters['temperature_constant']
+        from_temperature = parameters['resistance_ref'] * (k + df['Temperatur']) / (k + parameters['temperature_ref'])
+        resistance = resistance.fillna(from_temperature)
+    return resistance.fillna(parameters['resistance_ref']).to_numpy()
+
+def calculate(df, parameters):
+    """Verluste je Zeile für ganze Messläufe auf einmal (alle Spalten als Arrays).
+
+    P_cu = 1,5 · I² · R_Klemme (Dreiphasenmaschine, unabhängig von Stern oder Dreieck), P_reib aus Reibmoment und
+    Luftreibung, P_zus als Anteil der aufgenommenen Leistung; P_fe ist der Rest der Gesamtverluste Pauf - Pmech.
+    Gibt eine Kopie von df mit den Spalten aus LOSS_COLUMNS zurück.
+    """
+    result = df.copy()
+    k = parameters['temperature_constant']
+    current = df['I'].to_numpy()
+    speed = np.abs(df['n'].to_numpy())
+    resistance = winding_resistance(df, parameters)
+
+    result['verluste'] = df['Pauf'] - df['Pmech']
+    result['R_wicklung'] = resistance
+    result['T_wicklung'] = resistance / parameters['resistance_ref'] * (k + parameters['temperature_ref']) - k
+    result['P_cu'] = 1.5 * current ** 2 * resistance
+    result['P_cu_ref'] = result['P_cu'] * (k + parameters['temperature_target']) / (k + result['T_wicklung'])
+    result['P_reib'] = (parameters['friction_torque'] * 2 * math.pi * speed / 60 +
+                        parameters['windage_loss_ref'] * (speed / parameters['speed_ref']) ** 3)
+    result['P_zus'] = parameters['stray_fraction'] * np.abs(df['Pauf'])
+    result['P_fe'] = result['verluste'] - result['P_cu'] - result['P_reib'] - result['P_zus']
+    return result
+
+def operating_points(result):
+    """Mittelwerte der Verluste je Arbeitspunkt (Stillstandszeilen und ungültige Wirkungsgrade entfallen)."""
+    columns = ['eta'] + [column for column in LOSS_COLUMNS if column != 'verluste']
+    return verfeinerung.aggregate_points(result, columns=['verluste'] + columns)
+
+def calculate_runs(paths, parameters=None):
+    """Verlustberechnung für viele Messläufe in einem Durchgang. Gibt (Zeilen, Arbeitspunkte) zurück."""
+    parameters = parameters or dict(MASCHINENPARAMETER_DEFAULTS)
+    result = calculate(load_runs(paths), parameters)
+    return result, operating_points(result)
+
+def loss_map(points, speed_step=wirkungsgrad_kennfeld.SPEED_STEP, torque_step=wirkungsgrad_kennfeld.TORQUE_STEP):
+    """Verlustkennfelder über Drehzahl x Drehmoment aus den Arbeitspunkten (alle Verlustarten gemeinsam)."""
+    if len(points) < 3:
+        raise ValueError("Zu wenige gültige Arbeitspunkte für ein Kennfeld")
+    return wirkungsgrad_kennfeld.interpolate(points, list(LOSS_COLUMNS), speed_step, torque_step)
@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+import messlauf_datei
+from messlauf_datei import AUSWERTUNG_CACHE_DIR
+import verfeinerung
+
+# Bei Änderungen an Interpolation oder Dateiformat erhöhen, damit alte Einträge nicht mehr passen
+CACHE_VERSION = 1
+
+# Größen eines Kennfelds mit Beschriftung; verluste = Pauf - Pmech, die übrigen nur, wenn im Messlauf vorhanden
+QUANTITIES = {
+    'eta': "Wirkungsgrad",
+    'verluste': "Verluste (W)",
+    'Pmech': "Mechanische Leistung (W)",
+    'Pauf': "Aufgenommene Leistung (W)",
+    'I': "Strom (A)",
+    'U': "Spannung (V)",
+    'Temperatur': "Temperatur (°C)",
+}
+
+# Standardraster
+SPEED_STEP = 25      # min^-1
+TORQUE_STEP = 0.5    # Nm
+
+class Kennfeld:
+    """Auf ein reguläres Raster Drehzahl x Drehmoment interpolierte Größen eines oder mehrerer Messläufe.
+
+    grids enthält je Größe ein Array (Drehmomente x Drehzahlen), außerhalb der Messpunkte NaN.
+    points sind die gemittelten Messpunkte, aus denen interpoliert wurde.
+    """
+
+    def __init__(self, speeds, torques, grids, points):
+        self.speeds = speeds
+        self.torques = torques
+        self.grids = grids
+        self.points = points
+
+    @property
+    def quantities(self):
+        return list(self.grids)
+
+    def to_dataframe(self, quantity):
+        """Raster einer Größe als Tabelle: eine Zeile je Drehmoment, eine Spalte je Drehzahl (wie die Kennfeld-Tabelle)."""
+        table = pd.DataFrame(self.grids[quantity], columns=self.speeds.tolist())
+        table.insert(0, "n/M", self.torques)
+        return table
+
+def load_points(paths):
+    """Lädt die Messläufe und mittelt je Arbeitspunkt alle vorhandenen Größen aus QUANTITIES."""
+    frames = []
+    for path in paths:
+        variables = messlauf_datei.load_metadata(path)['variables']
+        columns = [column for column in ['n_soll', 'M_soll', 'n', 'M'] + list(QUANTITIES) if column in variables]
+        frames.append(messlauf_datei.load_dataframe(path, columns).astype(float))
+    measurements = pd.concat(frames, ignore_index=True)
+    quantities = [quantity for quantity in QUANTITIES if quantity in measurements.columns or quantity == 'verluste']
+    return verfeinerung.aggregate_points(measurements, columns=quantities)
+
+def grid_axes(points, speed_step=SPEED_STEP, torque_step=TORQUE_STEP):
+    """Drehzahl- und Drehmomentachse über den Bereich der Messpunkte, auf die Schrittweite gerundet."""
+    def axis(values, step):
+        return np.arange(np.floor(values.min() / step) * step, np.ceil(values.max() / step) * step + step / 2, step)
+    return axis(points['drehzahl'].to_numpy(), speed_step), axis(points['drehmoment'].to_numpy(), torque_step)
+
+def interpolation_weights(points, speeds, torques):
+    """Dreieck und baryzentrische Gewichte jedes Rasterpunkts in der Triangulierung der Messpunkte.
+
+    Die Gewichte hängen nur von den Punktlagen ab und werden für alle Größen gemeinsam verwendet.
+    Gibt (Eckpunkte je Rasterpunkt (N x 3), Gewichte (N x 3), gültig (N)) zurück.
+    """
+    # matplotlib erst hier importieren, damit main.py auch ohne matplotlib startet
+    from matplotlib import tri
+    x = points['drehzahl'].to_numpy(dtype=float)
+    y = points['drehmoment'].to_numpy(dtype=float)
+    # Normieren, damit die Delaunay-Triangulierung nicht von den Einheiten abhängt
+    x_scale, y_scale = np.ptp(x) or 1.0, np.ptp(y) or 1.0
+    triangulation = tri.Triangulation(x / x_scale, y / y_scale)
+    triangulation.set_mask(tri.TriAnalyzer(triangulation).get_flat_tri_mask(verfeinerung.MIN_CIRCLE_RATIO))
+
+    grid_x, grid_y = np.meshgrid(speeds / x_scale, torques / y_scale)
+    grid_x, grid_y = grid_x.ravel(), grid_y.ravel()
+    triangle = triangulation.get_trifinder()(grid_x, grid_y)
+    valid = triangle >= 0
+    corners = triangulation.triangles[np.where(valid, triangle, 0)]
+
+    # Baryzentrische Koordinaten aller Rasterpunkte auf einmal
+    x0, y0 = triangulation.x[corners[:, 0]], triangulation.y[corners[:, 0]]
+    x1, y1 = triangulation.x[corners[:, 1]], triangulation.y[corners[:, 1]]
+    x2, y2 = triangulation.x[corners[:, 2]], triangulation.y[corners[:, 2]]
+    determinant = (y1 - y2) * (x0 - x2) + (x2 - x1) * (y0 - y2)
+    determinant[determinant == 0] = np.nan
+    w0 = ((y1 - y2) * (grid_x - x2) + (x2 - x1) * (grid_y - y2)) / determinant
+    w1 = ((y2 - y0) * (grid_x - x2) + (x0 - x2) * (grid_y - y2)) / determinant
+    weights = np.stack([w0, w1, 1 - w0 - w1], axis=1)
+    return corners, weights, valid & np.isfinite(w0)
+
+def interpolate(points, quantities, speed_step=SPEED_STEP, torque_step=TORQUE_STEP):
+    """Interpoliert alle Größen linear auf das Raster (eine Matrixoperation je Größe)."""
+    speeds, torques = grid_axes(points, speed_step, torque_step)
+    corners, weights, valid = interpolation_weights(points, speeds, torques)
+    grids = {}
+    for quantity in quantities:
+        values = points[quantity].to_numpy(dtype=float)
+        grid = np.einsum('ij,ij->i', values[corners], weights)
+        grid[~valid] = np.nan
+        grids[quantity] = grid.reshape(len(torques), len(speeds))
+    return Kennfeld(speeds, torques, grids, points)
+
+def cache_key(paths, speed_step, torque_step):
+    """Schlüssel aus den Hashes der Messläufe und den Rasterparametern."""
+    description = {
+        'version': CACHE_VERSION,
+        'files': sorted(messlauf_datei.file_hash(path) for path in paths),
+        'speed_step': float(speed_step),
+        'torque_step': float(torque_step),
+    }
+    return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()[:32]
+
+def _load_cached(cache_path):
+    try:
+        with np.load(cache_path) as cached:
+            points = pd.DataFrame({column: cached['point_' + column] for column in cached['point_columns']})
+            grids = {quantity: cached['grid_' + quantity] for quantity in cached['quantities']}
+            return Kennfeld(cached['speeds'], cached['torques'], grids, points)
+    except Exception:
+        # Beschädigte Cache-Datei wie einen fehlenden Eintrag behandeln
+        return None
+
+def _store(cache_path, kennfeld):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    arrays = {'speeds': kennfeld.speeds, 'torques': kennfeld.torques,
+              'quantities': np.array(kennfeld.quantities), 'point_columns': np.array(list(kennfeld.points.columns))}
+    arrays.update({'grid_' + quantity: grid for quantity, grid in kennfeld.grids.items()})
+    arrays.update({'point_' + column: kennfeld.points[column].to_numpy() for column in kennfeld.points.columns})
+    with open(cache_path + ".tmp", 'wb') as cache_file:
+        np.savez(cache_file, **arrays)
+    os.replace(cache_path + ".tmp", cache_path)
+
+def build(paths, speed_step=SPEED_STEP, torque_step=TORQUE_STEP, cache_dir=AUSWERTUNG_CACHE_DIR):
+    """Kennfeld aus einem oder mehreren Messläufen mit allen Größen.
+
+    Das Ergebnis wird je Hash der Messläufe und Raster zwischengespeichert (cache_dir=None: nie); ein
+    Wechsel der angezeigten Größe oder erneutes Öffnen rechnet daher nichts neu.
+    """
+    cache_path = None
+    if cache_dir:
+        cache_path = os.path.join(cache_dir, f"kennfeld_v{CACHE_VERSION}_{cache_key(paths, speed_step, torque_step)}.npz")
+        if os.path.exists(cache_path):
+            kennfeld = _load_cached(cache_path)
+            if kennfeld is not None:
+                return kennfeld
+
+    points = load_points(paths)
+    if len(points) < 3:
+        raise ValueError("Zu wenige gültige Arbeitspunkte für ein Kennfeld")
+    kennfeld = interpolate(points, [column for column in QUANTITIES if column in points.columns],
+                           speed_step, torque_step)
+    if cache_path:
+        _store(cache_path, kennfeld)
+    return kennfeld
+
+def plot(kennfeld, quantity, ax, levels=20, show_points=True, title=None):
+    """Zeichnet das Kennfeld einer Größe als Höhenlinienbild in die Achse ax und gibt das Konturobjekt zurück."""
+    grid = np.ma.masked_invalid(kennfeld.grids[quantity])
+    contour = ax.contourf(kennfeld.speeds, kennfeld.torques, grid, levels=levels, cmap='viridis')
+    lines = ax.contour(kennfeld.speeds, kennfeld.torques, grid, levels=contour.levels[::2], colors='k', linewidths=0.5)
+    ax.clabel(lines, fmt='%.3g', fontsize=8)
+    if show_points:
+        ax.plot(kennfeld.points['drehzahl'], kennfeld.points['drehmoment'], 'k.', markersize=3)
+    ax.set_xlabel("Drehzahl (min^-1)")
+    ax.set_ylabel("Drehmoment (Nm)")
+    ax.set_title(title or QUANTITIES.get(quantity, quantity))
+    return contour